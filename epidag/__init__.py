@@ -4,6 +4,8 @@ from epidag.distribution import parse_distribution
 from epidag.bayesnet import bayes_net_from_script, bayes_net_from_json
 
 from epidag.fn import *
+from epidag.imputation import *
+from epidag.inference import *
 from epidag.simulation.fn import *
 from epidag.simulation import NodeSet
 #from epidag.fitting import as_data_model, as_simulation_data_model
@@ -1,4 +1,5 @@
 from epidag.bayesnet.dag import *
-from epidag.bayesnet.chromosome import Chromosome
+from epidag.bayesnet.chromosome import Chromosome, CompactChromosome, ChromosomeSchema, get_schema
+from epidag.bayesnet.batch import ChromosomeBatch, as_population
 from epidag.bayesnet.loci import parse_loci, loci_from_json
 from epidag.bayesnet.bn import *
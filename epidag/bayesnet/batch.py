@@ -0,0 +1,255 @@
+import numpy as np
+import pandas as pd
+from epidag.bayesnet.chromosome import CompactChromosome, ChromosomeSchema
+
+__author__ = 'TimeWz667'
+__all__ = ['ChromosomeBatch', 'as_population']
+
+
+def _weighted_quantile(xs, wts, qs):
+    ind = np.argsort(xs)
+    cum = np.cumsum(wts[ind])
+    cum -= 0.5 * wts[ind]
+    return np.interp(qs, cum, xs[ind])
+
+
+class ChromosomeBatch:
+    """
+    A population of chromosomes stored as contiguous columns.
+    Loci, LogPrior and LogLikelihood share one Fortran-ordered float64 block
+    so that column access and the conversion to pandas copy nothing.
+    """
+    def __init__(self, schema, n):
+        """
+        :param schema: ChromosomeSchema, names of loci
+        :param n: size of the population
+        """
+        self.Schema = schema
+        self.Data = np.full((n, len(schema) + 2), np.nan, order='F')
+
+    @staticmethod
+    def from_chromosomes(genes, schema=None):
+        """
+        Collect a list of chromosomes into a batch
+        :param genes: list of Chromosome
+        :param schema: ChromosomeSchema; None to use the schema of the first compact chromosome or its keys
+        :return: ChromosomeBatch
+        """
+        genes = list(genes)
+        if schema is None:
+            try:
+                schema = genes[0].Schema
+            except AttributeError:
+                schema = ChromosomeSchema(genes[0].keys())
+            except IndexError:
+                raise ValueError('No chromosome to collect')
+
+        batch = ChromosomeBatch(schema, len(genes))
+        k = len(schema)
+        for i, gene in enumerate(genes):
+            if isinstance(gene, CompactChromosome) and gene.Schema is schema:
+                batch.Data[i, :k] = gene.Values
+            else:
+                batch.Data[i, :k] = [gene[name] for name in schema.Names]
+            batch.Data[i, k] = np.nan if gene.LogPrior is None else gene.LogPrior
+            batch.Data[i, k + 1] = np.nan if gene.LogLikelihood is None else gene.LogLikelihood
+        return batch
+
+    @staticmethod
+    def from_columns(schema, values, prior=None, li=None):
+        """
+        Build a batch from an array of values
+        :param schema: ChromosomeSchema, names of loci
+        :param values: array-like (n, len(schema)) or dict of columns
+        :param prior: array-like (n, ), log prior probabilities
+        :param li: array-like (n, ), log likelihoods
+        :return: ChromosomeBatch
+        """
+        if isinstance(values, dict):
+            values = np.column_stack([values[name] for name in schema.Names])
+        values = np.asarray(values, dtype=np.float64)
+        batch = ChromosomeBatch(schema, values.shape[0])
+        batch.Values = values
+        if prior is not None:
+            batch.LogPrior = prior
+        if li is not None:
+            batch.LogLikelihood = li
+        return batch
+
+    def __len__(self):
+        return self.Data.shape[0]
+
+    def __bool__(self):
+        return True
+
+    @property
+    def Size(self):
+        return self.Data.shape[0]
+
+    @property
+    def Values(self):
+        return self.Data[:, :len(self.Schema)]
+
+    @Values.setter
+    def Values(self, vs):
+        self.Data[:, :len(self.Schema)] = vs
+
+    @property
+    def LogPrior(self):
+        return self.Data[:, len(self.Schema)]
+
+    @LogPrior.setter
+    def LogPrior(self, vs):
+        self.Data[:, len(self.Schema)] = vs
+
+    @property
+    def LogLikelihood(self):
+        return self.Data[:, len(self.Schema) + 1]
+
+    @LogLikelihood.setter
+    def LogLikelihood(self, vs):
+        self.Data[:, len(self.Schema) + 1] = vs
+
+    @property
+    def LogPosterior(self):
+        return self.LogPrior + self.LogLikelihood
+
+    def keys(self):
+        return self.Schema.Index.keys()
+
+    def __contains__(self, item):
+        return item in self.Schema
+
+    def __getitem__(self, item):
+        """
+        :param item: str for a column of a locus, int for a chromosome
+        :return: a view of the column or a CompactChromosome
+        """
+        if isinstance(item, str):
+            return self.Data[:, self.Schema.Index[item]]
+        k = len(self.Schema)
+        row = self.Data[item]
+        gene = CompactChromosome(self.Schema, row[:k])
+        gene.LogPrior = None if np.isnan(row[k]) else float(row[k])
+        gene.LogLikelihood = None if np.isnan(row[k + 1]) else float(row[k + 1])
+        return gene
+
+    def __setitem__(self, key, value):
+        if isinstance(key, str):
+            self.Data[:, self.Schema.Index[key]] = value
+            return
+        k = len(self.Schema)
+        if isinstance(value, CompactChromosome) and value.Schema is self.Schema:
+            self.Data[key, :k] = value.Values
+        else:
+            self.Data[key, :k] = [value[name] for name in self.Schema.Names]
+        self.Data[key, k] = np.nan if value.LogPrior is None else value.LogPrior
+        self.Data[key, k + 1] = np.nan if value.LogLikelihood is None else value.LogLikelihood
+
+    def __iter__(self):
+        for i in range(self.Size):
+            yield self[i]
+
+    def resample(self, index):
+        """
+        Draw particles by their indices
+        :param index: array-like of integers or booleans
+        :return: ChromosomeBatch, a new batch with the selected particles
+        """
+        batch = ChromosomeBatch.__new__(ChromosomeBatch)
+        batch.Schema = self.Schema
+        batch.Data = np.asfortranarray(self.Data[np.asarray(index)])
+        return batch
+
+    def clone(self):
+        return self.resample(slice(None))
+
+    def perturb(self, steps, rows=None):
+        """
+        Shift loci in place; the probabilities of the shifted particles are reset
+        :param steps: dict(name: scalar or array), values added to the loci
+        :param rows: indices of particles to be shifted; None for all
+        """
+        rows = slice(None) if rows is None else np.asarray(rows)
+        k = len(self.Schema)
+        for name, step in steps.items():
+            i = self.Schema.Index[name]
+            self.Data[rows, i] += step
+        if steps:
+            self.Data[rows, k:] = np.nan
+
+    def reset_probability(self):
+        self.Data[:, len(self.Schema):] = np.nan
+
+    def mean(self, wts=None):
+        """
+        (Weighted) mean of each locus
+        :param wts: weights of particles; None for equal weights
+        :return: dict(name: mean)
+        """
+        if wts is None:
+            mu = self.Values.mean(0)
+        else:
+            wts = np.asarray(wts, dtype=np.float64)
+            mu = wts.dot(self.Values) / wts.sum()
+        return dict(zip(self.Schema.Names, mu.tolist()))
+
+    def summarise(self, wts=None):
+        """
+        Summary statistics of each locus
+        :param wts: weights of particles; None for equal weights
+        :return: pd.DataFrame in the layout of pd.DataFrame.describe
+        """
+        if wts is None:
+            return self.to_data_frame().describe()
+
+        wts = np.asarray(wts, dtype=np.float64)
+        wts = wts / wts.sum()
+        vs = self.Values
+        mu = wts.dot(vs)
+        sd = np.sqrt(wts.dot((vs - mu) ** 2))
+        qs = np.array([[_weighted_quantile(vs[:, i], wts, q) for q in (0.25, 0.5, 0.75)]
+                       for i in range(vs.shape[1])]).reshape((-1, 3))
+        return pd.DataFrame({
+            'count': np.full(vs.shape[1], 1 / np.sum(wts * wts)),
+            'mean': mu,
+            'std': sd,
+            'min': vs.min(0),
+            '25%': qs[:, 0],
+            '50%': qs[:, 1],
+            '75%': qs[:, 2],
+            'max': vs.max(0)
+        }, index=list(self.Schema.Names)).T
+
+    def to_array(self):
+        """
+        :return: np.ndarray, a view of loci values (n, len(schema))
+        """
+        return self.Values
+
+    def to_data_frame(self):
+        """
+        :return: pd.DataFrame sharing memory with the batch; columns are loci, LogPrior and LogLikelihood
+        """
+        cols = list(self.Schema.Names) + ['LogPrior', 'LogLikelihood']
+        return pd.DataFrame(self.Data, columns=cols, copy=False)
+
+    def to_json(self):
+        return [gene.to_json() for gene in self]
+
+    def __repr__(self):
+        return 'ChromosomeBatch(Size: {}, Loci: {})'.format(self.Size, ', '.join(self.Schema.Names))
+
+
+def as_population(genes):
+    """
+    Collect chromosomes into a ChromosomeBatch if they are compact and share a schema
+    :param genes: list of chromosomes
+    :return: ChromosomeBatch if applicable, the list otherwise
+    """
+    if isinstance(genes, ChromosomeBatch) or not genes:
+        return genes
+    sc = getattr(genes[0], 'Schema', None)
+    if sc is not None and all(isinstance(g, CompactChromosome) and g.Schema is sc for g in genes):
+        return ChromosomeBatch.from_chromosomes(genes, sc)
+    return genes
@@ -62,6 +62,7 @@ class BayesianNetwork:
         self.__rv_roots = None
         self.__leaves = None
         self.__exo = None
+        self.__plans = dict()
 
     def append_loci(self, loci, **kwargs):
         if nx.is_frozen(self.DAG):
@@ -110,25 +111,6 @@ class BayesianNetwork:
         assert fn_name not in self.UserDefinedFunctions
         self.UserDefinedFunctions[fn_name] = fn
 
-    def __check_edges(self):
-        exo = set()
-        for node in self.DAG.order():
-            loci = self[node]
-            pars = set(loci.Parents)
-            for k in list(self.DAG.parents(node)):
-                if k not in pars:
-                    self.DAG.remove_edge(k, node)
-            pars.difference_update(self.DAG.parents(node))
-            exo.update(pars)
-
-        for node in exo:
-            self.append_loci(ExoValueLoci(node))
-
-        exo = find_exo(self)
-        for node in exo:
-            if not self.DAG.children(node):
-                self.DAG.remove_node(node)
-
     def complete(self):
         nx.freeze(self.DAG)
         self.__order = self.DAG.order()
@@ -148,6 +130,7 @@ class BayesianNetwork:
         self.__rv_roots = None
         self.__leaves = None
         self.__exo = None
+        self.__plans = dict()
 
     def is_frozen(self):
         return nx.is_frozen(self.DAG)
@@ -216,14 +199,46 @@ class BayesianNetwork:
     def sort(self, nodes):
         return [node for node in self.Order if node in nodes]
 
+    def get_propagation_plan(self, fixed, floating=None):
+        """
+        Find the nodes to be re-rendered after some nodes changed; plans of a frozen network are cached
+        :param fixed: iterable, nodes given new values
+        :param floating: iterable, nodes to be re-sampled
+        :return: tuple of the nodes to be re-rendered in topological order
+        """
+        fixed = frozenset(fixed)
+        floating = frozenset(floating) if floating else frozenset()
+        key = fixed, floating
+        try:
+            return self.__plans[key]
+        except KeyError:
+            pass
+
+        shocked = set(floating)
+        for k in fixed | floating:
+            shocked.update(nx.descendants(self.DAG, k))
+        shocked.difference_update(fixed)
+        plan = tuple(self.sort(shocked))
+        if self.is_frozen():
+            self.__plans[key] = plan
+        return plan
+
     def clone(self):
         return bayes_net_from_json(self.to_json())
 
     def to_json(self):
-        return self.json if self.is_frozen() else form_js(self)
+        if not self.is_frozen():
+            return form_js(self)
+        if self.json is None:
+            self.json = form_js(self)
+        return self.json
 
     def to_script(self):
-        return self.script if self.is_frozen() else form_script(self)
+        if not self.is_frozen():
+            return form_script(self)
+        if self.script is None:
+            self.script = form_script(self)
+        return self.script
 
     def __str__(self):
         return self.to_script()
@@ -232,36 +247,68 @@ class BayesianNetwork:
         return 'BayesNet(Name: {}, Nodes: {})'.format(self.Name, self.Order)
 
     def merge(self, name, sub_bn):
+        """
+        Merge a sub-network into a copy of this network; the nodes defined in sub_bn replace their counterparts
+        :param name: name of the merged network
+        :param sub_bn: BayesianNetwork, the network providing new definitions
+        :return: BayesianNetwork, a defrosted network sharing unchanged loci with this one
+        """
         assert name != self.Name and name != sub_bn.Name
 
         bn = self.copy(name)
         bn.defrost()
+        bn.__apply_diff(sub_bn)
+        bn.UserDefinedFunctions.update(sub_bn.UserDefinedFunctions)
+        return bn
+
+    def __apply_diff(self, sub_bn):
+        g = self.DAG
+        detached = set()
         for node in sub_bn.Order:
             if sub_bn.is_exogenous(node):
                 continue
-            if node in bn:
-                bn.DAG.remove_node(node)
-            bn.append_from_js(sub_bn[node].to_json())
+            attr = dict(sub_bn.DAG.nodes[node])
+            if node in g:
+                detached.update(g.parents(node))
+                g.remove_in_edges(node)
+                g.nodes[node].clear()
+            g.add_node(node, **attr)
+
+            for pa in attr['loci'].Parents:
+                if pa not in g:
+                    g.add_node(pa, loci=ExoValueLoci(pa))
+                g.add_edge(pa, node)
+
+        if not g.check_acyclic():
+            raise AttributeError('The node causes cyclic paths')
 
-        bn.__check_edges()
-        bn.UserDefinedFunctions.update(self.UserDefinedFunctions)
-        bn.UserDefinedFunctions.update(sub_bn.UserDefinedFunctions)
-        return bn
+        for node in detached:
+            if node in g and isinstance(self[node], ExoValueLoci) and not g.children(node):
+                g.remove_node(node)
 
     def copy(self, new_name=None):
+        """
+        Copy the network. Loci are shared with the original; the graph structure of a frozen network is shared
+        as well and will be duplicated only if the copy is defrosted
+        :param new_name: name of the copy
+        :return: BayesianNetwork
+        """
         if not new_name:
             new_name = self.Name
         bn = BayesianNetwork(new_name)
 
         if self.is_frozen():
-            for node in self.json['Nodes']:
-                bn.append_from_js(node)
-
-            bn.complete()
-
+            bn.DAG = self.DAG
+            bn.__order = self.__order
+            bn.__roots = self.__roots
+            bn.__rv_roots = self.__rv_roots
+            bn.__leaves = self.__leaves
+            bn.__exo = self.__exo
+            bn.__plans = self.__plans
+            bn.json = dict(self.json, Name=new_name) if self.json else None
+            bn.script = self.script if new_name == self.Name else None
         else:
-            for node in self.DAG.nodes():
-                bn.append_from_js(self[node].to_json())
+            bn.DAG = DAG(self.DAG)
         bn.UserDefinedFunctions.update(self.UserDefinedFunctions)
         return bn
 
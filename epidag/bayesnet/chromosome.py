@@ -1,14 +1,20 @@
+from collections.abc import MutableMapping
+from numbers import Real
+from weakref import WeakKeyDictionary
+import numpy as np
 import pandas as pd
-import networkx as nx
 
-__all__ = ['Chromosome']
+__all__ = ['Chromosome', 'ChromosomeSchema', 'CompactChromosome', 'get_schema']
 
 
 class Chromosome:
+    __slots__ = ('Locus', 'LogPrior', 'LogLikelihood', 'PriorTerms')
+
     def __init__(self, vs=None, prior=None):
         self.Locus = dict(vs) if vs else dict()
         self.LogPrior = prior
         self.LogLikelihood = None
+        self.PriorTerms = None
 
     def __len__(self):
         return len(self.Locus)
@@ -41,33 +47,36 @@ class Chromosome:
         :type bn: BayesNet
         :return:
         """
+        imp = {k: v for k, v in new_locus.items() if k in self}
+        if not imp:
+            return
+
         if bn:
-            g = bn.DAG
-            imp = {k: v for k, v in new_locus.items() if k in self}
-            shocked = set.union(*[set(nx.descendants(g, k)) for k in imp.keys()])
-            non_imp = [k for k, v in imp.items() if v is None]
-            imp = {k: v for k, v in imp.items() if v is not None}
-            shocked.difference_update(imp.keys())
-            shocked = shocked.union(non_imp)
-            shocked.intersection_update(self.Locus.keys())
-            self.Locus.update(imp)
-
-            for nod in bn.Order:
-                if nod in shocked:
-                    self[nod] = g.nodes[nod]['loci'].render(self)
-
-            if imp:
-                self.reset_probability()
+            fixed = {k: v for k, v in imp.items() if v is not None}
+            plan = bn.get_propagation_plan(fixed.keys(), [k for k, v in imp.items() if v is None])
+            self._put_locus(fixed)
 
+            nodes = bn.DAG.nodes
+            for nod in plan:
+                if nod in self:
+                    self._put(nod, nodes[nod]['loci'].render(self))
+            # loci beyond new_locus may have changed, so cached terms of the prior are stale
+            self.PriorTerms = None
         else:
-            imp = {k: v for k, v in new_locus.items() if k in self}
-            self.Locus.update(imp)
-            if imp:
-                self.reset_probability()
+            self._put_locus(imp)
+        self.reset_probability()
+
+    def _put(self, key, value):
+        self.Locus[key] = value
+
+    def _put_locus(self, locus):
+        self.Locus.update(locus)
 
     def clone(self):
         g = Chromosome(self.Locus, self.LogPrior)
         g.LogLikelihood = self.LogLikelihood
+        if self.PriorTerms is not None:
+            g.PriorTerms = self.PriorTerms.copy()
         return g
 
     def reset_probability(self):
@@ -91,7 +100,7 @@ class Chromosome:
 
     def to_json(self):
         return {
-            'Locus': self.Locus,
+            'Locus': dict(self.Locus),
             'LogPrior': self.LogPrior,
             'LogLikelihood': self.LogLikelihood
         }
@@ -113,14 +122,155 @@ class Chromosome:
 
     @staticmethod
     def summarise(genes):
-        df = pd.DataFrame([gene.Locus for gene in genes])
+        df = pd.DataFrame([dict(gene) for gene in genes])
         return df.describe()
 
     @staticmethod
     def mean(genes):
-        df = pd.DataFrame([gene.Locus for gene in genes])
+        df = pd.DataFrame([dict(gene) for gene in genes])
         return dict(df.mean())
 
     @staticmethod
     def to_data_frame(genes):
         return pd.DataFrame([gene.to_data() for gene in genes])
+
+
+class ChromosomeSchema:
+    __slots__ = ('Names', 'Index')
+
+    def __init__(self, names):
+        """
+        Mapping from the names of loci to the slots of a value vector
+        :param names: ordered names of loci
+        """
+        self.Names = tuple(names)
+        self.Index = {k: i for i, k in enumerate(self.Names)}
+
+    def __len__(self):
+        return len(self.Names)
+
+    def __iter__(self):
+        return iter(self.Names)
+
+    def __contains__(self, item):
+        return item in self.Index
+
+    def __getitem__(self, item):
+        return self.Index[item]
+
+    def __repr__(self):
+        return 'Schema({})'.format(', '.join(self.Names))
+
+
+_Schemas = WeakKeyDictionary()
+
+
+def get_schema(bn, nodes):
+    """
+    Find the schema of a set of nodes; the schema is shared by every query on the same network and nodes
+    :param bn: BayesianNetwork, source network
+    :param nodes: iterable, names of the nodes
+    :return: ChromosomeSchema with the nodes sorted in the order of bn
+    """
+    nodes = frozenset(nodes)
+    try:
+        schemas = _Schemas[bn]
+    except KeyError:
+        schemas = _Schemas[bn] = dict()
+    try:
+        return schemas[nodes]
+    except KeyError:
+        sc = schemas[nodes] = ChromosomeSchema(bn.sort(nodes))
+        return sc
+
+
+def _as_float(key, value):
+    if not isinstance(value, Real):
+        raise TypeError('Locus {} of a compact chromosome must be a real number, not {}'.format(
+            key, type(value).__name__))
+    return float(value)
+
+
+class CompactLocus(MutableMapping):
+    """
+    Write-through mapping onto the value vector of a compact chromosome; loci can be changed but not removed
+    """
+    __slots__ = ('Gene',)
+
+    def __init__(self, gene):
+        self.Gene = gene
+
+    def __getitem__(self, item):
+        return self.Gene[item]
+
+    def __setitem__(self, key, value):
+        self.Gene._put(key, value)
+
+    def __delitem__(self, key):
+        raise TypeError('Loci of a compact chromosome cannot be removed')
+
+    def __iter__(self):
+        return iter(self.Gene.Schema.Names)
+
+    def __len__(self):
+        return len(self.Gene.Schema)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class CompactChromosome(Chromosome):
+    """
+    Chromosome with numeric values stored in a float64 vector indexed by a shared schema
+    """
+    __slots__ = ('Schema', 'Values')
+
+    def __init__(self, schema, vs=None, prior=None):
+        self.Schema = schema
+        if isinstance(vs, np.ndarray):
+            self.Values = np.array(vs, dtype=np.float64)
+        else:
+            self.Values = np.full(len(schema), np.nan)
+            if vs:
+                self._put_locus(dict(vs))
+        self.LogPrior = prior
+        self.LogLikelihood = None
+        self.PriorTerms = None
+
+    @property
+    def Locus(self):
+        return CompactLocus(self)
+
+    def __len__(self):
+        return len(self.Schema)
+
+    def __iter__(self):
+        return zip(self.Schema.Names, self.Values.tolist())
+
+    def __getitem__(self, item):
+        return self.Values[self.Schema.Index[item]]
+
+    def __setitem__(self, key, value):
+        self._put(key, value)
+        self.reset_probability()
+
+    def __contains__(self, item):
+        return item in self.Schema.Index
+
+    def keys(self):
+        return self.Schema.Index.keys()
+
+    def _put(self, key, value):
+        self.Values[self.Schema.Index[key]] = _as_float(key, value)
+
+    def _put_locus(self, locus):
+        index = self.Schema.Index
+        for k, v in locus.items():
+            self.Values[index[k]] = _as_float(k, v)
+
+    def clone(self):
+        g = CompactChromosome(self.Schema, self.Values, self.LogPrior)
+        g.LogLikelihood = self.LogLikelihood
+        if self.PriorTerms is not None:
+            g.PriorTerms = self.PriorTerms.copy()
+        return g
@@ -110,7 +110,7 @@ class DAG(nx.DiGraph):
         :param node: targeted node
         """
         for par in self.parents(node):
-            self.remove_edge(node, par)
+            self.remove_edge(par, node)
 
     def remove_upstream(self, nodes):
         if not isinstance(nodes, list):
@@ -147,13 +147,11 @@ def merge_dag(g1, g2):
 
 
 def minimal_dag(g, nodes):
-    nodes = g.sort(nodes)
+    nodes = set(nodes)
     to_collect = set(nodes)
-
-    for i in range(len(nodes)):
-        for j in range(i, len(nodes)):
-            for pth in nx.all_simple_paths(g, nodes[i], nodes[j]):
-                to_collect.update(pth)
+    if nodes:
+        # the nodes on the paths between the given nodes are their descendants and ancestors at once
+        to_collect.update(set.intersection(g.upstream(nodes), g.downstream(nodes)))
 
     return g.subgraph(to_collect)
 
@@ -1,7 +1,8 @@
 from abc import ABCMeta, abstractmethod
 import re
+import numpy as np
 from epidag.util import *
-from epidag.distribution import parse_distribution
+from epidag.distribution import parse_distribution, parse_distribution_batch
 
 __author__ = 'TimeWz667'
 __all__ = ['ValueLoci', 'ExoValueLoci', 'DistributionLoci', 'FunctionLoci', 'PseudoLoci',
@@ -23,6 +24,25 @@ class Loci(metaclass=ABCMeta):
     def evaluate(self, parents=None):
         pass
 
+    def render_batch(self, cols, n):
+        """
+        Render values for the rows of a table
+        :param cols: dict(name: np.ndarray), columns of the table
+        :param n: number of rows
+        :return: np.ndarray, rendered values of the rows
+        """
+        pas = list(self.Parents)
+        return np.array([self.render({pa: cols[pa][i] for pa in pas}) for i in range(n)])
+
+    def evaluate_batch(self, cols, n):
+        """
+        Evaluate the log-density over the rows of a table
+        :param cols: dict(name: np.ndarray), columns of the table
+        :param n: number of rows
+        :return: np.ndarray, log-densities of the rows
+        """
+        return np.zeros(n)
+
     def fill(self, gene):
         gene[self.Name] = self.render(gene)
 
@@ -57,6 +77,9 @@ class ValueLoci(Loci):
     def render(self, pas=None):
         return self.Value
 
+    def render_batch(self, cols, n):
+        return np.full(n, self.Value)
+
     def evaluate(self, pas=None):
         return 0
 
@@ -91,6 +114,12 @@ class ExoValueLoci(Loci):
         except KeyError:
             raise KeyError('Exogenous variable not found')
 
+    def render_batch(self, cols, n):
+        try:
+            return np.asarray(cols[self.Name])
+        except KeyError:
+            raise KeyError('Exogenous variable not found')
+
     def evaluate(self, pas=None):
         return 0
 
@@ -127,12 +156,101 @@ class DistributionLoci(Loci):
     def render(self, pas=None):
         return self.get_distribution(pas).sample()
 
+    def render_batch(self, cols, n):
+        if not n:
+            return np.empty(0)
+
+        batch, groups = self.__split(cols)
+        if batch is not None:
+            try:
+                vs = batch.sample(n)
+                if np.shape(vs) == (n, ):
+                    return np.asarray(vs)
+            except (TypeError, ValueError, AttributeError, KeyError):
+                pass
+
+        vs = None
+        for rows, dist in groups:
+            if rows is None:
+                return self.__sample(dist, n)
+            sub = self.__sample(dist, len(rows))
+            if vs is None:
+                vs = np.empty(n, dtype=sub.dtype)
+            vs[rows] = sub
+        return vs
+
+    def __split(self, cols):
+        """
+        Find the distributions of the rows of a non-empty table
+        :param cols: dict(name: np.ndarray), columns of the table
+        :return: (batch, groups); batch is a distribution with array parameters over the rows, None if unavailable
+        or invalid for any row, whose distribution then raises as in the scalar case;
+        groups iterates (rows, distribution) over the distinct configurations of the parents, rows being None for all
+        """
+        pas = list(self.Parents)
+        varying = [pa for pa in pas if np.ndim(cols[pa]) and np.any(cols[pa] != cols[pa][0])]
+
+        if not varying:
+            loc = {pa: (cols[pa][0] if np.ndim(cols[pa]) else cols[pa]) for pa in pas}
+            return None, [(None, self.get_distribution(loc))]
+
+        try:
+            batch = parse_distribution_batch(self.Func, {pa: cols[pa] for pa in pas})
+        except (TypeError, ValueError, AttributeError, KeyError):
+            batch = None
+        return batch, self.__iter_groups(cols, pas)
+
+    def __iter_groups(self, cols, pas):
+        # one distribution per distinct configuration of the parents
+        groups = dict()
+        for i, key in enumerate(zip(*[cols[pa] for pa in pas])):
+            groups.setdefault(key, []).append(i)
+
+        for key, rows in groups.items():
+            yield np.array(rows), self.get_distribution(dict(zip(pas, key)))
+
+    @staticmethod
+    def __sample(dist, n):
+        vs = dist.sample(n)
+        return np.full(1, vs) if n == 1 else np.asarray(vs)
+
     def fill(self, gene):
         gene[self.Name] = self.render(gene)
 
     def evaluate(self, pas=None):
         return self.get_distribution(pas).logpdf(pas[self.Name])
 
+    def evaluate_batch(self, cols, n):
+        if not n:
+            return np.empty(0)
+
+        vs = cols[self.Name]
+        batch, groups = self.__split(cols)
+        if batch is not None:
+            try:
+                lps = np.asarray(batch.logpdf(vs), dtype=np.float64)
+                if lps.shape == (n, ):
+                    return lps
+            except (TypeError, ValueError, AttributeError, KeyError):
+                pass
+
+        lps = np.empty(n)
+        for rows, dist in groups:
+            if rows is None:
+                return self.__logpdf(dist, vs, n)
+            lps[rows] = self.__logpdf(dist, vs[rows], len(rows))
+        return lps
+
+    @staticmethod
+    def __logpdf(dist, vs, n):
+        try:
+            lps = np.asarray(dist.logpdf(vs), dtype=np.float64)
+            if lps.shape == (n, ):
+                return lps
+        except (TypeError, ValueError, AttributeError, KeyError):
+            pass
+        return np.array([dist.logpdf(v) for v in vs], dtype=np.float64)
+
     def to_json(self):
         js = Loci.to_json(self)
         js['Type'] = 'Distribution'
@@ -166,6 +284,16 @@ class FunctionLoci(Loci):
         except (NameError, KeyError) as e:
             raise KeyError('Exogenous variable {} should be defined'.format(e.args[0]))
 
+    def render_batch(self, cols, n):
+        loc = {pa: cols[pa] for pa in self.Parents}
+        try:
+            vs = np.asarray(self.Func.execute(loc))
+            return np.array(np.broadcast_to(vs, (n, )))
+        except (NameError, KeyError) as e:
+            raise KeyError('Exogenous variable {} should be defined'.format(e.args[0]))
+        except (TypeError, ValueError):
+            return Loci.render_batch(self, cols, n)
+
     def evaluate(self, pas=None):
         return 0
 
@@ -202,6 +330,12 @@ class PseudoLoci(Loci):
     def evaluate(self, pas=None):
         raise AttributeError('Pseudo node can not be evaluated')
 
+    def render_batch(self, cols, n):
+        raise AttributeError('Pseudo node can not be implemented')
+
+    def evaluate_batch(self, cols, n):
+        raise AttributeError('Pseudo node can not be evaluated')
+
     def fill(self, gene):
         raise AttributeError('Pseudo node can not be implemented')
 
@@ -1 +1,4 @@
-__author__ = 'TimeWz667'
\ No newline at end of file
+from epidag.causality.mcausal import *
+from epidag.causality.fn import *
+
+__author__ = 'TimeWz667'
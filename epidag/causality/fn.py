@@ -1 +1,50 @@
-__author__ = 'TimeWz667'
\ No newline at end of file
+from epidag.bayesnet import BayesianNetwork
+from epidag.bayesnet.loci import ValueLoci
+from epidag.causality.mcausal import CausalModel
+
+__author__ = 'TimeWz667'
+__all__ = ['mutilate', 'estimate_interventions', 'average_treatment_effect']
+
+
+def mutilate(bn, do, name=None):
+    """
+    Cut the incoming edges of intervened nodes and fix their values
+    :param bn: BayesianNetwork, a Bayesian network
+    :param do: dict(node: value), interventions
+    :param name: name of the mutilated network
+    :return: BayesianNetwork, the mutilated network
+    """
+    name = name if name else '{}_do'.format(bn.Name)
+    sub = BayesianNetwork('{}_sub'.format(name))
+    for k, v in do.items():
+        sub.append_loci(ValueLoci(k, v))
+    bn_do = bn.merge(name, sub)
+    bn_do.complete()
+    return bn_do
+
+
+def estimate_interventions(bn, scenarios, outcomes, n=1000, exo=None):
+    """
+    Estimate the expected outcomes under interventions
+    :param bn: BayesianNetwork, a frozen Bayesian network
+    :param scenarios: dict(name: dict(node: value)) or list of dict(node: value), interventions
+    :param outcomes: list, outcome nodes
+    :param n: number of draws per scenario
+    :param exo: dict, values of exogenous nodes
+    :return: pd.DataFrame, means of outcomes indexed by scenarios
+    """
+    return CausalModel(bn, exo).expectation(scenarios, outcomes, n)
+
+
+def average_treatment_effect(bn, treatment, control, outcomes, n=1000, exo=None):
+    """
+    Estimate the average treatment effects, E[Y|do(treatment)] - E[Y|do(control)]
+    :param bn: BayesianNetwork, a frozen Bayesian network
+    :param treatment: dict(node: value), the treatment intervention
+    :param control: dict(node: value), the control intervention
+    :param outcomes: list, outcome nodes
+    :param n: number of paired draws
+    :param exo: dict, values of exogenous nodes
+    :return: pd.DataFrame with the effects (ATE) and their standard errors (SE) of outcomes
+    """
+    return CausalModel(bn, exo).average_treatment_effect(treatment, control, outcomes, n)
@@ -0,0 +1,187 @@
+import numpy as np
+import numpy.random as rd
+import pandas as pd
+from epidag.bayesnet.loci import DistributionLoci
+from epidag.distribution import parse_distribution_batch
+
+__author__ = 'TimeWz667'
+__all__ = ['CausalModel']
+
+
+def _render_crn(loci, cols, us, n):
+    """
+    Render a random node by the inverse cdf of given uniform numbers, so that scenarios share their random numbers
+    """
+    try:
+        dist = parse_distribution_batch(loci.Func, {pa: cols[pa] for pa in loci.Parents})
+        vs = np.asarray(dist.Dist.ppf(us), dtype=np.float64)
+        if vs.shape == (n, ) and not np.isnan(vs).any():
+            return vs
+    except (TypeError, ValueError, AttributeError, KeyError):
+        pass
+    return loci.render_batch(cols, n)
+
+
+class CausalModel:
+    """
+    Estimate interventional distributions of a Bayesian network by batched Monte Carlo.
+    The incoming edges of intervened nodes are cut; all the scenarios are sampled at once
+    with common random numbers: random nodes unaffected by interventions are drawn once and shared,
+    and affected random nodes are drawn by the inverse cdf of uniform numbers shared among scenarios.
+    """
+    def __init__(self, bn, exo=None):
+        """
+        :param bn: BayesianNetwork, a frozen Bayesian network
+        :param exo: dict, values of exogenous nodes
+        """
+        if not bn.is_frozen():
+            raise AttributeError('The network should be frozen')
+        self.BN = bn
+        self.Exo = dict(exo) if exo else dict()
+        self.Plans = dict()
+
+    def get_plan(self, do, outcomes):
+        """
+        Find the nodes to be rendered in the mutilated network
+        :param do: iterable, intervened nodes
+        :param outcomes: iterable, outcome nodes
+        :return: tuple of nodes in topological order
+        """
+        key = frozenset(do), frozenset(outcomes)
+        try:
+            return self.Plans[key]
+        except KeyError:
+            pass
+
+        g = self.BN.DAG
+        do, required = key[0], set(key[1])
+        to_visit = list(required)
+        while to_visit:
+            node = to_visit.pop()
+            if node in do:
+                continue
+            for pa in g.predecessors(node):
+                if pa not in required:
+                    required.add(pa)
+                    to_visit.append(pa)
+
+        plan = tuple(self.BN.sort(required.difference(do)))
+        for nod in plan:
+            if self.BN.is_exogenous(nod) and nod not in self.Exo:
+                raise ValueError('Exogenous node {} needed'.format(nod))
+        self.Plans[key] = plan
+        return plan
+
+    def sample(self, scenarios, outcomes, n=1000):
+        """
+        Sample outcomes under interventions
+        :param scenarios: dict(name: dict(node: value)) or list of dict(node: value), interventions
+        :param outcomes: list, outcome nodes
+        :param n: number of draws per scenario
+        :return: pd.DataFrame with a column 'Scenario', a column 'Draw' and a column for each outcome
+        """
+        if not isinstance(scenarios, dict):
+            scenarios = dict(enumerate(scenarios))
+        outcomes = list(outcomes)
+        bn = self.BN
+
+        groups = dict()
+        for name, do in scenarios.items():
+            groups.setdefault(frozenset(do.keys()), []).append(name)
+
+        plans = {do: self.get_plan(do, outcomes) for do in groups}
+        needed = set.union(*[set(plan) for plan in plans.values()])
+        affected = set()
+        for do in groups:
+            if do:
+                affected.update(do)
+                affected.update(bn.get_propagation_plan(do))
+
+        # nodes unaffected by any intervention: drawn once for all scenarios
+        cols = dict()
+        for nod in bn.Order:
+            if nod in needed and nod not in affected:
+                if bn.is_exogenous(nod):
+                    cols[nod] = np.array(np.broadcast_to(self.Exo[nod], (n, )))
+                else:
+                    cols[nod] = bn[nod].render_batch(cols, n)
+
+        us = {nod: rd.random(n) for nod in bn.Order
+              if nod in needed and nod in affected and isinstance(bn[nod], DistributionLoci)}
+
+        res = list()
+        for do, names in groups.items():
+            s = len(names)
+            m = s * n
+            plan = plans[do]
+            g_cols = {k: np.tile(v, s) for k, v in cols.items()}
+            for k in do:
+                g_cols[k] = np.repeat([scenarios[name][k] for name in names], n)
+
+            for nod in plan:
+                if nod in g_cols:
+                    continue
+                if nod in us:
+                    g_cols[nod] = _render_crn(bn[nod], g_cols, np.tile(us[nod], s), m)
+                elif bn.is_exogenous(nod):
+                    g_cols[nod] = np.tile(np.broadcast_to(self.Exo[nod], (n, )), s)
+                else:
+                    g_cols[nod] = bn[nod].render_batch(g_cols, m)
+
+            df = pd.DataFrame({k: g_cols[k] for k in outcomes})
+            df.insert(0, 'Draw', np.tile(np.arange(n), s))
+            df.insert(0, 'Scenario', np.repeat(names, n))
+            res.append(df)
+
+        res = pd.concat(res, ignore_index=True)
+        order = {name: i for i, name in enumerate(scenarios)}
+        res = res.sort_values(['Scenario', 'Draw'], key=lambda x: x.map(order) if x.name == 'Scenario' else x)
+        return res.reset_index(drop=True)
+
+    def expectation(self, scenarios, outcomes, n=1000):
+        """
+        Estimate the expected outcomes under interventions
+        :param scenarios: dict(name: dict(node: value)) or list of dict(node: value), interventions
+        :param outcomes: list, outcome nodes
+        :param n: number of draws per scenario
+        :return: pd.DataFrame, means of outcomes indexed by scenarios
+        """
+        if not isinstance(scenarios, dict):
+            scenarios = dict(enumerate(scenarios))
+        sims = self.sample(scenarios, outcomes, n)
+        return sims.groupby('Scenario', sort=False)[list(outcomes)].mean().reindex(list(scenarios))
+
+    def average_treatment_effect(self, treatment, control, outcomes, n=1000):
+        """
+        Estimate the average treatment effects, E[Y|do(treatment)] - E[Y|do(control)]
+        :param treatment: dict(node: value), the treatment intervention
+        :param control: dict(node: value), the control intervention
+        :param outcomes: list, outcome nodes
+        :param n: number of paired draws
+        :return: pd.DataFrame with the effects (ATE) and their standard errors (SE) of outcomes
+        """
+        outcomes = list(outcomes)
+        sims = self.sample({'Treatment': treatment, 'Control': control}, outcomes, n)
+        ys = sims.set_index(['Scenario', 'Draw'])[outcomes]
+        diff = ys.loc['Treatment'].to_numpy(dtype=np.float64) - ys.loc['Control'].to_numpy(dtype=np.float64)
+        return pd.DataFrame({
+            'ATE': diff.mean(0),
+            'SE': diff.std(0, ddof=1) / np.sqrt(n)
+        }, index=outcomes)
+
+    def sweep(self, node, levels, outcomes, n=1000):
+        """
+        Estimate the expected outcomes over levels of an intervention
+        :param node: intervened node
+        :param levels: iterable, values of the intervention
+        :param outcomes: list, outcome nodes
+        :param n: number of draws per level
+        :return: pd.DataFrame, means of outcomes indexed by levels
+        """
+        levels = list(levels)
+        res = self.expectation([{node: lv} for lv in levels], outcomes, n)
+        res.index = pd.Index(levels, name=node)
+        return res
+
+    def __repr__(self):
+        return 'CausalModel({})'.format(self.BN.Name)
@@ -8,7 +8,7 @@ import epidag.factory.arguments as vld
 
 __author__ = 'TimeWz667'
 __all__ = ['AbsDistribution', 'SpDouble', 'SpInteger', 'DistributionCentre',
-           'parse_distribution', 'CategoricalRV']
+           'parse_distribution', 'parse_distribution_batch', 'CategoricalRV']
 
 
 class AbsDistribution(metaclass=ABCMeta):
@@ -327,7 +327,8 @@ def d_binom(size, prob):
     return SpInteger(sts.binom(n=size, p=prob))
 
 
-DistributionCentre.register('binom', d_binom, [vld.PositiveInteger('size', default=1),
+# bounds of Integer are exclusive; a size of zero gives the point mass at zero
+DistributionCentre.register('binom', d_binom, [vld.Integer('size', lower=-1, default=1),
                                                vld.Prob('prob', default=0.5)])
 
 
@@ -345,6 +346,17 @@ def parse_distribution(di, loc=None):
     return DistributionCentre.parse(di, loc=loc)
 
 
+def parse_distribution_batch(di, loc):
+    """
+    Parse a distribution with array-valued arguments, validated as in parse_distribution
+    :param di: definition of the distribution
+    :param loc: dict, values of the parents; values can be arrays
+    :return: a distribution whose parameters are arrays
+    :raise ValidationError: if the arguments of any row are invalid
+    """
+    return DistributionCentre.parse_batch(di, loc=loc)
+
+
 if __name__ == '__main__':
     dists = [
         'exp(0.01)',
@@ -1,4 +1,5 @@
 import inspect
+import numpy as np
 from epidag.util import parse_function, ParsedFunction
 from epidag.factory.arguments import ValidationError, NotNull
 
@@ -51,7 +52,30 @@ class Creator:
                 fil[name] = vld.Default
         return fil
 
-    def parsed_function_to_arguments(self, pf, loc, resources):
+    def correct_batch_arguments(self, args, resources):
+        """
+        Adjust and validate arguments whose values can be arrays over rows.
+        Every distinct combination of values is corrected and validated as a scalar one
+        :param args: arguments; values can be arrays
+        :type args: dict
+        :param resources: external resource of arguments
+        :return: arguments which can be used in construction, arrays for those varying over rows
+        """
+        names = [k for k, v in args.items() if np.ndim(v)]
+        keys = list(zip(*[args[k] for k in names])) if names else [()]
+
+        distinct = dict.fromkeys(keys)
+        for key in distinct:
+            arg = dict(args)
+            arg.update(zip(names, key))
+            arg = self.correct_arguments(arg, resources)
+            self.validate_arguments(arg, resources)
+            distinct[key] = arg
+
+        rows = [distinct[key] for key in keys]
+        return {k: (np.array([row[k] for row in rows]) if k in names else v) for k, v in rows[0].items()}
+
+    def parsed_function_to_kv(self, pf, loc):
         f_args = pf.get_arguments(loc) if loc else pf.get_arguments()
         for i, arg in enumerate(f_args):
             if 'key' not in arg:
@@ -59,7 +83,10 @@ class Creator:
             else:
                 break
 
-        kv = {arg['key']: arg['value'] for arg in f_args}
+        return {arg['key']: arg['value'] for arg in f_args}
+
+    def parsed_function_to_arguments(self, pf, loc, resources):
+        kv = self.parsed_function_to_kv(pf, loc)
         args, meta = self.split_args_meta(kv)
         return self.correct_arguments(args, resources), meta
 
@@ -208,6 +235,25 @@ class Workshop:
 
         return obj
 
+    def parse_batch(self, fn, loc):
+        """
+        Create an object from a string of a function with array-valued local information.
+        The arguments are corrected and validated as in parse, once per distinct combination of values
+        :param fn: f(..., ..., ...)
+        :param loc: local information; values can be arrays
+        :return: object of f
+        """
+        if not isinstance(fn, ParsedFunction):
+            fn = fn.replace(' ', '')
+            pf = parse_function(fn)
+        else:
+            pf = fn
+
+        creator = self.Creators[pf.Function]
+        args, meta = creator.split_args_meta(creator.parsed_function_to_kv(pf, loc))
+        args = creator.correct_batch_arguments(args, self.Resources)
+        return creator.create(args, meta)
+
     def get_form(self, tp):
         return self.Creators[tp].get_form(self.Resources)
 
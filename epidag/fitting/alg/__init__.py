@@ -1,8 +1,9 @@
-#from epidag.fitting.alg.mcmc import MCMC
+from epidag.fitting.alg.mcmc import MCMC
 from epidag.fitting.alg.sir import SIR
 from epidag.fitting.alg.abc import ABC
-#from epidag.fitting.alg.ga import GA
+from epidag.fitting.alg.ga import GA
 from epidag.fitting.alg.abcsmc import ABCSMC
 from epidag.fitting.alg.fitter import Fitter
+from epidag.fitting.alg.executor import *
 
 __author__ = 'TimeWz667'
@@ -1,4 +1,5 @@
 from epidag.fitting import BayesResult
+from epidag.bayesnet import as_population
 from epidag.fitting.alg.fitter import Fitter
 import numpy as np
 
@@ -17,13 +18,7 @@ class ABC(Fitter):
 
         self.info('Testing threshold')
 
-        tests = list()
-
-        while len(tests) < n_test:
-            p = model.sample_prior()
-            li = model.evaluate_likelihood(p)
-            if np.isfinite(li):
-                tests.append(li)
+        _, tests, _ = self.sample_batch(model, n_test)
 
         eps = np.percentile(tests, (1 - p_test) * 100)
 
@@ -31,18 +26,13 @@ class ABC(Fitter):
 
 
         self.info('Collecting posterior parameters')
-        post = list()
-        while len(post) < n_post:
-            p = model.sample_prior()
-            li = model.evaluate_likelihood(p)
-            if li < eps:
-                continue
+        post, lis, _ = self.sample_batch(model, n_post, accept=lambda v: not v < eps)
+        for p, li in zip(post, lis):
             p.LogLikelihood = li
-            post.append(p)
 
         self.info('Completed')
 
-        res = BayesResult(nodes=post, model=model, alg=self)
+        res = BayesResult(nodes=as_population(post), model=model, alg=self)
         res.Benchmarks['Eps'] = eps
         res.Benchmarks['ESS'] = n_post
         res.Benchmarks['Niter'] = n_post
@@ -1,4 +1,5 @@
 from epidag.fitting import BayesResult
+from epidag.bayesnet import as_population
 from epidag.fitting.alg.fitter import Fitter
 import numpy as np
 import numpy.random as rd
@@ -60,7 +61,7 @@ class Steppers:
                     mutated[key] = proposed
                     break
         new.impulse(mutated)
-        new.LogPrior = model.evaluate_prior(new)
+        model.update_prior(new, mutated.keys())
         return new
 
 def wt_sd(vs, wts):
@@ -140,7 +141,7 @@ class ABCSMC(Fitter):
 
         self.info('Completed')
 
-        res = BayesResult(nodes=post, model=model, alg=self)
+        res = BayesResult(nodes=as_population(post), model=model, alg=self)
         res.Benchmarks.update(rec)
         res.Benchmarks['Niter'] = n_post
         return res
@@ -164,14 +165,10 @@ class ABCSMC(Fitter):
             return eps
 
     def __initialise(self, n_post, model):
-        post = list()
-        while len(post) < n_post:
-            p = model.sample_prior()
+        post, ds, _ = self.sample_batch(model, n_post, 'evaluate_distance')
+        for p, di in zip(post, ds):
             p.LogPrior = model.evaluate_prior(p)
-            di = model.evaluate_distance(p)
-            if np.isfinite(di):
-                p.LogLikelihood = - di
-                post.append(p)
+            p.LogLikelihood = - di
 
         d0 = [-p.LogLikelihood for p in post]
 
@@ -218,16 +215,19 @@ class ABCSMC(Fitter):
 
         dp = np.zeros(n_post)
 
-        for i in range(n_post):
-            di = float('inf')
-            pars = post[i]
-            while np.isinf(di):
-                pars = steppers.mutate(model, post[i], tau)
-                di = model.evaluate_distance(pars)
-                n_eval += 1
-
-            pars.LogLikelihood = - di
-            dp[i] = di
+        # proposals are evaluated in batches; those of infinite distances are proposed again
+        todo = list(range(n_post))
+        while todo:
+            props = [steppers.mutate(model, post[i], tau) for i in todo]
+            n_eval += len(props)
+            rest = list()
+            for i, pars, di in zip(todo, props, self.evaluate_batch(model, props, 'evaluate_distance')):
+                if np.isinf(di):
+                    rest.append(i)
+                    continue
+                pars.LogLikelihood = - di
+                dp[i] = di
+            todo = rest
 
         act_npp = dp < eps1
 
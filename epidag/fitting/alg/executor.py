@@ -0,0 +1,311 @@
+import os
+from abc import ABCMeta, abstractmethod
+from collections import deque
+from itertools import count
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import Process, current_process
+from multiprocessing.connection import Listener, Client, wait
+import numpy as np
+
+__author__ = 'TimeWz667'
+__all__ = ['AbsExecutor', 'SerialExecutor', 'ThreadExecutor', 'ProcessExecutor', 'SocketExecutor',
+           'SharedMethod', 'get_executor', 'run_worker']
+
+
+# objects shared with the workers of this process, by keys
+_Shared = dict()
+_Keys = count()
+
+
+def _install(shared):
+    _Shared.update(shared)
+
+
+class SharedMethod:
+    """
+    A method of an object shared with the workers; only the key and the name are sent with tasks
+    """
+    __slots__ = ('Key', 'Name')
+
+    def __init__(self, key, name):
+        self.Key = key
+        self.Name = name
+
+    def __call__(self, item):
+        return getattr(_Shared[self.Key], self.Name)(item)
+
+    def __getstate__(self):
+        return self.Key, self.Name
+
+    def __setstate__(self, state):
+        self.Key, self.Name = state
+
+
+def _run_chunk(fn, tasks):
+    """
+    Run a chunk of tasks, reseeding the global random state of numpy before each task
+    :param fn: function of one item
+    :param tasks: list of (seed, item); no reseeding if the seed is None
+    :return: list of results
+    """
+    res = list()
+    for seed, item in tasks:
+        if seed is not None:
+            np.random.seed(seed)
+        res.append(fn(item))
+    return res
+
+
+class AbsExecutor(metaclass=ABCMeta):
+    """
+    Evaluator of batches of tasks. A batch is split into chunks which are run by workers;
+    every task is given a seed drawn from the global random state of the caller,
+    so the results are reproducible and collected in the order of the items
+    """
+    def __init__(self, n_workers=1, chunk_size=None):
+        """
+        :param n_workers: number of workers
+        :param chunk_size: number of tasks per chunk; None for four chunks per worker
+        """
+        self.Size = max(int(n_workers), 1)
+        self.ChunkSize = chunk_size
+        self.Shared = dict()
+
+    def share(self, obj):
+        """
+        Send an object to the workers once, so tasks refer to it by a key instead of carrying it.
+        The workers keep the object as sent; later changes of it are not seen by them
+        :param obj: picklable object
+        :return: key of the object
+        """
+        for key, o in self.Shared.items():
+            if o is obj:
+                return key
+        key = '{}-{}'.format(os.getpid(), next(_Keys))
+        self.Shared[key] = obj
+        self._broadcast(key, obj)
+        return key
+
+    def _broadcast(self, key, obj):
+        _Shared[key] = obj
+
+    def map(self, fn, items, seeded=True):
+        """
+        Evaluate a function over items
+        :param fn: function of one item; picklable for executors with processes
+        :param items: iterable of items
+        :param seeded: True if the global random state is reseeded before every task
+        :return: list of results, in the order of items
+        """
+        items = list(items)
+        n = len(items)
+        if not n:
+            return list()
+        if seeded:
+            seeds = np.random.SeedSequence(np.random.randint(2 ** 31)).generate_state(n).tolist()
+        else:
+            seeds = [None] * n
+        tasks = list(zip(seeds, items))
+
+        size = self.ChunkSize if self.ChunkSize else -(-n // (4 * self.Size))
+        chunks = [tasks[i: i + size] for i in range(0, n, size)]
+        res = list()
+        for rs in self._run(fn, chunks):
+            res += rs
+        return res
+
+    @abstractmethod
+    def _run(self, fn, chunks):
+        """
+        :param fn: function of one item
+        :param chunks: list of lists of (seed, item)
+        :return: list of lists of results, in the order of chunks
+        """
+        pass
+
+    def close(self):
+        for key in self.Shared:
+            _Shared.pop(key, None)
+        self.Shared = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __repr__(self):
+        return '{}(Workers: {})'.format(self.__class__.__name__, self.Size)
+
+
+class SerialExecutor(AbsExecutor):
+    def __init__(self, chunk_size=None):
+        AbsExecutor.__init__(self, 1, chunk_size)
+
+    def _run(self, fn, chunks):
+        # the random state of the caller goes on as if the tasks were run elsewhere
+        state = np.random.get_state()
+        try:
+            return [_run_chunk(fn, chunk) for chunk in chunks]
+        finally:
+            np.random.set_state(state)
+
+
+class ThreadExecutor(AbsExecutor):
+    """
+    Executor of a pool of threads, for models releasing the GIL in evaluation.
+    Threads share the global random state, so tasks are not reseeded
+    """
+    def __init__(self, n_workers=None, chunk_size=None):
+        AbsExecutor.__init__(self, n_workers if n_workers else os.cpu_count(), chunk_size)
+        self.Pool = ThreadPoolExecutor(max_workers=self.Size)
+
+    def map(self, fn, items, seeded=True):
+        return AbsExecutor.map(self, fn, items, seeded=False)
+
+    def _run(self, fn, chunks):
+        return [fut.result() for fut in [self.Pool.submit(_run_chunk, fn, chunk) for chunk in chunks]]
+
+    def close(self):
+        self.Pool.shutdown()
+        AbsExecutor.close(self)
+
+
+class ProcessExecutor(AbsExecutor):
+    def __init__(self, n_workers=None, chunk_size=None):
+        AbsExecutor.__init__(self, n_workers if n_workers else os.cpu_count(), chunk_size)
+        self.Pool = ProcessPoolExecutor(max_workers=self.Size)
+
+    def _broadcast(self, key, obj):
+        # shared objects are installed by the initialiser, once per worker of a new pool
+        self.Pool.shutdown()
+        self.Pool = ProcessPoolExecutor(max_workers=self.Size, initializer=_install, initargs=(dict(self.Shared), ))
+
+    def _run(self, fn, chunks):
+        return [fut.result() for fut in [self.Pool.submit(_run_chunk, fn, chunk) for chunk in chunks]]
+
+    def close(self):
+        self.Pool.shutdown()
+        AbsExecutor.close(self)
+
+
+def run_worker(address, authkey=None):
+    """
+    Serve a SocketExecutor until it closes
+    :param address: address of the executor, as (host, port)
+    :param authkey: bytes, authentication key of the executor
+    """
+    conn = Client(tuple(address), authkey=authkey)
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                break
+            if msg is None:
+                break
+            if msg[0] == 'share':
+                _, key, obj = msg
+                _Shared[key] = obj
+                continue
+            _, i, fn, tasks = msg
+            try:
+                conn.send((i, _run_chunk(fn, tasks), None))
+            except Exception as e:
+                conn.send((i, None, e))
+    finally:
+        conn.close()
+
+
+class SocketExecutor(AbsExecutor):
+    """
+    Executor of workers connected through sockets. Local workers are started with the executor;
+    workers on other processes or hosts can join by calling run_worker with the address and the key
+    """
+    def __init__(self, n_workers=None, chunk_size=None, address=('localhost', 0), authkey=None, n_local=None):
+        """
+        :param n_workers: number of workers to wait for
+        :param chunk_size: number of tasks per chunk
+        :param address: address to listen on
+        :param authkey: bytes, authentication key; None for that of the current process
+        :param n_local: number of workers started locally; None for all
+        """
+        AbsExecutor.__init__(self, n_workers if n_workers else os.cpu_count(), chunk_size)
+        self.AuthKey = authkey if authkey is not None else bytes(current_process().authkey)
+        self.Listener = Listener(address, backlog=self.Size, authkey=self.AuthKey)
+        self.Address = self.Listener.address
+
+        n_local = self.Size if n_local is None else min(n_local, self.Size)
+        self.Processes = [Process(target=run_worker, args=(self.Address, self.AuthKey), daemon=True)
+                          for _ in range(n_local)]
+        for proc in self.Processes:
+            proc.start()
+        self.Connections = [self.Listener.accept() for _ in range(self.Size)]
+
+    def _broadcast(self, key, obj):
+        for conn in self.Connections:
+            conn.send(('share', key, obj))
+
+    def _run(self, fn, chunks):
+        res = [None] * len(chunks)
+        pending = deque(enumerate(chunks))
+        busy = dict()
+
+        def dispatch(conn):
+            i, chunk = pending.popleft()
+            conn.send(('run', i, fn, chunk))
+            busy[conn] = i
+
+        for conn in self.Connections:
+            if not pending:
+                break
+            dispatch(conn)
+
+        error = None
+        while busy:
+            for conn in wait(list(busy)):
+                i, rs, err = conn.recv()
+                del busy[conn]
+                if err is not None:
+                    error = err
+                    pending.clear()
+                res[i] = rs
+                if pending:
+                    dispatch(conn)
+        if error is not None:
+            raise error
+        return res
+
+    def close(self):
+        for conn in self.Connections:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            conn.close()
+        self.Connections = list()
+        for proc in self.Processes:
+            proc.join()
+        self.Processes = list()
+        self.Listener.close()
+        AbsExecutor.close(self)
+
+
+def get_executor(kind='serial', **kwargs):
+    """
+    Make an executor
+    :param kind: 'serial', 'thread', 'process' or 'socket'
+    :param kwargs: arguments of the executor, such as n_workers and chunk_size
+    :return: AbsExecutor
+    """
+    kinds = {
+        'serial': SerialExecutor,
+        'thread': ThreadExecutor,
+        'process': ProcessExecutor,
+        'socket': SocketExecutor
+    }
+    try:
+        cls = kinds[kind]
+    except KeyError:
+        raise KeyError('Unknown executor')
+    return cls(**kwargs)
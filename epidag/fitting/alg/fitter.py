@@ -4,6 +4,7 @@ from scipy.special import logsumexp
 from epidag.monitor import Monitor
 from epidag.fitting import BayesianModel
 from epidag.bayesnet import Chromosome
+from epidag.fitting.alg.executor import AbsExecutor, SerialExecutor, SharedMethod, get_executor
 
 __author__ = 'TimeWz667'
 __all__ = ['Fitter']
@@ -13,6 +14,48 @@ class Fitter(metaclass=ABCMeta):
     def __init__(self, name_logger, **kwargs):
         self.Monitor = Monitor(name_logger)
         self.Parameters = dict(kwargs)
+        self.Executor = SerialExecutor()
+
+    def set_executor(self, executor, **kwargs):
+        """
+        Set the executor evaluating batches of parameters
+        :param executor: AbsExecutor, or the kind of executor; see get_executor
+        :param kwargs: arguments of the executor if a kind is given
+        """
+        if not isinstance(executor, AbsExecutor):
+            executor = get_executor(executor, **kwargs)
+        if executor is not self.Executor:
+            self.Executor.close()
+        self.Executor = executor
+
+    def evaluate_batch(self, model, genes, fn='evaluate_likelihood'):
+        """
+        Evaluate parameters through the executor; the model is sent to the workers once
+        :param model: BayesianModel
+        :param genes: list of Chromosomes
+        :param fn: name of the evaluation method of the model
+        :return: list of values, in the order of genes
+        """
+        return self.Executor.map(SharedMethod(self.Executor.share(model), fn), genes)
+
+    def sample_batch(self, model, n, fn='evaluate_likelihood', accept=np.isfinite):
+        """
+        Sample parameters from the prior and evaluate them in batches until n of them are accepted
+        :param model: BayesianModel
+        :param n: number of accepted parameters
+        :param fn: name of the evaluation method of the model
+        :param accept: function of a value, True if the parameter is accepted
+        :return: list of accepted Chromosomes, list of their values, number of evaluations
+        """
+        genes, vs, n_eval = list(), list(), 0
+        while len(genes) < n:
+            ps = [model.sample_prior() for _ in range(max(n - len(genes), self.Executor.Size))]
+            n_eval += len(ps)
+            for p, v in zip(ps, self.evaluate_batch(model, ps, fn)):
+                if accept(v) and len(genes) < n:
+                    genes.append(p)
+                    vs.append(v)
+        return genes, vs, n_eval
 
     def needs_exact_likelihood(self):
         return False
@@ -1,36 +1,53 @@
-from epidag.fitting.alg.fitter import EvolutionaryFitter
-from epidag.fitting.alg.genetic import *
+import numpy.random as rd
 from epidag.util import resample
+from epidag.bayesnet import as_population
+from epidag.fitting import BayesResult
+from epidag.fitting.alg.fitter import Fitter
+from epidag.fitting.alg.genetic import *
 
-
-class GA(EvolutionaryFitter):
-    DefaultParameters = {
-        'n_population': 100,
-        'n_generation': 20,
-        'p_mutation': 0.1,
-        'p_crossover': 0.1,
-        'target': 'MLE'
-    }
-
-    def __init__(self, model):
-        EvolutionaryFitter.__init__(self, model)
+__author__ = 'TimeWz667'
+__all__ = ['GA']
+
+
+class GA(Fitter):
+    def __init__(self, name_logger='GA', p_mutation=0.1, p_crossover=0.1, max_generation=20, max_stay=5,
+                 target='MLE'):
+        """
+        Genetic algorithm; the offspring of every generation are evaluated in a batch through the executor
+        :param p_mutation: probability of mutation
+        :param p_crossover: probability of crossover
+        :param max_generation: maximum number of generations
+        :param max_stay: number of generations with an unchanged max fitness before termination
+        :param target: 'MLE' or 'MAP'
+        """
+        Fitter.__init__(self, name_logger, p_mutation=p_mutation, p_crossover=p_crossover,
+                        max_generation=max_generation, max_stay=max_stay,
+                        target='MAP' if target == 'MAP' else 'MLE')
         self.Population = list()
-        self.p_mutation = GA.DefaultParameters['p_mutation']
-        self.p_crossover = GA.DefaultParameters['p_crossover']
-        self.n_cycle = GA.DefaultParameters['n_cycle']
+        self.Moveable = list()
+        self.Mutators = list()
+        self.Crossover = None
+        self.Series = list()
+        self.Generation = 0
+        self.Stay = 0
+        self.BestFit = None
+        self.MaxFitness = -float('inf')
+        self.MeanFitness = -float('inf')
+        self.Evaluations = 0
 
-        self.Moveable = self.Model.get_movable_nodes()
+    def fit(self, model, **kwargs):
+        n_post = kwargs['n_post']
+        self.info('Initialising')
+        self.Moveable = model.MovableNodes
         self.Mutators = list()
         self.Crossover = AverageCrossover([d['Name'] for d in self.Moveable])
-        self.Target = GA.DefaultParameters['target']
-
         for d in self.Moveable:
             loci, lo, up = d['Name'], d['Lower'], d['Upper']
-            if d['Type'] is 'Double':
+            if d['Type'] == 'Double':
                 self.Mutators.append(DoubleMutator(loci, lo, up))
-            elif d['Type'] is 'Integer':
+            elif d['Type'] == 'Integer':
                 self.Mutators.append(IntegerMutator(loci, lo, up))
-            elif d['Type'] is 'Binary':
+            elif d['Type'] == 'Binary':
                 self.Mutators.append(BinaryMutator(loci))
 
         self.Series = list()
@@ -38,112 +55,97 @@ class GA(EvolutionaryFitter):
         self.Stay = 0
         self.MaxFitness = -float('inf')
         self.MeanFitness = -float('inf')
-
-    def initialise(self):
-        self.Population = list()
-        self.Series = list()
-        self.Generation = 0
-        self.MaxFitness = -float('inf')
-        self.MeanFitness = -float('inf')
-
-    def fit(self, niter, **kwargs):
-        self.info('Initialising')
-        if 'n_cycle' in kwargs:
-            self.n_cycle = int(kwargs['n_cycle'])
-        if 'p_mutation' in kwargs:
-            self.p_mutation = kwargs['p_mutation']
-        if 'p_crossover' in kwargs:
-            self.p_mutation = kwargs['p_crossover']
-        if 'target' in kwargs:
-            self.Target = 'MLE' if kwargs['target'] == 'MLE' else 'MAP'
-
-        self.initialise()
-        self.__genesis(niter)
-        for i in range(self.n_cycle):
-            self.Generation += 1
-            self.__crossover()
-            self.__mutation()
-            self.__selection()
-            self.__find_elitism()
-            if self.__termination():
-                break
-
+        self.__genesis(model, n_post)
+        self.__evolve(model, self.Parameters['max_generation'])
         self.info('Finished')
-
-    def update(self, n, **kwargs):
+        return self.__result(model)
+
+    def is_updatable(self):
+        return True
+
+    def update(self, res, **kwargs):
+        """
+        Evolve the population further
+        :param res: BayesResult, the result of fit
+        :param kwargs: n_generation, maximum number of generations
+        :return: BayesResult
+        """
         self.info('Updating')
         self.Stay = 0
-        for i in range(n):
+        self.__evolve(res.Model, kwargs['n_generation'])
+        self.info('Finished')
+        return self.__result(res.Model)
+
+    def __result(self, model):
+        res = BayesResult(nodes=as_population(self.Population), model=model, alg=self)
+        res.Benchmarks['Niter'] = self.Evaluations
+        res.Benchmarks['Generation'] = self.Generation
+        res.Benchmarks['MaxFitness'] = self.MaxFitness
+        res.Benchmarks['MeanFitness'] = self.MeanFitness
+        return res
+
+    def __evolve(self, model, n):
+        for _ in range(n):
             self.Generation += 1
-            self.__crossover()
-            self.__mutation()
+            parents = list(self.Population)
+            self.__crossover(model)
+            self.__mutation(model)
+            # offspring are evaluated once, after both operations
+            ids = set(map(id, parents))
+            self.__evaluate(model, [p for p in self.Population if id(p) not in ids])
             self.__selection()
             self.__find_elitism()
             if self.__termination():
                 break
 
-        self.info('Finished')
+    def __genesis(self, model, n):
+        self.Population, lis, self.Evaluations = self.sample_batch(model, n)
+        for p, li in zip(self.Population, lis):
+            model.evaluate_prior(p)
+            p.LogLikelihood = li
 
-    def __genesis(self, n):
-        for _ in range(n):
-            p = self.Model.sample_prior()
-            p.LogLikelihood = self.Model.evaluate_likelihood(p)
-            self.Population.append(p)
+    def __evaluate(self, model, genes):
+        for p, li in zip(genes, self.evaluate_batch(model, genes)):
+            p.LogLikelihood = li
+        self.Evaluations += len(genes)
 
-    def __crossover(self):
+    def __crossover(self, model):
         pop = self.Population
-        n = len(pop)
-        sel = rd.binomial(1, self.p_crossover, int(n / 2))
+        sel = rd.binomial(1, self.Parameters['p_crossover'], int(len(pop) / 2))
 
         for i, s in enumerate(sel):
             if s:
-                p1, p2 = self.Crossover.crossover(pop[i * 2], pop[i * 2 + 1], self.Model.BN)
-                self.Model.evaluate_prior(p1)
-                self.Model.evaluate_prior(p2)
-                p1.LogLikelihood = self.Model.evaluate_likelihood(p1)
-                p2.LogLikelihood = self.Model.evaluate_likelihood(p2)
+                p1, p2 = self.Crossover.crossover(pop[i * 2], pop[i * 2 + 1], model.BN)
+                model.evaluate_prior(p1)
+                model.evaluate_prior(p2)
                 pop[i * 2], pop[i * 2 + 1] = p1, p2
 
-    def __mutation(self):
+    def __mutation(self, model):
+        pop = self.Population
         for node, mut in zip(self.Moveable, self.Mutators):
             i = node['Name']
-            vs = [gene[i] for gene in self.Population]
-            mut.set_scale(vs)
+            mut.set_scale([gene[i] for gene in pop])
 
-        pop = self.Population
-        n = len(pop)
-        sel = rd.binomial(1, self.p_mutation, n)
+        sel = rd.binomial(1, self.Parameters['p_mutation'], len(pop))
 
         for i, s in enumerate(sel):
             if s:
                 p = pop[i] = pop[i].clone()
-                loc = dict()
-                for mut in self.Mutators:
-                    loc[mut.Name] = mut.proposal(p[mut.Name])
-                p.impulse(loc, self.Model.BN)
-                self.Model.evaluate_prior(p)
-                p.LogLikelihood = self.Model.evaluate_likelihood(p)
+                loc = {mut.Name: mut.proposal(p[mut.Name]) for mut in self.Mutators}
+                p.impulse(loc, model.BN)
+                model.evaluate_prior(p)
+
+    def __fitness(self, p):
+        return p.LogPosterior if self.Parameters['target'] == 'MAP' else p.LogLikelihood
 
     def __selection(self):
-        for p in self.Population:
-            if p.LogLikelihood is 0:
-                p.LogLikelihood = self.Model.evaluate_likelihood(p)
-
-        if self.Target == 'MAP':
-            wts = [p.LogPosterior for p in self.Population]
-        else:
-            wts = [p.LogLikelihood for p in self.Population]
-        pop, mean = resample(wts, self.Population)
+        pop, mean = resample([self.__fitness(p) for p in self.Population], self.Population)
         self.Population = [p.clone() for p in pop]
         self.MeanFitness = mean
 
     def __find_elitism(self):
-        if self.Target == 'MAP':
-            self.BestFit = max(self.Population, key=lambda x: x.LogPosterior)
-        else:
-            self.BestFit = max(self.Population, key=lambda x: x.LogLikelihood)
-
-        fitness = self.BestFit.LogPosterior if self.Target == 'MAP' else self.BestFit.LogLikelihood
+        self.BestFit = max(self.Population, key=self.__fitness)
+        fitness = self.__fitness(self.BestFit)
 
         if fitness == self.MaxFitness:
             self.Stay += 1
@@ -158,11 +160,9 @@ class GA(EvolutionaryFitter):
             self.Generation, self.MeanFitness, self.MaxFitness))
 
     def __termination(self):
-        if self.Stay > 5:
-            return True
+        return self.Stay > self.Parameters['max_stay']
 
     def summarise_fitness(self):
-        print('Model:', self.Model)
-        print('Target:', self.Target)
+        print('Target:', self.Parameters['target'])
         print('Best fitting', self.BestFit)
         print('Max fitness', self.MaxFitness)
@@ -1,13 +1,15 @@
 from abc import ABCMeta, abstractmethod
-from epidag.fitting.alg.fitter import Fitter
 import numpy as np
+from epidag.fitting import BayesResult
+from epidag.bayesnet import as_population
+from epidag.fitting.alg.fitter import Fitter
 
 __author__ = 'TimeWz667'
 __all__ = ['MCMC']
 
 """
 Adopted from
-    Roberts, Gareth O., and Jeffrey S. Rosenthal. 
+    Roberts, Gareth O., and Jeffrey S. Rosenthal.
     "General state space Markov chains and MCMC algorithms." Probability Surveys 1 (2004): 20-71.
 """
 
@@ -33,37 +35,37 @@ class AbsStepper(metaclass=ABCMeta):
     def proposal(self, v, scale):
         pass
 
-    def step(self, bm, gene):
-        value = gene[self.Name]
-        proposed = self.proposal(value, self.StepSize)
+    def propose(self, bm, gene):
+        """
+        Propose a new value of the locus
+        :param bm: BayesianModel
+        :param gene: Chromosome, the current state
+        :return: Chromosome with its prior updated, or None if the proposal is out of the bounds
+        """
+        proposed = self.proposal(gene[self.Name], self.StepSize)
+        if not self.Lower < proposed < self.Upper:
+            return None
         ng = gene.clone()
+        ng.impulse({self.Name: proposed})
+        bm.update_prior(ng, [self.Name])
+        return ng
 
-        if self.Lower < proposed < self.Upper:
-            if gene.LogLikelihood is 0:
-                gene.LogLikelihood = bm.evaluate_likelihood(gene)
-            ng[self.Name] = proposed
-            ng.LogPrior = bm.evaluate_prior(ng)
-            ng.LogLikelihood = bm.evaluate_likelihood(ng)
-            acc = ng.LogPosterior - gene.LogPosterior
-            acc = 100 if acc > 4 else np.exp(acc)
-
-            if acc > np.random.random():
-                self.AcceptanceCount += 1
-            else:
-                ng[self.Name] = gene[self.Name]
-                ng.LogPrior = gene.LogPrior
-                ng.LogLikelihood = gene.LogLikelihood
-
-        self.IterationsSinceAdaption += 1
+    def adapt(self, n_acc, n_iter):
+        """
+        Adapt the step size to the acceptance of a batch of steps
+        :param n_acc: number of accepted steps
+        :param n_iter: number of steps
+        """
+        self.AcceptanceCount += n_acc
+        self.IterationsSinceAdaption += n_iter
         if self.IterationsSinceAdaption >= self.BatchSize:
             self.BatchCount += 1
             adj = min(self.MaxAdaptation, self.InitialAdaptation/np.sqrt(self.BatchCount))
-            if self.AcceptanceCount/self.BatchSize > self.TargetAcceptance:
+            if self.AcceptanceCount/self.IterationsSinceAdaption > self.TargetAcceptance:
                 self.LogStepSize += adj
             else:
                 self.LogStepSize -= adj
             self.AcceptanceCount, self.IterationsSinceAdaption = 0, 0
-        return ng
 
     def __str__(self):
         s = 'Stepper ' + self.Name + '{'
@@ -90,66 +92,90 @@ class IntegerStepper(AbsStepper):
 
 
 class MCMC(Fitter):
-    DefaultParameters = dict(Fitter.DefaultParameters)
-    DefaultParameters['n_burn'] = 1000
-    DefaultParameters['n_thin'] = 2
-
-    def __init__(self, bm, **kwargs):
-        Fitter.__init__(self, bm, **kwargs)
+    def __init__(self, name_logger="MCMC", n_burn=200, n_thin=2, n_chain=4):
+        """
+        Adaptive Metropolis-within-Gibbs sampling over parallel chains; in every step,
+        the proposals of all the chains are evaluated in a batch through the executor
+        :param n_burn: number of sweeps burnt in
+        :param n_thin: number of sweeps between two draws
+        :param n_chain: number of chains
+        """
+        Fitter.__init__(self, name_logger, n_burn=n_burn, n_thin=n_thin, n_chain=n_chain)
         self.Steppers = list()
-        self.Last = None
+        self.Chains = list()
+        self.Evaluations = 0
 
-        for d in self.Model.get_movable_nodes():
+    def fit(self, model, **kwargs):
+        n_post = kwargs['n_post']
+        burn, thin = self.Parameters['n_burn'], self.Parameters['n_thin']
+
+        self.Steppers = list()
+        for d in model.MovableNodes:
             loci, lo, up = d['Name'], d['Lower'], d['Upper']
-            if d['Type'] is 'Double':
+            if d['Type'] == 'Double':
                 self.Steppers.append(DoubleStepper(loci, lo, up))
-            elif d['Type'] is 'Integer':
+            elif d['Type'] == 'Integer':
                 self.Steppers.append(IntegerStepper(loci, lo, up))
-            elif d['Type'] is 'Binary':
+            elif d['Type'] == 'Binary':
                 self.Steppers.append(BinaryStepper(loci, lo, up))
 
-    def fit(self, **kwargs):
-        self.update_parameters(**kwargs)
-
-        burn, thin, n = self['n_burn'], self['n_thin'], self['n_population']
-
-        self.initialise_prior(10)
-
-        self.Posterior.clear()
-        self.Last = self.Model.sample_prior()
-        self.Model.evaluate_likelihood(self.Last)
-
         self.info('Initialising')
+        self.Chains, lis, self.Evaluations = self.sample_batch(model, self.Parameters['n_chain'])
+        for p, li in zip(self.Chains, lis):
+            model.evaluate_prior(p)
+            p.LogLikelihood = li
 
-        ns = 0
         self.info('Burning in')
-        while ns < burn:
-            for stp in self.Steppers:
-                ns += 1
-                self.Last = stp.step(self.Model, self.Last)
+        for _ in range(burn):
+            self.__sweep(model)
 
         self.info('Gathering posteriori')
-        while True:
-            for stp in self.Steppers:
-                ns += 1
-                self.Last = stp.step(self.Model, self.Last)
-                if ns % thin is 0:
-                    self.Posterior.append(self.Last)
-                if len(self.Posterior) >= n:
-                    self.info('Fitting Completed')
-                    return
-
-    def update(self, **kwargs):
-        thin, n = self['n_thin'], self['n_update']
-
+        post = self.__gather(model, n_post, thin)
+        self.info('Completed')
+
+        res = BayesResult(nodes=as_population(post), model=model, alg=self)
+        res.Benchmarks['Niter'] = self.Evaluations
+        res.Benchmarks['Nchain'] = len(self.Chains)
+        return res
+
+    def __sweep(self, model):
+        chains = self.Chains
+        for stp in self.Steppers:
+            props = [(i, stp.propose(model, gene)) for i, gene in enumerate(chains)]
+            props = [(i, p) for i, p in props if p is not None]
+            lis = self.evaluate_batch(model, [p for _, p in props])
+            self.Evaluations += len(props)
+
+            n_acc = 0
+            for (i, p), li in zip(props, lis):
+                p.LogLikelihood = li
+                if np.log(np.random.random()) < p.LogPosterior - chains[i].LogPosterior:
+                    chains[i] = p
+                    n_acc += 1
+            stp.adapt(n_acc, len(chains))
+
+    def __gather(self, model, n, thin):
+        post, i = list(), 0
+        while len(post) < n:
+            self.__sweep(model)
+            i += 1
+            if i % thin == 0:
+                post += [gene.clone() for gene in self.Chains]
+        return post[:n]
+
+    def is_updatable(self):
+        return True
+
+    def update(self, res, **kwargs):
+        """
+        Continue the chains and append the draws to a result
+        :param res: BayesResult, the result of fit
+        :param kwargs: n_update, number of draws appended
+        :return: BayesResult
+        """
         self.info('Updating')
-        ns = 0
-        while True:
-            for stp in self.Steppers:
-                ns += 1
-                self.Last = stp.step(self.Model, self.Last)
-                if ns % self.Thin is 0:
-                    self.Posterior.append(self.Last)
-                if ns >= n:
-                    self.info('Finished')
-                    return
+        post = self.__gather(res.Model, kwargs['n_update'], self.Parameters['n_thin'])
+        res.Nodes = as_population(list(res.Nodes) + post)
+        res.Benchmarks['Niter'] = self.Evaluations
+        self.info('Finished')
+        return res
@@ -1,5 +1,6 @@
 import numpy as np
 from epidag.util import resample
+from epidag.bayesnet import as_population
 from epidag.fitting import BayesResult
 from epidag.fitting.alg.fitter import Fitter
 from epidag.fitting.misc import ess, dic
@@ -16,21 +17,20 @@ class SIR(Fitter):
         n_post = kwargs['n_post']
 
         self.info('Sampling')
-        prior = list()
-        lis = list()
-        while len(prior) < n_post:
-            p = model.sample_prior()
-            li = model.evaluate_likelihood(p)
-            if np.isfinite(li):
-                p.LogLikelihood = li
-                prior.append(p)
-                lis.append(li)
+        prior, lis, _ = self.sample_batch(model, n_post)
+        for p, li in zip(prior, lis):
+            p.LogLikelihood = li
 
         self.info('Importance')
 
-        post, _ = resample(lis, prior)
+        prior = as_population(prior)
+        sel, _ = resample(lis, list(range(len(prior))))
 
         self.info('Resampling')
+        if isinstance(prior, list):
+            post = [prior[i] for i in sel]
+        else:
+            post = prior.resample(sel)
         res = BayesResult(nodes=post, model=model, alg=self)
 
         res.Benchmarks['ESS'] = ess(lis)
@@ -1,26 +1,45 @@
 from abc import ABCMeta, abstractmethod
 import scipy.stats as stats
-from epidag.bayesnet import Chromosome
-from epidag.fn import evaluate_nodes, sample_minimally
+from epidag.bayesnet import Chromosome, CompactChromosome, get_schema
+from epidag.fn import sample_minimally, PriorEvaluator
 
 __author__ = 'TimeWz667'
 __all__ = ['BayesianModel']
 
 
 class BayesianModel(metaclass=ABCMeta):
-    def __init__(self, bn, pars):
+    def __init__(self, bn, pars, compact=False):
+        """
+        :param bn: BayesianNetwork, source network
+        :param pars: names of parameter nodes
+        :param compact: True if numeric parameters are kept in CompactChromosomes sharing one schema
+        """
         self.BN = bn
         self.Name = bn.Name
         self.ParameterNodes = [p for p in pars if self.BN.is_rv(p)]
+        self.Compact = compact
+        self.PriorEvaluator = PriorEvaluator(bn)
 
     def sample_prior(self):
         ps, src = sample_minimally(self.BN, self.ParameterNodes)
         src.update(ps)
+        if self.Compact:
+            return CompactChromosome(get_schema(self.BN, src.keys()), src)
         return Chromosome(src)
 
     def evaluate_prior(self, prior):
-        prior.LogPrior = evaluate_nodes(self.BN, prior)
-        return prior.LogPrior
+        return self.PriorEvaluator.evaluate(prior)
+
+    def update_prior(self, prior, changed):
+        """
+        Update the log prior after some loci changed
+        :param prior: Chromosome, a chromosome evaluated before
+        :param changed: iterable, names of the changed loci
+        :return: the log prior
+        """
+        if prior.PriorTerms is None:
+            return self.evaluate_prior(prior)
+        return self.PriorEvaluator.update(prior, changed)
 
     @property
     def MovableNodes(self):
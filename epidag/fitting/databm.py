@@ -1,6 +1,7 @@
 import epidag as dag
 import numpy as np
 from epidag.fitting.bayesmodel import BayesianModel
+from epidag.inference import get_variable_elimination
 from scipy.special import logsumexp
 
 __author__ = 'TimeWz667'
@@ -79,6 +80,19 @@ class DataNodeSet:
     def needs_mc(self):
         return self.__MC
 
+    def is_exact(self, bn, given=None):
+        """
+        Check if the likelihood can be evaluated exactly
+        :param bn: BayesianNetwork
+        :param given: iterable, nodes given by priors
+        :return: True if no latent node, or all the latent nodes can be eliminated exactly
+        """
+        if not self.needs_mc:
+            return True
+        given = set(given) if given else set()
+        given.update(self.Datum)
+        return get_variable_elimination(bn).get_plan(self.Nodes, given) is not None
+
     def evaluate_likelihood(self, bn, prior):
         if not self.Datum:
             return 0
@@ -86,6 +100,10 @@ class DataNodeSet:
         fixed = dict(prior.Locus)
         fixed.update(self.Datum)
         if self.needs_mc:
+            li = get_variable_elimination(bn).marginal_likelihood(self.Nodes, fixed)
+            if li is not None:
+                return li
+
             lis = []
             for _ in range(DataBayesianModel.DefaultMC):
                 li = 0
@@ -129,7 +147,7 @@ class DataBayesianModel(BayesianModel):
 
     @property
     def has_exact_likelihood(self):
-        return all(not ent.needs_mc for ent in self.DataEntries)
+        return all(ent.is_exact(self.BN, self.Root.Nodes) for ent in self.DataEntries)
 
     def evaluate_likelihood(self, prior):
         return np.array([ent.evaluate_likelihood(self.BN, prior) for ent in self.DataEntries]).sum()
@@ -1,4 +1,4 @@
-from epidag.bayesnet import Chromosome
+from epidag.bayesnet import Chromosome, ChromosomeBatch
 
 __author__ = 'TimeWz667'
 __all__ = ['Result', 'BayesResult', 'FrequentistResult']
@@ -21,6 +21,8 @@ class Result:
         }
 
     def to_df(self):
+        if isinstance(self.Nodes, ChromosomeBatch):
+            return self.Nodes.to_data_frame()
         return Chromosome.to_data_frame(self.Nodes)
 
     def summarise(self):
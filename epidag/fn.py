@@ -1,8 +1,9 @@
 import numpy as np
+import pandas as pd
 from epidag.bayesnet import BayesianNetwork, get_sufficient_nodes
 
 __author__ = 'TimeWz667'
-__all__ = ['sample', 'sample_minimally', 'evaluate_nodes']
+__all__ = ['sample', 'sample_minimally', 'evaluate_nodes', 'evaluate_nodes_batch', 'PriorEvaluator']
 
 
 def sample(bn, cond=None):
@@ -72,5 +73,142 @@ def evaluate_nodes(bn, pars):
     return lps
 
 
+def evaluate_nodes_batch(bn, data, nodes=None, by_node=False):
+    """
+    Evaluate the log-densities of a table of records, each node being evaluated over all rows at once
+    :param bn: BayesianNetwork, a Bayesian Network
+    :param data: pd.DataFrame or dict of arrays, one record per row
+    :param nodes: nodes to be evaluated; None for every column which is a node of bn
+    :param by_node: True if the log-densities of each node are requested
+    :return: np.ndarray of the log-densities of rows; with a pd.DataFrame of the terms by node if by_node
+    """
+    if isinstance(data, pd.DataFrame):
+        index = data.index
+        cols = {k: data[k].to_numpy() for k in data.columns}
+    else:
+        index = None
+        cols = {k: np.asarray(v) for k, v in data.items()}
+
+    n = max((len(v) for v in cols.values() if np.ndim(v)), default=0)
+    if nodes is None:
+        nodes = [k for k in cols if k in bn]
+    nodes = bn.sort(nodes)
+
+    for k in nodes:
+        for pa in [k] + list(bn[k].Parents):
+            if pa in cols:
+                continue
+            if bn.is_exogenous(pa):
+                raise ValueError('Exogenous node {} needed'.format(pa))
+            raise KeyError('Column {} needed'.format(pa))
+
+    terms = np.zeros((n, len(nodes)))
+    for i, k in enumerate(nodes):
+        terms[:, i] = bn[k].evaluate_batch(cols, n)
+
+    lps = terms.sum(1)
+    if by_node:
+        return lps, pd.DataFrame(terms, columns=nodes, index=index)
+    return lps
+
+
+_Eps = float(np.finfo(np.float64).eps)
+
+
+class LogPriorTerms:
+    """
+    Log-densities of nodes with their total. The total is updated by differences, with a bound of
+    the rounding errors piled up; it is summed again from the terms after an infinite term or
+    once the bound exceeds Tolerance
+    """
+    __slots__ = ('Terms', 'Total', 'Error')
+    Tolerance = 1e-9
+
+    def __init__(self, terms):
+        self.Terms = terms
+        self.resum()
+
+    def resum(self):
+        self.Total = float(np.sum(list(self.Terms.values())))
+        self.Error = 0
+
+    def copy(self):
+        cp = LogPriorTerms.__new__(LogPriorTerms)
+        cp.Terms = dict(self.Terms)
+        cp.Total = self.Total
+        cp.Error = self.Error
+        return cp
+
+
+class PriorEvaluator:
+    """
+    Evaluate the log prior of chromosomes with per-node terms cached on them.
+    After some loci changed, only the terms of the changed nodes and their children are recomputed.
+    """
+    def __init__(self, bn):
+        """
+        :param bn: BayesianNetwork, a Bayesian Network
+        """
+        self.BN = bn
+        self.Affected = dict()
+
+    def affected(self, changed):
+        """
+        Find the nodes whose log-densities depend on the changed nodes
+        :param changed: iterable, names of changed nodes
+        :return: a set of the changed nodes and their children
+        """
+        res = set()
+        for k in changed:
+            try:
+                res.update(self.Affected[k])
+            except KeyError:
+                aff = self.Affected[k] = (k,) + tuple(self.BN.DAG.successors(k))
+                res.update(aff)
+        return res
+
+    def evaluate(self, gene):
+        """
+        Evaluate every term of a chromosome
+        :param gene: Chromosome
+        :return: the log prior of gene
+        """
+        nodes = self.BN.DAG.nodes
+        gene.PriorTerms = LogPriorTerms({k: nodes[k]['loci'].evaluate(gene) for k in gene.keys()})
+        gene.LogPrior = gene.PriorTerms.Total
+        return gene.LogPrior
+
+    def update(self, gene, changed):
+        """
+        Update the log prior of a chromosome after some of its loci changed
+        :param gene: Chromosome, evaluated before with this evaluator
+        :param changed: iterable, names of changed nodes
+        :return: the log prior of gene
+        """
+        pt = gene.PriorTerms
+        if pt is None:
+            return self.evaluate(gene)
+
+        nodes = self.BN.DAG.nodes
+        terms = pt.Terms
+        finite = True
+        for k in self.affected(changed):
+            if k not in terms:
+                continue
+            new = nodes[k]['loci'].evaluate(gene)
+            old = terms[k]
+            terms[k] = new
+            if np.isfinite(new) and np.isfinite(old):
+                pt.Total += new - old
+                pt.Error += (abs(pt.Total) + abs(new) + abs(old)) * _Eps
+            else:
+                finite = False
+
+        if not finite or pt.Error > pt.Tolerance:
+            pt.resum()
+        gene.LogPrior = pt.Total
+        return gene.LogPrior
+
+
 def as_causal_diagram(bn):
     return
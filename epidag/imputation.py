@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from epidag.bayesnet import get_sufficient_nodes
+
+__author__ = 'TimeWz667'
+__all__ = ['Imputer', 'impute', 'read_chunks']
+
+
+def read_chunks(source, chunksize=100000):
+    """
+    Iterate over a table chunk by chunk
+    :param source: pd.DataFrame, an iterable of pd.DataFrame, or the path of a csv or parquet file
+    :param chunksize: number of rows per chunk of a file
+    :return: generator of pd.DataFrame
+    """
+    if isinstance(source, pd.DataFrame):
+        yield source
+    elif isinstance(source, str):
+        if source.endswith('.parquet') or source.endswith('.pq'):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError('pyarrow is required for reading parquet files')
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+                yield batch.to_pandas()
+        else:
+            for chunk in pd.read_csv(source, chunksize=chunksize):
+                yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+
+class Imputer:
+    """
+    Fill the missing values of a table by sampling a Bayesian network conditional on the observed values.
+    Rows are grouped by their pattern of missingness; each pattern has one cached sampling plan
+    and its missing nodes are drawn for all of its rows at once.
+    """
+    def __init__(self, bn, nodes=None):
+        """
+        :param bn: BayesianNetwork, a Bayesian Network
+        :param nodes: nodes to be completed even if they are not columns of the table
+        """
+        self.BN = bn
+        self.Nodes = list(nodes) if nodes else list()
+        self.Plans = dict()
+
+    def get_plan(self, missing, observed):
+        """
+        Find the nodes to be rendered for a pattern of missingness
+        :param missing: nodes to be imputed
+        :param observed: nodes with values
+        :return: tuple of nodes in topological order
+        """
+        key = frozenset(missing), frozenset(observed)
+        try:
+            return self.Plans[key]
+        except KeyError:
+            pass
+
+        suf = get_sufficient_nodes(self.BN.DAG, key[0], key[1])
+        suf.difference_update(key[1])
+        plan = tuple(self.BN.sort(suf))
+        for nod in plan:
+            if self.BN.is_exogenous(nod):
+                raise ValueError('Exogenous node {} needed'.format(nod))
+        self.Plans[key] = plan
+        return plan
+
+    def impute(self, chunk):
+        """
+        Complete a table
+        :param chunk: pd.DataFrame, records with missing values
+        :return: pd.DataFrame, completed records
+        """
+        chunk = chunk.copy()
+        for nod in self.Nodes:
+            if nod not in chunk:
+                chunk[nod] = np.nan
+
+        nodes = [k for k in chunk.columns if k in self.BN]
+        n = chunk.shape[0]
+        if not nodes or not n:
+            return chunk
+
+        mask = chunk[nodes].isna().to_numpy()
+        patterns, inverse = np.unique(mask, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        for i, pattern in enumerate(patterns):
+            if not pattern.any():
+                continue
+            missing = [k for k, m in zip(nodes, pattern) if m]
+            observed = [k for k, m in zip(nodes, pattern) if not m]
+            plan = self.get_plan(missing, observed)
+
+            rows = np.flatnonzero(inverse == i)
+            m = len(rows)
+            cols = {k: chunk[k].to_numpy()[rows] for k in observed}
+            for nod in plan:
+                cols[nod] = self.BN[nod].render_batch(cols, m)
+
+            for k in missing:
+                vs = cols[k]
+                if chunk[k].dtype != vs.dtype and not np.issubdtype(vs.dtype, np.number):
+                    chunk[k] = chunk[k].astype(object)
+                chunk.iloc[rows, chunk.columns.get_loc(k)] = vs
+        return chunk
+
+    def stream(self, source, chunksize=100000):
+        """
+        Complete a table chunk by chunk
+        :param source: pd.DataFrame, an iterable of pd.DataFrame, or the path of a csv or parquet file
+        :param chunksize: number of rows per chunk of a file
+        :return: generator of completed pd.DataFrame
+        """
+        for chunk in read_chunks(source, chunksize):
+            yield self.impute(chunk)
+
+
+def impute(bn, source, nodes=None, chunksize=100000):
+    """
+    Impute the missing values of a table with a Bayesian network
+    :param bn: BayesianNetwork, a Bayesian Network
+    :param source: pd.DataFrame, an iterable of pd.DataFrame, or the path of a csv or parquet file
+    :param nodes: nodes to be completed even if they are not columns of the table
+    :param chunksize: number of rows per chunk of a file
+    :return: generator of completed pd.DataFrame
+    """
+    return Imputer(bn, nodes).stream(source, chunksize)
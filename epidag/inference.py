@@ -0,0 +1,537 @@
+from weakref import WeakKeyDictionary
+import numpy as np
+import pandas as pd
+from scipy.special import logsumexp
+from epidag.bayesnet import ChromosomeSchema, ChromosomeBatch, get_sufficient_nodes
+from epidag.bayesnet.loci import DistributionLoci
+from epidag.distribution import CategoricalRV, SpInteger
+from epidag.factory.arguments import ValidationError
+
+__author__ = 'TimeWz667'
+__all__ = ['WeightedSamples', 'WeightedMoments', 'LikelihoodWeighting', 'query_posterior',
+           'EliminationPlan', 'VariableElimination', 'get_variable_elimination']
+
+
+def _ess(lse, lse2):
+    """
+    Effective sample size of importance weights
+    :param lse: log of the sum of weights
+    :param lse2: log of the sum of squared weights
+    :return: effective sample size
+    """
+    if not np.isfinite(lse):
+        return 0
+    return float(np.exp(2 * lse - lse2))
+
+
+class WeightedSamples:
+    def __init__(self, samples, log_weights):
+        """
+        Weighted samples of query nodes
+        :param samples: pd.DataFrame, values of query nodes
+        :param log_weights: np.ndarray, log importance weights
+        """
+        self.Samples = samples
+        self.LogWeights = np.asarray(log_weights, dtype=np.float64)
+
+    def __len__(self):
+        return self.Samples.shape[0]
+
+    @property
+    def Weights(self):
+        """
+        :return: normalised importance weights
+        """
+        return np.exp(self.LogWeights - logsumexp(self.LogWeights))
+
+    @property
+    def ESS(self):
+        if not len(self):
+            return 0
+        return _ess(logsumexp(self.LogWeights), logsumexp(2 * self.LogWeights))
+
+    @property
+    def LogEvidence(self):
+        """
+        :return: estimated log marginal likelihood of the evidence
+        """
+        return float(logsumexp(self.LogWeights) - np.log(len(self)))
+
+    def to_batch(self):
+        cols = list(self.Samples.columns)
+        return ChromosomeBatch.from_columns(ChromosomeSchema(cols), self.Samples[cols].to_numpy(dtype=np.float64),
+                                            li=self.LogWeights)
+
+    def mean(self):
+        return dict(zip(self.Samples.columns, self.Weights.dot(self.Samples.to_numpy(dtype=np.float64))))
+
+    def summarise(self):
+        return self.to_batch().summarise(self.Weights)
+
+    def resample(self, n=None):
+        """
+        Draw unweighted samples
+        :param n: size of samples; None for the size of the weighted samples
+        :return: pd.DataFrame
+        """
+        n = n if n else len(self)
+        sel = np.random.choice(len(self), n, replace=True, p=self.Weights)
+        return self.Samples.iloc[sel].reset_index(drop=True)
+
+    def __repr__(self):
+        return 'WeightedSamples(Size: {}, ESS: {:.1f})'.format(len(self), self.ESS)
+
+
+class WeightedMoments:
+    def __init__(self, names):
+        """
+        Weighted means and variances of query nodes, accumulated chunk by chunk without keeping the samples
+        :param names: names of query nodes, numeric
+        """
+        self.Names = list(names)
+        self.Size = 0
+        self.LogSum = -np.inf
+        self.LogSum2 = -np.inf
+        self.Mean = np.zeros(len(self.Names))
+        self.Square = np.zeros(len(self.Names))
+
+    def __len__(self):
+        return self.Size
+
+    def update(self, ws):
+        """
+        Accumulate a chunk of weighted samples
+        :param ws: WeightedSamples
+        """
+        if not len(ws):
+            return
+        lws = ws.LogWeights
+        lse = logsumexp(lws)
+        self.Size += len(ws)
+        self.LogSum2 = np.logaddexp(self.LogSum2, logsumexp(2 * lws))
+        if not np.isfinite(lse):
+            return
+
+        total = np.logaddexp(self.LogSum, lse)
+        wts = np.exp(lws - lse)
+        xs = ws.Samples[self.Names].to_numpy(dtype=np.float64)
+        a, b = np.exp(self.LogSum - total), np.exp(lse - total)
+        self.Mean = a * self.Mean + b * wts.dot(xs)
+        self.Square = a * self.Square + b * wts.dot(xs * xs)
+        self.LogSum = total
+
+    @property
+    def ESS(self):
+        return _ess(self.LogSum, self.LogSum2)
+
+    @property
+    def LogEvidence(self):
+        """
+        :return: estimated log marginal likelihood of the evidence
+        """
+        return float(self.LogSum - np.log(self.Size))
+
+    def mean(self):
+        return dict(zip(self.Names, self.Mean))
+
+    def var(self):
+        return dict(zip(self.Names, np.maximum(self.Square - self.Mean ** 2, 0)))
+
+    def summarise(self):
+        return pd.DataFrame([self.Mean, np.sqrt(np.maximum(self.Square - self.Mean ** 2, 0))],
+                            index=['mean', 'std'], columns=self.Names)
+
+    def __repr__(self):
+        return 'WeightedMoments(Size: {}, ESS: {:.1f})'.format(len(self), self.ESS)
+
+
+class LikelihoodWeighting:
+    """
+    Posterior queries by likelihood weighting: the nodes without evidence are sampled forward in batch,
+    and the samples are weighted by the log-densities of the evidence nodes given their parents
+    """
+    def __init__(self, bn, exo=None):
+        """
+        :param bn: BayesianNetwork, a Bayesian network
+        :param exo: dict, values of exogenous nodes
+        """
+        self.BN = bn
+        self.Exo = dict(exo) if exo else dict()
+        self.Plans = dict()
+
+    def get_plan(self, evidence, queries):
+        """
+        Find the nodes to be visited
+        :param evidence: iterable, nodes with evidence
+        :param queries: iterable, query nodes
+        :return: tuple of nodes in topological order
+        """
+        key = frozenset(evidence), frozenset(queries)
+        try:
+            return self.Plans[key]
+        except KeyError:
+            pass
+
+        bn = self.BN
+        required = set.union(set(key[0]), set(key[1]))
+        for nod in list(required):
+            required.update(bn.DAG.ancestors(nod))
+
+        plan = tuple(bn.sort(required))
+        for nod in plan:
+            if nod in key[0]:
+                if not bn.is_rv(nod) and not bn.is_exogenous(nod):
+                    raise ValueError('Evidence on deterministic node {} is not supported'.format(nod))
+            elif bn.is_exogenous(nod) and nod not in self.Exo:
+                raise ValueError('Exogenous node {} needed'.format(nod))
+        self.Plans[key] = plan
+        return plan
+
+    def sample(self, evidence, queries, n):
+        """
+        Draw a chunk of weighted samples
+        :param evidence: dict(node: value), evidence
+        :param queries: list, query nodes
+        :param n: size of the chunk
+        :return: WeightedSamples
+        """
+        bn = self.BN
+        plan = self.get_plan(evidence.keys(), queries)
+        cols = dict()
+        lws = np.zeros(n)
+        for nod in plan:
+            if nod in evidence:
+                cols[nod] = np.full(n, evidence[nod])
+                if bn.is_rv(nod):
+                    lws += bn[nod].evaluate_batch(cols, n)
+            elif nod in self.Exo:
+                cols[nod] = np.array(np.broadcast_to(self.Exo[nod], (n, )))
+            else:
+                cols[nod] = bn[nod].render_batch(cols, n)
+        return WeightedSamples(pd.DataFrame({q: cols[q] for q in queries}), lws)
+
+    def query(self, evidence, queries, target_ess=1000, chunk=10000, max_draws=1000000, keep=False):
+        """
+        Draw weighted samples chunk by chunk until the effective sample size reaches the target
+        :param evidence: dict(node: value), evidence
+        :param queries: list, query nodes
+        :param target_ess: target effective sample size
+        :param chunk: size of each chunk
+        :param max_draws: maximal number of draws
+        :param keep: True if every sample is kept; otherwise only the moments of the chunks are accumulated
+        :return: WeightedSamples if keep else WeightedMoments
+        """
+        queries = list(queries)
+        moments = WeightedMoments(queries)
+        chunks = list()
+        n_draw = 0
+        while n_draw < max_draws:
+            ws = self.sample(evidence, queries, min(chunk, max_draws - n_draw))
+            n_draw += len(ws)
+            moments.update(ws)
+            if keep:
+                chunks.append(ws)
+            if moments.ESS >= target_ess:
+                break
+
+        if keep:
+            return WeightedSamples(pd.concat([ws.Samples for ws in chunks], ignore_index=True),
+                                   np.concatenate([ws.LogWeights for ws in chunks]))
+        return moments
+
+
+def query_posterior(bn, evidence, queries, target_ess=1000, chunk=10000, max_draws=1000000, exo=None, keep=False):
+    """
+    Query the posterior distributions of some nodes given evidence by likelihood weighting
+    :param bn: BayesianNetwork, a Bayesian network
+    :param evidence: dict(node: value), evidence
+    :param queries: list, query nodes
+    :param target_ess: target effective sample size
+    :param chunk: size of each chunk
+    :param max_draws: maximal number of draws
+    :param exo: dict, values of exogenous nodes
+    :param keep: True if every sample is kept
+    :return: WeightedSamples if keep else WeightedMoments
+    """
+    lw = LikelihoodWeighting(bn, exo)
+    return lw.query(evidence, queries, target_ess=target_ess, chunk=chunk, max_draws=max_draws, keep=keep)
+
+
+class EliminationPlan:
+    def __init__(self, nodes, given, latent, factors, constants, order):
+        """
+        Structure of an exact marginalisation, independent of the values of given nodes
+        :param nodes: tuple, nodes to be evaluated
+        :param given: frozenset, nodes with given values
+        :param latent: tuple, latent nodes in topological order
+        :param factors: list of (node, scope, mediators, inputs); a factor of a random node over the latent random
+        variables in the scope, the deterministic mediators and the given values needed to compute it
+        :param constants: tuple, nodes evaluated directly from the given values
+        :param order: tuple, elimination order of latent random variables
+        """
+        self.Nodes = nodes
+        self.Given = given
+        self.Latent = latent
+        self.Factors = factors
+        self.Constants = constants
+        self.Order = order
+
+    def __repr__(self):
+        return 'EliminationPlan(Latent: {}, Order: {})'.format(', '.join(self.Latent), ', '.join(self.Order))
+
+
+def _min_fill_order(variables, scopes):
+    """
+    Greedy elimination order; ties of the number of fill-in edges are broken by the number of neighbours
+    """
+    nei = {v: set() for v in variables}
+    for sc in scopes:
+        for v in sc:
+            nei[v].update(u for u in sc if u != v)
+
+    order = list()
+    remaining = set(variables)
+    while remaining:
+        def cost(v):
+            ns = list(nei[v] & remaining)
+            fill = sum(1 for i, a in enumerate(ns) for b in ns[i + 1:] if b not in nei[a])
+            return fill, len(ns), v
+        v = min(remaining, key=cost)
+        ns = nei[v] & remaining
+        for a in ns:
+            nei[a].update(ns - {a})
+        remaining.remove(v)
+        order.append(v)
+    return tuple(order)
+
+
+def _align(scope, table, target):
+    """
+    Broadcast a factor table onto the axes of the target scope
+    """
+    arr = np.transpose(table, [scope.index(t) for t in target if t in scope])
+    return arr.reshape([table.shape[scope.index(t)] if t in scope else 1 for t in target])
+
+
+class VariableElimination:
+    """
+    Exact marginalisation of latent discrete variables by variable elimination over log-factor tables.
+    Latent random nodes are limited to the discrete families in DiscreteFamilies; unbounded supports are
+    truncated at the quantile 1 - Tail. Plans are cached by the evaluated and given nodes, and factor tables by
+    the given values they depend on.
+    """
+    DiscreteFamilies = {'binom', 'pois', 'cat'}
+    Tail = 1e-10
+    MaxDomain = 1000
+    MaxTable = 1000000
+    MaxCache = 10000
+
+    def __init__(self, bn):
+        """
+        :param bn: BayesianNetwork, a Bayesian network
+        """
+        self.BN = bn
+        self.Plans = dict()
+        self.Cache = dict()
+
+    def get_plan(self, nodes, given):
+        """
+        Compile the structure of the marginalisation
+        :param nodes: iterable, nodes to be evaluated
+        :param given: iterable, nodes with given values
+        :return: EliminationPlan; None if the latent nodes cannot be eliminated exactly
+        """
+        key = tuple(nodes), frozenset(given)
+        try:
+            return self.Plans[key]
+        except KeyError:
+            pass
+        plan = self.Plans[key] = self.__compile(*key)
+        return plan
+
+    def __compile(self, nodes, given):
+        bn = self.BN
+        included = set(nodes)
+        for nod in nodes:
+            included.update(bn[nod].Parents)
+        order = bn.sort(get_sufficient_nodes(bn.DAG, included, given))
+        latent = [nod for nod in order if nod not in given]
+
+        for nod in latent:
+            if bn.is_exogenous(nod):
+                return None
+            if bn.is_rv(nod):
+                loci = bn[nod]
+                if not isinstance(loci, DistributionLoci) or loci.Func.Function not in self.DiscreteFamilies:
+                    return None
+
+        # latent random variables, deterministic mediators and given values behind each node
+        scopes, dets, inputs = dict(), dict(), dict()
+
+        def upstream(nod):
+            sc, ds, ins = list(), list(), list()
+            for pa in bn[nod].Parents:
+                sc += [v for v in scopes[pa] if v not in sc]
+                ds += [d for d in dets[pa] if d not in ds]
+                ins += [i for i in inputs[pa] if i not in ins]
+            return tuple(sc), tuple(bn.sort(ds)), tuple(ins)
+
+        factors, constants = list(), list()
+        for nod in order:
+            if nod in given:
+                scopes[nod], dets[nod], inputs[nod] = (), (), (nod, )
+                if nod in nodes and bn.is_rv(nod):
+                    sc, ds, ins = upstream(nod)
+                    if sc:
+                        factors.append((nod, sc, ds, (nod, ) + ins))
+                    else:
+                        constants.append(nod)
+            elif bn.is_rv(nod):
+                sc, ds, ins = upstream(nod)
+                factors.append((nod, sc + (nod, ), ds, ins))
+                scopes[nod], dets[nod], inputs[nod] = (nod, ), (), ()
+            else:
+                sc, ds, ins = upstream(nod)
+                scopes[nod], dets[nod], inputs[nod] = sc, tuple(bn.sort(ds + (nod, ))), ins
+
+        rvs = [f[0] for f in factors if f[0] not in given]
+        elim = _min_fill_order(rvs, [f[1] for f in factors])
+        return EliminationPlan(tuple(nodes), given, tuple(latent), factors, tuple(constants), elim)
+
+    def __enumerate(self, scope, domains, dets, fixed):
+        size = int(np.prod([len(domains[v]) for v in scope]))
+        cols = dict()
+        if scope:
+            grid = np.indices([len(domains[v]) for v in scope]).reshape((len(scope), -1))
+            for v, idx in zip(scope, grid):
+                cols[v] = np.asarray(domains[v])[idx]
+        for k, v in fixed.items():
+            cols[k] = np.full(size, v)
+        for d in dets:
+            cols[d] = self.BN[d].render_batch(cols, size)
+        return cols, size
+
+    def __support(self, nod, loc):
+        dist = self.BN[nod].get_distribution(loc)
+        if isinstance(dist, CategoricalRV):
+            return list(dist.cat)
+        if isinstance(dist, SpInteger):
+            lo, hi = dist.Dist.support()
+            if not np.isfinite(hi):
+                hi = dist.Dist.ppf(1 - self.Tail)
+            return list(range(int(lo), int(hi) + 1))
+        raise ValueError('Unbounded distribution')
+
+    def __cached(self, key, fn):
+        try:
+            return self.Cache[key]
+        except KeyError:
+            pass
+        except TypeError:
+            return fn()
+        if len(self.Cache) >= self.MaxCache:
+            self.Cache.clear()
+        res = self.Cache[key] = fn()
+        return res
+
+    def __domain(self, factor, domains, fixed):
+        nod, scope, dets, inputs = factor
+        scope = scope[:-1]
+        ins = {k: fixed[k] for k in inputs}
+
+        def find():
+            pas = list(self.BN[nod].Parents)
+            cols, size = self.__enumerate(scope, domains, dets, ins)
+            vs = set()
+            for conf in set(zip(*[cols[pa] for pa in pas])) if pas else {()}:
+                try:
+                    vs.update(self.__support(nod, dict(zip(pas, conf))))
+                except ValidationError:
+                    # configurations invalid for the distribution have no support
+                    continue
+            try:
+                return tuple(sorted(vs))
+            except TypeError:
+                return tuple(vs)
+
+        key = 'Domain', nod, scope, tuple(sorted(ins.items())), tuple(domains[v] for v in scope)
+        return self.__cached(key, find)
+
+    def __factor(self, factor, domains, fixed):
+        nod, scope, dets, inputs = factor
+        ins = {k: fixed[k] for k in inputs}
+
+        def compute():
+            cols, size = self.__enumerate(scope, domains, dets, ins)
+            lps = self.BN[nod].evaluate_batch(cols, size)
+            return np.asarray(lps, dtype=np.float64).reshape([len(domains[v]) for v in scope])
+
+        key = 'Factor', nod, scope, tuple(sorted(ins.items())), tuple(domains[v] for v in scope)
+        return self.__cached(key, compute)
+
+    def marginal_likelihood(self, nodes, fixed):
+        """
+        Evaluate the log density of nodes with the latent nodes summed out
+        :param nodes: iterable, nodes to be evaluated
+        :param fixed: dict, given values
+        :return: the log marginal likelihood; None if the latent nodes cannot be eliminated exactly
+        """
+        plan = self.get_plan(nodes, fixed.keys())
+        if plan is None:
+            return None
+
+        domains = dict()
+        try:
+            for f in plan.Factors:
+                if f[0] not in fixed:
+                    domains[f[0]] = dom = self.__domain(f, domains, fixed)
+                    if len(dom) > self.MaxDomain:
+                        return None
+        except ValueError:
+            return None
+
+        li = float(np.sum([self.BN[k].evaluate(fixed) for k in plan.Constants]))
+        factors = list()
+        for f in plan.Factors:
+            if np.prod([len(domains[v]) for v in f[1]]) > self.MaxTable:
+                return None
+            factors.append((f[1], self.__factor(f, domains, fixed)))
+
+        for v in plan.Order:
+            sel = [f for f in factors if v in f[0]]
+            factors = [f for f in factors if v not in f[0]]
+            scope = list()
+            for sc, _ in sel:
+                scope += [u for u in sc if u not in scope]
+            if np.prod([len(domains[u]) for u in scope]) > self.MaxTable:
+                return None
+            table = np.zeros([len(domains[u]) for u in scope])
+            for sc, tab in sel:
+                table = table + _align(sc, tab, scope)
+            with np.errstate(divide='ignore'):
+                table = logsumexp(table, axis=scope.index(v))
+            scope.remove(v)
+            factors.append((tuple(scope), table))
+
+        return li + float(np.sum([tab for _, tab in factors]))
+
+    def __repr__(self):
+        return 'VariableElimination({})'.format(self.BN.Name)
+
+
+_Eliminators = WeakKeyDictionary()
+
+
+def get_variable_elimination(bn):
+    """
+    Find the variable elimination engine of a Bayesian network; engines of frozen networks are shared
+    :param bn: BayesianNetwork, a Bayesian network
+    :return: VariableElimination
+    """
+    if not bn.is_frozen():
+        return VariableElimination(bn)
+    try:
+        return _Eliminators[bn]
+    except KeyError:
+        ve = _Eliminators[bn] = VariableElimination(bn)
+        return ve
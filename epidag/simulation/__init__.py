@@ -2,5 +2,7 @@ from epidag.simulation.actor import *
 from epidag.simulation.nodeset import *
 from epidag.simulation.simucore import *
 from epidag.simulation.parcore import *
+from epidag.simulation.partable import *
+from epidag.simulation.checkpoint import *
 from epidag.simulation.fn import *
 __author__ = 'TimeWz667'
@@ -1,10 +1,23 @@
 from abc import ABCMeta, abstractmethod
+import numpy as np
 from epidag.bayesnet.loci import *
 
 __author__ = 'TimeWz667'
 __all__ = ['FrozenSingleActor', 'SingleActor', 'CompoundActor', 'Sampler']
 
 
+def _draw(dist, n):
+    vs = dist.sample(n)
+    return np.full(1, vs) if n == 1 else np.asarray(vs)
+
+
+def _same(a, b):
+    try:
+        return bool(a == b)
+    except ValueError:
+        return False
+
+
 class SimulationActor(metaclass=ABCMeta):
     def __init__(self, field, loci, to_read):
         self.Field = field
@@ -15,6 +28,15 @@ class SimulationActor(metaclass=ABCMeta):
     def sample(self, pas=None):
         pass
 
+    def sample_batch(self, n, pas=None):
+        """
+        Sample n values
+        :param n: integer > 0, size of samples
+        :param pas: upstream values
+        :return: np.ndarray of values
+        """
+        return np.array([self.sample(pas) for _ in range(n)])
+
     def read_upstream(self, pas=None):
         up = dict()
         if self.ToRead and pas is not None:
@@ -25,11 +47,20 @@ class SimulationActor(metaclass=ABCMeta):
                     pass
         return up
 
+    def snapshot(self, up):
+        """
+        Values read from upstream, in the order of ToRead
+        :param up: dict, upstream values
+        :return: tuple
+        """
+        return tuple(up.get(p) for p in self.ToRead) if self.ToRead else ()
+
 
 class FrozenSingleActor(SimulationActor):
     def __init__(self, field, loci, pas):
         SimulationActor.__init__(self, field, loci, pas)
         self.Sampler = None
+        self.Upstream = None
 
     def sample(self, pas=None):
         if isinstance(self.Loci, DistributionLoci):
@@ -37,12 +68,22 @@ class FrozenSingleActor(SimulationActor):
         else:
             return self.Sampler
 
+    def sample_batch(self, n, pas=None):
+        if isinstance(self.Loci, DistributionLoci):
+            return _draw(self.Sampler, n)
+        else:
+            return np.full(n, self.Sampler)
+
     def update(self, pas):
         pas = self.read_upstream(pas)
+        up = self.snapshot(pas)
+        if self.Upstream is not None and _same(up, self.Upstream):
+            return
         if isinstance(self.Loci, DistributionLoci):
             self.Sampler = self.Loci.get_distribution(pas)
         else:
             self.Sampler = self.Loci.render(pas)
+        self.Upstream = up
 
     def __repr__(self):
         return '{} ({})'.format(self.Field, str(self))
@@ -54,10 +95,33 @@ class FrozenSingleActor(SimulationActor):
 class SingleActor(SimulationActor):
     def __init__(self, field, loci, pas):
         SimulationActor.__init__(self, field, loci, pas)
+        self.Upstream = None
+        self.Cache = None
 
-    def sample(self, pas=None):
+    def __find(self, pas):
+        """
+        Find the distribution (or the value) given upstream; rebuilt only if the upstream values changed
+        """
         pas = self.read_upstream(pas)
-        return self.Loci.render(pas)
+        up = self.snapshot(pas)
+        if self.Upstream is None or not _same(up, self.Upstream):
+            if isinstance(self.Loci, DistributionLoci):
+                self.Cache = self.Loci.get_distribution(pas)
+            else:
+                self.Cache = self.Loci.render(pas)
+            self.Upstream = up
+        return self.Cache
+
+    def sample(self, pas=None):
+        if isinstance(self.Loci, DistributionLoci):
+            return self.__find(pas).sample()
+        return self.__find(pas)
+
+    def sample_batch(self, n, pas=None):
+        if isinstance(self.Loci, DistributionLoci):
+            return _draw(self.__find(pas), n)
+        else:
+            return np.full(n, self.__find(pas))
 
     def __repr__(self):
         return '{} ({})'.format(self.Field, str(self))
@@ -78,6 +142,13 @@ class CompoundActor(SimulationActor):
             pas[loc.Name] = loc.render(pas)
         return self.Loci.render(pas)
 
+    def sample_batch(self, n, pas=None):
+        cols = self.read_upstream(pas)
+
+        for loc in self.Flow:
+            cols[loc.Name] = loc.render_batch(cols, n)
+        return self.Loci.render_batch(cols, n)
+
     def sample_with_mediators(self, pas=None):
         pas = self.read_upstream(pas)
 
@@ -119,14 +190,14 @@ class Sampler:
 
     def sample(self, n=1):
         """
-        Sample a list of values
-        :param n: integer > 0, size of sampled list
-        :return: a list of values
+        Sample values in bulk
+        :param n: integer > 0, size of samples
+        :return: a single value if n is 1; np.ndarray of values otherwise
         """
         n = max(n, 1)
-        if n is 1:
+        if n == 1:
             return self()
-        return [self() for _ in range(n)]
+        return self.Actor.sample_batch(n, self.Chromosome)
 
     def __str__(self):
         return 'Actor {} on {}'.format(repr(self.Actor), self.Chromosome.Nickname)
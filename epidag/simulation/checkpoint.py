@@ -0,0 +1,313 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from epidag.simulation.partable import ParameterCoreTable
+
+__author__ = 'TimeWz667'
+__all__ = ['TreeCheckpoint', 'save_checkpoint', 'load_checkpoint']
+
+
+def _address(pc):
+    names = list()
+    while pc is not None:
+        names.append(pc.Nickname)
+        pc = pc.Parent
+    return '@'.join(reversed(names))
+
+
+def _covered(adrs, tops):
+    """
+    Find the addresses in the subtrees of some tops
+    :param adrs: np.ndarray of str, addresses of nodes
+    :param tops: addresses of the tops of subtrees
+    :return: np.ndarray of bool
+    """
+    adrs = np.asarray(adrs, dtype=str)
+    sel = np.zeros(len(adrs), dtype=bool)
+    for top in tops:
+        sel |= (adrs == top) | np.char.startswith(adrs, top + '@')
+    return sel
+
+
+def _to_nan(v):
+    return np.nan if v is None else v
+
+
+def _from_nan(v):
+    return None if np.isnan(v) else float(v)
+
+
+def _as_column(values, n):
+    """
+    Pack the values of a locus into a column; numbers of different types are promoted to a common type
+    :param values: list of (row, value)
+    :param n: number of rows
+    :return: np.ndarray of values, np.ndarray of presences or None if no value is missing
+    :raise ValueError: if the values are not scalars, or mix numbers and strings
+    """
+    rows = [i for i, _ in values]
+    arr = np.asarray([v for _, v in values])
+    if arr.dtype == object:
+        raise ValueError('Loci of non-scalar values cannot be checkpointed')
+    kinds = {np.asarray(v).dtype.kind for _, v in values}
+    if len(kinds) > 1 and not kinds.issubset('biuf'):
+        raise ValueError('Loci mixing values of types {} cannot be checkpointed'.format(sorted(kinds)))
+    if len(rows) == n:
+        return arr, None
+    col = np.zeros(n, dtype=arr.dtype)
+    col[rows] = arr
+    mask = np.zeros(n, dtype=bool)
+    mask[rows] = True
+    return col, mask
+
+
+class TreeCheckpoint:
+    """
+    Columnar checkpoint of ParameterCore trees kept in a directory.
+    Every write appends segments, one per simulation group, of which nodes are keyed by the addresses of
+    their parents and hold columns of loci, LogPrior and LogLikelihood; a ParameterCoreTable is kept as
+    a segment of its own. Columns are stored as .npy files, so they can be memory-mapped when read.
+    A write of a subtree replaces the subtree: the nodes written before under its top are dropped when read.
+    A subtree can only be written below a parent written before
+    """
+    Version = 2
+
+    def __init__(self, path):
+        """
+        :param path: directory of the checkpoint; created if it does not exist
+        """
+        self.Path = path
+        os.makedirs(path, exist_ok=True)
+        try:
+            with open(self.__file('meta.json')) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            meta = {'Version': TreeCheckpoint.Version, 'Writes': 0, 'Tops': list(), 'Segments': list()}
+        if meta['Version'] != TreeCheckpoint.Version:
+            raise ValueError('Unknown version of checkpoint')
+        self.Writes = meta['Writes']
+        # address of the top of the subtree of every write
+        self.Tops = meta['Tops']
+        self.Segments = meta['Segments']
+
+    def __file(self, name):
+        return os.path.join(self.Path, name)
+
+    def __save_meta(self):
+        meta = {'Version': TreeCheckpoint.Version, 'Writes': self.Writes, 'Tops': self.Tops,
+                'Segments': self.Segments}
+        tmp = self.__file('meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.__file('meta.json'))
+
+    def __save_column(self, seg, arr):
+        seg['Files'] += 1
+        file = 's{}-{}.npy'.format(len(self.Segments), seg['Files'])
+        np.save(self.__file(file), np.ascontiguousarray(arr), allow_pickle=False)
+        return file
+
+    def __load_column(self, file, mmap):
+        return np.load(self.__file(file), mmap_mode='c' if mmap else None, allow_pickle=False)
+
+    @property
+    def Groups(self):
+        return list(dict.fromkeys(seg['Group'] for seg in self.Segments))
+
+    def write(self, pc):
+        """
+        Append a ParameterCore and its offsprings to the checkpoint.
+        The subtree replaces what was written before under the same node, including removed offsprings
+        :param pc: ParameterCore, the top of the subtree
+        :raise ValueError: if the parent of the subtree has not been written, or a locus cannot be packed
+        """
+        nodes, tables = dict(), list()
+        stack = [(pc, _address(pc.Parent) if pc.Parent is not None else '')]
+        top = _address(pc)
+        if stack[0][1] and not _covered([stack[0][1]], self.Tops)[0]:
+            raise ValueError('The parent of {} has not been written; write its ancestors first'.format(top))
+        while stack:
+            node, pa = stack.pop()
+            node.sync()
+            nodes.setdefault(node.Group, list()).append((pa, node))
+            adr = '{}@{}'.format(pa, node.Nickname) if pa else node.Nickname
+            tables += [(adr, tab) for tab in node.Tables]
+            stack += [(chd, adr) for chd in reversed(list(node.Children.values()))]
+
+        n_segments = len(self.Segments)
+        self.Writes += 1
+        self.Tops.append(top)
+        try:
+            for group, ns in nodes.items():
+                self.__write_nodes(group, ns)
+            for adr, tab in tables:
+                self.__write_table(adr, tab)
+        except ValueError:
+            # the files of a failed write are left unreferenced and overwritten by the next one
+            self.Writes -= 1
+            self.Tops.pop()
+            del self.Segments[n_segments:]
+            raise
+        self.__save_meta()
+
+    def __new_segment(self, kind, group, n, **kwargs):
+        seg = {'Kind': kind, 'Group': group, 'Write': self.Writes, 'Rows': n, 'Files': 0,
+               'Columns': dict(), 'Masks': dict()}
+        seg.update(kwargs)
+        return seg
+
+    def __write_nodes(self, group, ns):
+        n = len(ns)
+        seg = self.__new_segment('Nodes', group, n)
+        cols = dict()
+        for i, (_, node) in enumerate(ns):
+            for k, v in node.Locus.items():
+                cols.setdefault(k, list()).append((i, v))
+
+        seg['Parent'] = self.__save_column(seg, np.array([pa for pa, _ in ns], dtype=str))
+        seg['Nickname'] = self.__save_column(seg, np.array([node.Nickname for _, node in ns], dtype=str))
+        for k, vs in cols.items():
+            col, mask = _as_column(vs, n)
+            seg['Columns'][k] = self.__save_column(seg, col)
+            if mask is not None:
+                seg['Masks'][k] = self.__save_column(seg, mask)
+        prior = [_to_nan(node.LogPrior) for _, node in ns]
+        li = [_to_nan(node.LogLikelihood) for _, node in ns]
+        seg['LogPrior'] = self.__save_column(seg, np.array(prior, dtype=np.float64))
+        seg['LogLikelihood'] = self.__save_column(seg, np.array(li, dtype=np.float64))
+        self.Segments.append(seg)
+
+    def __write_table(self, adr, tab):
+        tab.sync()
+        seg = self.__new_segment('Table', tab.Group, len(tab.Alive), Parent=adr, Prefix=tab.Prefix)
+        for k, col in tab.Columns.items():
+            seg['Columns'][k] = self.__save_column(seg, col)
+        seg['LogPrior'] = self.__save_column(seg, tab.LogPrior)
+        seg['LogLikelihood'] = self.__save_column(seg, tab.LogLikelihood)
+        seg['Alive'] = self.__save_column(seg, tab.Alive)
+        self.Segments.append(seg)
+
+    def __identify(self, seg):
+        """
+        Identify the rows of a segment
+        :param seg: segment
+        :return: np.ndarray of parents, np.ndarray of nicknames, np.ndarray of bool of rows not replaced later
+        """
+        if seg['Kind'] == 'Table':
+            n = seg['Rows']
+            parents = np.full(n, seg['Parent'])
+            nicknames = np.char.add(seg['Prefix'], np.arange(n).astype(str))
+            live = self.__load_column(seg['Alive'], False).copy()
+        else:
+            parents = self.__load_column(seg['Parent'], False)
+            nicknames = self.__load_column(seg['Nickname'], False)
+            live = np.ones(len(nicknames), dtype=bool)
+        later = self.Tops[seg['Write']:]
+        if later:
+            adrs = np.where(parents == '', nicknames, np.char.add(np.char.add(parents, '@'), nicknames))
+            live &= ~_covered(adrs, later)
+        return parents, nicknames, live
+
+    def read_group(self, group, mmap=True):
+        """
+        Read the nodes of a group as a columnar store
+        :param group: name of the simulation group
+        :param mmap: True if columns are memory-mapped
+        :return: pd.DataFrame of parents, nicknames, loci, LogPrior and LogLikelihood, one row per node
+        """
+        dfs = list()
+        for seg in self.Segments:
+            if seg['Group'] != group:
+                continue
+            parents, nicknames, live = self.__identify(seg)
+            df = pd.DataFrame({k: self.__load_column(file, mmap) for k, file in seg['Columns'].items()})
+            for k, file in seg['Masks'].items():
+                df[k] = df[k].where(self.__load_column(file, mmap))
+            df['LogPrior'] = self.__load_column(seg['LogPrior'], mmap)
+            df['LogLikelihood'] = self.__load_column(seg['LogLikelihood'], mmap)
+            df.insert(0, 'Nickname', nicknames)
+            df.insert(0, 'Parent', parents)
+            dfs.append(df[live])
+        if not dfs:
+            raise KeyError('No matched group')
+        return pd.concat(dfs, ignore_index=True)
+
+    def restore(self, sc, mmap=True):
+        """
+        Rebuild the tree without re-sampling. Members of tables are restored as columns, while a ParameterCore
+        is built for every other node, so restoring costs time in the number of nodes out of tables
+        :param sc: SimulationCore, the simulation core which the tree was generated from
+        :param mmap: True if the columns of tables are memory-mapped (copied on write)
+        :return: ParameterCore, the root of the tree
+        """
+        index = dict()
+        for seg in self.Segments:
+            if seg['Kind'] == 'Table':
+                self.__restore_table(sc, seg, index, mmap)
+            else:
+                self.__restore_nodes(sc, seg, index)
+        for pc in index.values():
+            if pc.Parent is None:
+                return pc
+        raise ValueError('No root in the checkpoint')
+
+    def __restore_nodes(self, sc, seg, index):
+        sg = sc[seg['Group']]
+        parents, nicknames, live = self.__identify(seg)
+        rows = np.flatnonzero(live)
+        if not len(rows):
+            return
+        keys = list(seg['Columns'])
+        cols = [self.__load_column(seg['Columns'][k], False)[rows].tolist() for k in keys]
+        prior = self.__load_column(seg['LogPrior'], False)[rows]
+        li = self.__load_column(seg['LogLikelihood'], False)[rows]
+
+        # loci of the rows, built in bulk
+        locus = [dict(zip(keys, vs)) for vs in zip(*cols)] if keys else [dict() for _ in rows]
+        for k, file in seg['Masks'].items():
+            for j in np.flatnonzero(~self.__load_column(file, False)[rows]):
+                del locus[j][k]
+
+        for j, (pa, name) in enumerate(zip(parents[rows].tolist(), nicknames[rows].tolist())):
+            parent = index[pa] if pa else None
+            pc = sg.as_parameter_core(name, locus[j], _from_nan(prior[j]), parent)
+            pc.LogLikelihood = _from_nan(li[j])
+            if parent is not None:
+                parent.Children[name] = pc
+            index['{}@{}'.format(pa, name) if pa else name] = pc
+
+    def __restore_table(self, sc, seg, index, mmap):
+        _, _, live = self.__identify(seg)
+        if not live.any():
+            return
+        parent = index[seg['Parent']]
+        cols = {k: self.__load_column(file, mmap) for k, file in seg['Columns'].items()}
+        tab = ParameterCoreTable(sc[seg['Group']], parent, seg['Prefix'], cols,
+                                 self.__load_column(seg['LogPrior'], mmap))
+        tab.LogLikelihood = self.__load_column(seg['LogLikelihood'], mmap)
+        tab.Alive = live
+        parent.Tables.append(tab)
+
+
+def save_checkpoint(pc, path):
+    """
+    Append a ParameterCore and its offsprings to a checkpoint
+    :param pc: ParameterCore
+    :param path: directory of the checkpoint
+    :return: TreeCheckpoint
+    """
+    cp = TreeCheckpoint(path)
+    cp.write(pc)
+    return cp
+
+
+def load_checkpoint(path, sc, mmap=True):
+    """
+    Restore a tree of ParameterCores from a checkpoint
+    :param path: directory of the checkpoint
+    :param sc: SimulationCore, the simulation core which the tree was generated from
+    :param mmap: True if the columns of tables are memory-mapped
+    :return: ParameterCore, the root of the tree
+    """
+    return TreeCheckpoint(path).restore(sc, mmap)
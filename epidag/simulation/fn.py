@@ -5,18 +5,21 @@ __author__ = 'TimeWz667'
 __all__ = ['as_simulation_core', 'quick_build_parameter_core']
 
 
-def as_simulation_core(bn, ns: NodeSet=None):
+def as_simulation_core(bn, ns: NodeSet=None, lazy_prior=False, weak_parents=False):
     """
     a blueprint of a simulation model based on given a Bayesian network.
     It describes every node in the network as 1) fixed variable, 2) random variable, 3) exposed distribution
     :param bn: epidag.BayesNet, a Bayesian Network
     :param ns: name of root group
+    :param lazy_prior: True if the log priors of generated parameters are evaluated on their first access
+    :param weak_parents: True if parameters refer to their parents by weak references; the root must be kept
+    referenced while its offsprings are in use
     :return: a simulation model
     """
     if not ns:
         ns = NodeSet('Root', as_floating=bn.DAG.leaves())
     ns.inject_bn(bn)
-    return SimulationCore(bn, ns)
+    return SimulationCore(bn, ns, lazy_prior, weak_parents)
 
 
 def quick_build_parameter_core(script):
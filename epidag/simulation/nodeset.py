@@ -1,5 +1,6 @@
+import time
+from contextlib import contextmanager
 from epidag.bayesnet import BayesianNetwork
-import epidag.bayesnet.dag as dag
 import epidag.simulation.actor as act
 
 __author__ = 'TimeWz'
@@ -37,6 +38,149 @@ class ActorBlueprint:
         return st
 
 
+class BayesNetAnalysis:
+    """
+    Structural queries on a Bayesian network during an injection of node sets.
+    Sets of nodes are held as bit masks over the topological order, so that ancestors are found once per
+    network and requirements and randomness are memoised by the node and the given nodes which affect
+    the answer. The time taken by each phase of the injection is recorded in Timings
+    """
+    def __init__(self, bn: BayesianNetwork):
+        self.BN = bn
+        self.Order = list(bn.Order)
+        self.Roots = list(bn.Roots)
+        self.Bits = {d: 1 << i for i, d in enumerate(self.Order)}
+        self.Timings = dict()
+
+        g = bn.DAG
+        self.__ancestors = dict()
+        for d in self.Order:
+            anc = 0
+            for p in g.predecessors(d):
+                anc |= self.__ancestors[p] | self.Bits[p]
+            self.__ancestors[d] = anc
+        self.__rv = {d for d in self.Order if bn.is_rv(d)}
+        self.__exo = {d for d in self.Order if bn.is_exogenous(d)}
+        self.__rv_mask = self.mask(self.__rv)
+        self.__requirements = dict()
+
+    def __getitem__(self, item):
+        return self.BN[item]
+
+    def is_rv(self, node):
+        return node in self.__rv
+
+    def is_exogenous(self, node):
+        return node in self.__exo
+
+    def mask(self, nodes):
+        """
+        :param nodes: iterable of nodes
+        :return: int, bit mask of the nodes
+        """
+        bits = self.Bits
+        m = 0
+        for d in nodes:
+            m |= bits[d]
+        return m
+
+    def unmask(self, m):
+        """
+        :param m: int, bit mask of nodes
+        :return: list of the nodes in topological order
+        """
+        order, nodes = self.Order, list()
+        while m:
+            low = m & -m
+            nodes.append(order[low.bit_length() - 1])
+            m ^= low
+        return nodes
+
+    def sort(self, nodes):
+        return self.unmask(self.mask(nodes))
+
+    def ancestors(self, node):
+        return set(self.unmask(self.__ancestors[node]))
+
+    def upstream(self, nodes):
+        anc = 0
+        for d in nodes:
+            anc |= self.__ancestors[d]
+        return set(self.unmask(anc))
+
+    def minimal_dag(self, nodes):
+        """
+        Nodes on the paths between the given nodes
+        :param nodes: iterable, the nodes of interest
+        :return: list of nodes in topological order
+        """
+        m = self.mask(nodes)
+        des, anc = 0, 0
+        for d in self.Order:
+            if self.__ancestors[d] & m:
+                des |= self.Bits[d]
+            if self.Bits[d] & m:
+                anc |= self.__ancestors[d]
+        # descendants of the given nodes which are ancestors of any of them
+        return self.unmask(m | (des & anc))
+
+    def __requirements_mask(self, node, given):
+        if not isinstance(given, int):
+            given = self.mask(given)
+        anc = self.__ancestors[node]
+        key = node, anc & given
+        try:
+            return self.__requirements[key][0]
+        except KeyError:
+            req, rest = anc, key[1]
+            while rest:
+                # from the last given node; those screened off by a later one need no removal
+                top = rest.bit_length() - 1
+                req &= ~self.__ancestors[self.Order[top]]
+                rest &= req & ~(1 << top)
+            self.__requirements[key] = req, None
+            return req
+
+    def minimal_requirements(self, node, given):
+        """
+        Ancestors of a node not screened off by the given nodes, see epidag.bayesnet.dag.minimal_requirements
+        :param node: the target node
+        :param given: iterable of nodes or their bit mask
+        :return: list of nodes in topological order
+        """
+        if not isinstance(given, int):
+            given = self.mask(given)
+        req = self.__requirements_mask(node, given)
+        key = node, self.__ancestors[node] & given
+        nodes = self.__requirements[key][1]
+        if nodes is None:
+            nodes = self.unmask(req)
+            self.__requirements[key] = req, nodes
+        return list(nodes)
+
+    def has_randomness(self, node, given=None):
+        """
+        Check if a node is random given some nodes, see BayesianNetwork.has_randomness
+        :param node: the target node
+        :param given: iterable of nodes or their bit mask
+        """
+        if node in self.__rv:
+            return True
+        if not given:
+            return self.__ancestors[node] & self.__rv_mask != 0
+        if not isinstance(given, int):
+            given = self.mask(given)
+        return self.__requirements_mask(node, given) & ~given & self.__rv_mask != 0
+
+    @contextmanager
+    def phase(self, name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.Timings[name] = self.Timings.get(name, 0) + time.perf_counter() - t
+
+
 class NodeSet:
     def __init__(self, name, as_fixed=None, as_floating=None):
         self.Name = name
@@ -54,6 +198,7 @@ class NodeSet:
         self.__will_be_floating = None
         self.LocalSamplers = None
         self.SharedSamplers = None
+        self.Timings = None
         self.__frozen = False
 
     def defrost(self):
@@ -93,14 +238,23 @@ class NodeSet:
         :return:
         """
         assert not self.__frozen
-        assert self._validate_initial_conditions(bn)
-
-        self._resolve_local_nodes(bn)
-        self._raise_up_floating()
-        self._resolve_relations(bn)
-        self._locate_undefined(bn)
-        self._define_sampler_blueprints(bn)
-        self._sort_fixed_nodes(bn)
+        ana = BayesNetAnalysis(bn)
+        with ana.phase('Validation'):
+            assert self._validate_initial_conditions(ana)
+
+        with ana.phase('LocalNodes'):
+            self._resolve_local_nodes(ana)
+        with ana.phase('Floating'):
+            self._raise_up_floating()
+        with ana.phase('Relations'):
+            self._resolve_relations(ana)
+        with ana.phase('Undefined'):
+            self._locate_undefined(ana)
+        with ana.phase('Samplers'):
+            self._define_sampler_blueprints(ana)
+        with ana.phase('Sorting'):
+            self._sort_fixed_nodes(ana)
+        self.Timings = ana.Timings
         self.__frozen = True
 
     def _validate_initial_conditions(self, bn):
@@ -108,11 +262,10 @@ class NodeSet:
             if not ch._validate_initial_conditions(bn):
                 return False
 
-        g = bn.DAG
         if not self.__as_fixed:
             return True
 
-        anc = g.upstream(self.__as_fixed)
+        anc = bn.upstream(self.__as_fixed)
 
         for d in self.__as_floating:
             if d in self.__as_fixed:
@@ -127,13 +280,12 @@ class NodeSet:
         Identify mediators and find requirements
         :param bn: source bayesian network
         """
-        g = bn.DAG
-        mini = dag.minimal_dag(g, set.union(self.__as_fixed, self.__as_floating)).order()
+        mini = bn.minimal_dag(set.union(self.__as_fixed, self.__as_floating))
 
         med = set(mini)
         med.difference_update(self.__as_fixed)
         med.difference_update(self.__as_floating)
-        med = g.sort(med)
+        med = bn.sort(med)
 
         self.FloatingNodes = set(self.__as_floating)
         self.FixedNodes = set(self.__as_fixed)
@@ -170,9 +322,10 @@ class NodeSet:
         # requirements for fixed nodes (giving values at initialisation)
         self.ExoNodes = set()
 
-        for i, node in enumerate(mini):
-            par = mini[:i]
-            rq = dag.minimal_requirements(g, node, par)
+        par = 0
+        for node in mini:
+            rq = bn.minimal_requirements(node, par)
+            par |= bn.Bits[node]
 
             if node in self.FloatingNodes:
                 self.ListeningNodes.update(rq)
@@ -266,11 +419,11 @@ class NodeSet:
         self._pass_down_undefined(bn, set(), set(), undefined)
 
     def _define_sampler_blueprints(self, bn):
-        g = bn.DAG
         self.LocalSamplers = dict()
         self.SharedSamplers = dict()
 
         af = set.union(self.__was_fixed, self.FixedNodes)
+        af_mask = bn.mask(af)
 
         # If all parent nodes have been fixed without local changes -> f, f
         # If all parent nodes have been fixed but have local changes -> s, f
@@ -287,7 +440,7 @@ class NodeSet:
                 else:
                     self.SharedSamplers[d] = self.LocalSamplers[d]
             else:
-                req = dag.minimal_requirements(g, d, af)
+                req = bn.minimal_requirements(d, af_mask)
                 to_read = [n for n in req if n in af or bn.is_exogenous(n)]
                 to_sample = [n for n in req if n not in to_read]
                 actor = ActorBlueprint(d, ActorBlueprint.Compound, to_read, to_sample)
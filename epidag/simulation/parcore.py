@@ -1,3 +1,6 @@
+import sys
+from weakref import ref
+import pandas as pd
 from epidag.bayesnet import Chromosome
 from epidag.simulation.actor import FrozenSingleActor, Sampler, CompoundActor
 
@@ -6,12 +9,46 @@ __author__ = 'TimeWz667'
 
 
 class ParameterCore(Chromosome):
+    # The state below is read from these class-level defaults until a node first changes it,
+    # and containers are created on first use, so leaves hold little more than their loci
+
+    # deferred log prior: evaluated on the first access, see defer_prior
+    __prior = None
+    __deferred = False
+    # DeepLogPrior of the subtree; None if outdated
+    __deep = None
+    # the parent, held by a weak reference if the simulation core asks for weak parents
+    __parent = None
+    __weak = False
+    # index of visible parameters; handles of samplers
+    __index = None
+    __samplers = None
+    # lazy interventions: a clock shared by the tree, the interventions passed to children,
+    # and the position in the parent's log up to which this node has caught up.
+    # Positions count the interventions dropped from the head of the log once every consumer passed them
+    __clock = None
+    __synced = 0
+    __log = None
+    __base = 0
+    __trim_at = 16
+    __cursor = 0
+    # copy-on-write branches: the node mirrored before unfolding its offsprings, the branches
+    # forked from the tree (shared by the tree with the clock), and if the loci are shared with another node
+    __origin = None
+    __forks = None
+    __forked = 0
+    __shared = False
+    # registry of offsprings by addresses, created on the root if enabled and shared by the registered
+    # offsprings; the address of the node in it
+    __registry = None
+    __address = None
+
     def __init__(self, nickname, sg, vs, prior):
         Chromosome.__init__(self, vs, prior)
         self.Nickname = nickname
         self.SG = sg
-        self.Parent = None
         self.Children = dict()
+        self.Tables = list()
         self.Actors = None
         self.ChildrenActors = None
 
@@ -19,7 +56,157 @@ class ParameterCore(Chromosome):
     def Group(self):
         return self.SG.Name
 
-    def breed(self, nickname, group, exo=None):
+    @property
+    def LogPrior(self):
+        if self.__deferred:
+            self.sync()
+        if self.__deferred:
+            self.__deferred = False
+            self.__prior = self.SG.Plan.evaluate(self)
+        return self.__prior
+
+    @LogPrior.setter
+    def LogPrior(self, prior):
+        if self.__deferred:
+            self.__deferred = False
+        self.__prior = prior
+        self._invalidate_deep()
+
+    def defer_prior(self):
+        """
+        Leave the log prior to be evaluated on its first access
+        """
+        self.__deferred = True
+
+    def is_prior_deferred(self):
+        return self.__deferred
+
+    @property
+    def Parent(self):
+        """
+        The parent node. With weak parents, user code must keep a reference to the root
+        for as long as its offsprings are in use
+        :raise ReferenceError: if the parent, held by a weak reference, has been collected
+        """
+        if self.__weak:
+            pa = self.__parent()
+            if pa is None:
+                raise ReferenceError('The parent of {} has been collected; '
+                                     'keep a reference to the root while using its offsprings'.format(self.Nickname))
+            return pa
+        return self.__parent
+
+    @Parent.setter
+    def Parent(self, pa):
+        self.__weak = pa is not None and self.SG is not None and self.SG.SC.WeakParents
+        self.__parent = ref(pa) if self.__weak else pa
+        if pa is not None:
+            clock = pa._get_clock()
+            if self.__clock is not clock:
+                self.__share_clock(clock, pa.__forks)
+            self.__synced = clock[0]
+            self.__cursor = pa._get_log_end()
+        self._reset_index()
+
+    def __share_clock(self, clock, forks):
+        for chd in self.__children.values():
+            chd.sync()
+            chd.__share_clock(clock, forks)
+            chd.__synced = clock[0]
+        self.__clock = clock
+        self.__forks = forks
+        self.__forked = len(forks)
+
+    @property
+    def Children(self):
+        if self.__origin is not None:
+            self.__unfold()
+        return self.__children
+
+    @Children.setter
+    def Children(self, children):
+        self.__children = children
+
+    def _get_clock(self):
+        if self.__clock is None:
+            # the first node asked for the clock is the root; its offsprings share the clock and the forks
+            self.__clock, self.__forks = [0], list()
+        return self.__clock
+
+    def _get_log(self):
+        """
+        :return: the lazy interventions kept for children and tables to catch up with
+        """
+        return self.__log if self.__log is not None else list()
+
+    def _get_log_end(self):
+        """
+        :return: the position after the last lazy intervention
+        """
+        return self.__base + (len(self.__log) if self.__log else 0)
+
+    def _read_log(self, cursor):
+        """
+        :param cursor: position up to which a consumer has caught up
+        :return: the lazy interventions after the position
+        """
+        return self.__log[cursor - self.__base:] if self.__log else list()
+
+    def __trim_log(self):
+        """
+        Drop the lazy interventions which every child and table has caught up with.
+        The consumers are checked once per as many interventions as there are consumers
+        """
+        log, consumers = self.__log, len(self.__children) + len(self.Tables)
+        low = min([chd.__cursor for chd in self.__children.values()] + [tab.Cursor for tab in self.Tables],
+                  default=self._get_log_end())
+        if low > self.__base:
+            del log[:low - self.__base]
+            self.__base = low
+        self.__trim_at = len(log) + max(consumers, ParameterCore.__trim_at)
+
+    def sync(self):
+        """
+        Catch up with the lazy interventions on ancestors
+        """
+        if self.__clock is None:
+            return
+        clock = self.__clock[0]
+        if self.__synced == clock:
+            return
+        self.__synced = clock
+        pa = self.Parent
+        if pa is not None:
+            pa.sync()
+            end = pa._get_log_end()
+            if self.__cursor < end:
+                self._touch()
+                pending, self.__cursor = pa._read_log(self.__cursor), end
+                for imp, shocked in pending:
+                    self.__respond(imp, shocked, True)
+
+    def _get_index(self):
+        """
+        Index of visible parameters, shared by all the children
+        :return: dict(name: the ParameterCore holding the parameter)
+        """
+        if self.__index is None:
+            index = dict(self.Parent._get_index()) if self.Parent is not None else dict()
+            index.update(dict.fromkeys(self.Locus, self))
+            self.__index = index
+        return self.__index
+
+    def _reset_index(self):
+        """
+        Drop the indices of visible parameters of this node and its offsprings
+        """
+        if self.__index is None:
+            return
+        self.__index = None
+        for chd in self.__children.values():
+            chd._reset_index()
+
+    def breed(self, nickname, group, exo=None, lazy_prior=None):
         """
         Generate an offspring node
         :param nickname: nickname
@@ -28,14 +215,45 @@ class ParameterCore(Chromosome):
         :type group: str
         :param exo: exogenous variables
         :type exo:
+        :param lazy_prior: True if the log prior is evaluated on its first access; None to follow the simulation core
         :return: child parameter core
         """
-        if nickname in self.Children:
+        if self.has_child(nickname):
             raise ValueError('{} has already existed'.format(nickname))
-        chd = self.SG.breed(nickname, group, self, exo)
+        self._touch()
+        chd = self.SG.breed(nickname, group, self, exo, lazy_prior)
         self.Children[nickname] = chd
+        self._register_child(chd)
+        self._invalidate_deep()
         return chd
 
+    def breed_many(self, prefix, group, n, exo=None):
+        """
+        Generate offspring nodes in batch
+        :param prefix: prefix of nicknames, followed by the indices of offsprings
+        :type prefix: str
+        :param group: target group of new parameter nodes
+        :type group: str
+        :param n: number of offsprings
+        :type n: int
+        :param exo: exogenous variables, one row per offspring
+        :type exo: pd.DataFrame or dict of arrays
+        :return: ParameterCoreTable of the offsprings, sharing columns of loci
+        """
+        names = [k for k in self.Children if k.startswith(prefix)]
+        for tab in self.Tables:
+            if tab.Prefix.startswith(prefix) or prefix.startswith(tab.Prefix):
+                names += tab.Nicknames
+        for name in names:
+            i = name[len(prefix):]
+            if i.isdigit() and str(int(i)) == i and int(i) < n:
+                raise ValueError('{} has already existed'.format(name))
+        self._touch()
+        tab = self.SG.breed_many(prefix, group, self, n, exo)
+        self._invalidate_deep()
+        self.Tables.append(tab)
+        return tab
+
     def get_sibling(self, nickname, exo=None):
         """
         Generate a sibling node
@@ -70,14 +288,97 @@ class ParameterCore(Chromosome):
         """
         if not self.Parent:
             return
+        self.sync()
         self.Parent.remove_children(self.Nickname)
         if collect_pars:
-            for k, v in self.Parent:
-                self[k] = v
+            self._touch()
+            self.Locus.update(iter(self.Parent))
+            self.reset_probability()
             self.SG.set_local_actors(self)
 
         self.Parent = None
 
+    def dispose(self):
+        """
+        Remove the node from its parent and release it with its offsprings: actors, samplers, tables
+        and the links among the nodes are dropped, so the samplers kept elsewhere hold nothing alive
+        """
+        try:
+            attached = self.Parent is not None
+        except ReferenceError:
+            # the parent has gone already
+            attached = False
+        if attached:
+            self.detach_from_parent()
+        stack = [self]
+        while stack:
+            sel = stack.pop()
+            # offsprings not unfolded yet belong to the mirrored node
+            stack.extend(sel.__children.values())
+            sel.__release()
+
+    def __release(self):
+        if self.__samplers:
+            for _, samplers in self.__samplers.values():
+                for sam in samplers.values():
+                    sam.Chromosome = None
+        self.__samplers = None
+        for tab in self.Tables:
+            tab.dispose()
+        self.Tables = list()
+        self.__children = dict()
+        self.Actors = None
+        self.ChildrenActors = None
+        self.__index = None
+        self.__log, self.__base = None, 0
+        self.__registry = self.__address = None
+        self.__origin = None
+        self.__parent, self.__weak = None, False
+
+    def memory_report(self):
+        """
+        Account the memory held by this node and its offsprings by simulation group.
+        Offsprings shared with the mirrored node of a branch are not counted
+        :return: pd.DataFrame, one row per group of the numbers of nodes, members of tables, loci,
+        actors and samplers, and the estimated bytes
+        """
+        report = dict()
+
+        def row(group):
+            try:
+                return report[group]
+            except KeyError:
+                rec = report[group] = dict.fromkeys(['Nodes', 'Members', 'Loci', 'Actors', 'Samplers', 'Bytes'], 0)
+                return rec
+
+        stack = [self]
+        while stack:
+            sel = stack.pop()
+            stack.extend(sel.__children.values())
+            rec = row(sel.Group)
+            rec['Nodes'] += 1
+            rec['Loci'] += len(sel.Locus)
+            rec['Actors'] += len(sel.Actors) if sel.Actors else 0
+            if sel.ChildrenActors:
+                for gp, actors in sel.ChildrenActors.items():
+                    row(gp)['Actors'] += len(actors)
+            if sel.__samplers:
+                rec['Samplers'] += sum(len(samplers) for _, samplers in sel.__samplers.values())
+            rec['Bytes'] += sys.getsizeof(sel) + sys.getsizeof(sel.Locus) + \
+                sum(sys.getsizeof(v) for v in sel.Locus.values())
+
+            for tab in sel.Tables:
+                rec = row(tab.Group)
+                rec['Members'] += tab.Size
+                rec['Loci'] += tab.Size * len(tab.Columns)
+                rec['Actors'] += sum(len(actors) for actors in tab.Actors.values() if actors)
+                rec['Samplers'] += sum(len(samplers) for cache in tab.Samplers.values()
+                                       for _, samplers in cache.values())
+                rec['Bytes'] += sum(col.nbytes for col in tab.Columns.values()) + \
+                    tab.LogPrior.nbytes + tab.LogLikelihood.nbytes + tab.Alive.nbytes
+
+        return pd.DataFrame.from_dict(report, orient='index').rename_axis('Group')
+
     def remove_children(self, k):
         """
         Remove a child ParameterCore
@@ -85,12 +386,18 @@ class ParameterCore(Chromosome):
         :type k: str
         :return: the removed ParameterCore
         """
+        self._touch()
         try:
             chd = self.Children[k]
             del self.Children[k]
+            self._unregister_child(chd)
+            self._invalidate_deep()
             return chd
         except KeyError:
             pass
+        for tab in self.Tables:
+            if k in tab:
+                return tab.remove(k)
 
     def list_actors(self, shared=True):
         return list(self.get_actors(shared).keys())
@@ -102,6 +409,7 @@ class ParameterCore(Chromosome):
         :return: Random variable generators
         :rtype: dict
         """
+        self.sync()
         if shared and self.Parent:
             try:
                 return self.Parent.ChildrenActors[self.Group]
@@ -112,22 +420,62 @@ class ParameterCore(Chromosome):
             self.SG.put_local_actors(self)
         return self.Actors
 
-    def get_samplers(self, shared=True):
+    def _get_sampler_cache(self):
+        if self.__samplers is None:
+            self.__samplers = dict()
+        return self.__samplers
+
+    def __find_samplers(self, shared):
         actors = self.get_actors(shared)
-        return {k: Sampler(actor, self) for k, actor in actors.items()}
+        cache = self._get_sampler_cache()
+        try:
+            acts, samplers = cache[shared]
+            if acts is actors:
+                return actors, samplers
+        except KeyError:
+            pass
+        # actors were (re)composed; drop the handles bound to the old ones
+        cache[shared] = actors, dict()
+        return cache[shared]
+
+    def get_samplers(self, shared=True):
+        """
+        Get all the samplers; the handles are cached on the node
+        :param shared: true for the shared version
+        :return: dict(name: Sampler)
+        """
+        actors, samplers = self.__find_samplers(shared)
+        if len(samplers) < len(actors):
+            for k, actor in actors.items():
+                if k not in samplers:
+                    samplers[k] = Sampler(actor, self)
+        return samplers
 
     def get_sampler(self, sampler, shared=True):
         """
-        Get a sampler of a specific variable
+        Get a sampler of a specific variable; the handle is cached on the node
         :param sampler: name of the target sampler
         :param shared: true for the shared version
         :return:
         """
-        actor = self.get_actors(shared)[sampler]
-        return Sampler(actor, self)
+        actors, samplers = self.__find_samplers(shared)
+        try:
+            return samplers[sampler]
+        except KeyError:
+            sam = samplers[sampler] = Sampler(actors[sampler], self)
+            return sam
+
+    def has_child(self, name):
+        return name in self.Children or any(name in tab for tab in self.Tables)
 
     def get_child(self, name):
-        return self.Children[name]
+        try:
+            return self.Children[name]
+        except KeyError:
+            for tab in self.Tables:
+                if name in tab:
+                    return tab[name]
+            raise
 
     def get_child_samplers(self, group):
         assert group in self.SG.Children
@@ -140,22 +488,114 @@ class ParameterCore(Chromosome):
 
     def find_descendant(self, address):
         """
-        Find a descendant node
-        :param address: str, a series of names of nodes linked with '@'
+        Find a descendant node; looked up in the registry of the root if enabled
+        :param address: str, a series of names of nodes linked with '@', starting from a child of this node
         :return: a child node in the address
         """
-        sel = self
-        names = address.split('@')
+        reg = self.__registry
+        if reg is not None:
+            adr = self.__address
+            pc = reg.get('{}@{}'.format(adr, address) if adr else address)
+            if pc is not None:
+                return pc
 
-        for name in names:
+        sel = self
+        for name in address.split('@'):
             sel = sel.get_child(name)
         return sel
 
-    def impulse(self, imp, bn=None):
+    def iter_descendants(self, address=None):
+        """
+        Iterate over the ParameterCores of a subtree in pre-order; members of tables are not included
+        :param address: str, address of the top of the subtree, see find_descendant; None for this node
+        :return: generator of (address, ParameterCore), addresses relative to this node
+        """
+        if address is None:
+            yield from ParameterCore.__collect('', self)
+        else:
+            top = self.find_descendant(address)
+            yield address, top
+            yield from ParameterCore.__collect(address, top)
+
+    def enable_registry(self):
+        """
+        Keep the offsprings in a registry on the root mapping their addresses to them,
+        maintained on breeding and removing children
+        """
+        if self.Parent:
+            raise AttributeError('This is not the root. Please enable the registry on the root node')
+        self.disable_registry()
+        self.__registry, self.__address = dict(), ''
+        self.__enrol(self.__registry, ParameterCore.__collect('', self))
+
+    def disable_registry(self):
+        reg = self.__registry
+        if reg is None:
+            return
+        if self.Parent:
+            raise AttributeError('This is not the root. Please disable the registry on the root node')
+        for pc in reg.values():
+            pc.__registry = pc.__address = None
+        self.__registry = self.__address = None
+
+    @staticmethod
+    def __enrol(reg, entries):
+        for adr, pc in entries:
+            reg[adr] = pc
+            pc.__registry, pc.__address = reg, adr
+
+    @staticmethod
+    def __collect(address, pc):
+        stack = [(address, pc)]
+        while stack:
+            adr, sel = stack.pop()
+            chs = list(sel.Children.items())
+            for k, chd in reversed(chs):
+                stack.append(('{}@{}'.format(adr, k) if adr else k, chd))
+            if sel is not pc:
+                yield adr, sel
+
+    def _register_child(self, chd):
+        reg = self.__registry
+        if reg is not None:
+            adr = self.__address
+            adr = '{}@{}'.format(adr, chd.Nickname) if adr else chd.Nickname
+            ParameterCore.__enrol(reg, [(adr, chd)])
+            ParameterCore.__enrol(reg, list(ParameterCore.__collect(adr, chd)))
+
+    def _unregister_child(self, chd):
+        reg = self.__registry
+        if reg is not None:
+            adr = self.__address
+            adr = '{}@{}'.format(adr, chd.Nickname) if adr else chd.Nickname
+            for k, pc in [(adr, chd)] + list(ParameterCore.__collect(adr, chd)):
+                if reg.get(k) is pc:
+                    del reg[k]
+                pc.__registry = pc.__address = None
+
+    def impulse(self, imp, bn=None, lazy=False):
         """
         Do interventions
         :param imp: dict(node: value) or list(node), intervention
         :param bn: the original bayesian network
+        :param lazy: True if offsprings respond on their next access instead of now
+        """
+        imp, shocked = self._find_shocked(imp, bn)
+        self.sync()
+        if lazy:
+            self.__respond(imp, shocked, True)
+            clock = self._get_clock()
+            clock[0] += 1
+            self.__synced = clock[0]
+        else:
+            self.__set_response(imp, shocked)
+
+    def _find_shocked(self, imp, bn=None):
+        """
+        Split an intervention into the fixed values and the nodes to be resampled
+        :param imp: dict(node: value) or list(node), intervention
+        :param bn: the original bayesian network
+        :return: dict(node: value), set(node)
         """
         try:
             g = self.SG.SC.BN.DAG
@@ -173,10 +613,21 @@ class ParameterCore(Chromosome):
             imp = dict()
         else:
             raise AttributeError('imp defined incorrectly')
-        # print(shocked)
-        self.__set_response(imp, shocked)
+        return imp, shocked
 
     def __set_response(self, imp, shocked):
+        self.__respond(imp, shocked, False)
+
+        for v in self.Children.values():
+            v.sync()
+            v.__set_response(imp, shocked)
+        for tab in self.Tables:
+            tab.sync()
+            tab.set_response(imp, shocked)
+
+    def __respond(self, imp, shocked, lazy):
+        self._touch()
+        n_locus = len(self.Locus)
         shocked_locus = [s for s in shocked if s in self.Locus]
         try:
             shocked_actors = [k for k, v in self.Actors.items() if k in shocked and isinstance(v, FrozenSingleActor)]
@@ -194,12 +645,21 @@ class ParameterCore(Chromosome):
             pass
 
         self.SG.set_response(imp, shocked_locus, shocked_actors, shocked_hoist, self)
-
-        for v in self.Children.values():
-            v.__set_response(imp, shocked)
+        if len(self.Locus) != n_locus:
+            self._reset_index()
 
         if shocked_locus:
-            self.reset_probability()
+            # the log prior has been scored again by the group
+            self.LogLikelihood = None
+            if self.PriorTerms is not None:
+                self.PriorTerms = None
+
+        if lazy and (self.Children or self.Tables) and self.SG.affects_offsprings(shocked):
+            if self.__log is None:
+                self.__log = list()
+            self.__log.append((imp, shocked))
+            if len(self.__log) >= self.__trim_at:
+                self.__trim_log()
 
     def __dict__(self):
         return dict(self.Locus)
@@ -212,32 +672,117 @@ class ParameterCore(Chromosome):
     @property
     def DeepLogPrior(self):
         """
-        Log prior with that of offsprings
+        Log prior with that of offsprings. The sums of subtrees are cached on their tops,
+        so only the subtrees changed since the last access are summed again
         :return: log prior probability
         """
-        return self.LogPrior + sum(v.DeepLogPrior for v in self.Children.values())
+        self.sync()
+        if self.__deep is not None:
+            return self.__deep
+
+        stack = [(self, False)]
+        while stack:
+            sel, ready = stack.pop()
+            src = sel.__source()
+            if ready:
+                sel.__deep = sel.LogPrior + sum(chd.__deep for chd in src.__children.values()) + \
+                    sum(tab.DeepLogPrior for tab in src.Tables)
+                continue
+            stack.append((sel, True))
+            for chd in src.__children.values():
+                chd.sync()
+                if chd.__deep is None:
+                    stack.append((chd, False))
+        return self.__deep
+
+    def __source(self):
+        # offsprings not unfolded yet are the same as those of the mirrored node
+        src = self
+        while src.__origin is not None:
+            src = src.__origin
+        return src
+
+    def _invalidate_deep(self):
+        """
+        Mark the cached DeepLogPrior of this node and its ancestors outdated
+        """
+        if self.__deep is not None:
+            self.__deep = None
+        sel = self.Parent
+        while sel is not None and sel.__deep is not None:
+            sel.__deep = None
+            sel = sel.Parent
+
+    def iter_preorder(self):
+        """
+        Iterate over this node and its offsprings, parents before their children; members of tables are not included
+        :return: generator of ParameterCores
+        """
+        stack = [self]
+        while stack:
+            sel = stack.pop()
+            yield sel
+            stack.extend(reversed(list(sel.Children.values())))
+
+    def iter_postorder(self):
+        """
+        Iterate over this node and its offsprings, children before their parents; members of tables are not included
+        :return: generator of ParameterCores
+        """
+        stack = [(self, False)]
+        while stack:
+            sel, ready = stack.pop()
+            if ready:
+                yield sel
+                continue
+            stack.append((sel, True))
+            stack.extend((chd, False) for chd in reversed(list(sel.Children.values())))
+
+    def iter_group(self, group):
+        """
+        Iterate over this node and its offsprings in a group, in pre-order
+        :param group: name of the simulation group
+        :return: generator of ParameterCores
+        """
+        return (pc for pc in self.iter_preorder() if pc.Group == group)
 
     def __iter__(self):
-        if self.Parent:
-            for v in iter(self.Parent):
-                yield v
-        for v in self.Locus.items():
-            yield v
+        self.sync()
+        for k, pc in self._get_index().items():
+            yield k, pc.Locus[k]
 
     def __getitem__(self, item):
-        try:
-            return Chromosome.__getitem__(self, item)
-        except KeyError:
-            try:
-                return self.Parent[item]
-            except (AttributeError, KeyError, TypeError):
-                raise KeyError('{} not found'.format(item))
+        clock = self.__clock
+        if clock is not None and self.__synced != clock[0]:
+            self.sync()
+        locus = self.Locus
+        if item in locus:
+            return locus[item]
+        if self.Parent is not None:
+            pc = self.Parent._get_index().get(item)
+            if pc is not None:
+                return pc.Locus[item]
+        raise KeyError('{} not found'.format(item))
+
+    def __setitem__(self, key, value):
+        """
+        Set the value of a locus and score the log prior of this node again; offsprings are left as they are
+        """
+        self._touch()
+        new = key not in self.Locus
+        Chromosome.__setitem__(self, key, value)
+        if new:
+            self._reset_index()
+        if self.SG is not None:
+            self.LogPrior = self.SG.Plan.evaluate(self)
 
     def deep_print(self, i=0):
         prefix = '--' * i + ' ' if i else ''
         print('{}{} ({})'.format(prefix, self.Nickname, self))
         for k, chd in self.Children.items():
             chd.deep_print(i + 1)
+        for tab in self.Tables:
+            print('{} {}'.format('--' * (i + 1), tab))
 
     def print(self):
         print('{} ({})'.format(self.Nickname, self))
@@ -245,6 +790,7 @@ class ParameterCore(Chromosome):
     def clone(self, copy_sc=False, include_children=False):
         if self.Parent:
             raise AttributeError('This is not the root. Please clone from the root node')
+        self.sync()
         if copy_sc:
             sc = self.SG.SC.clone()
             sg = sc.SGs[self.Group]
@@ -259,13 +805,96 @@ class ParameterCore(Chromosome):
 
         return pc_new
 
+    def branch(self, copy_sc=False):
+        """
+        Fork the tree into a copy-on-write scenario. The branch shares loci and offsprings with the tree
+        until either of them changes a node; only then the node and its path to the root are copied
+        :param copy_sc: True if the branch uses a copy of the simulation core
+        :return: ParameterCore, the root of the branch
+        """
+        if self.Parent:
+            raise AttributeError('This is not the root. Please branch from the root node')
+        sg = self.SG.SC.clone().SGs[self.Group] if copy_sc else self.SG
+        br = self.__mirror(sg, None)
+        self._get_clock()
+        self.__forks.append(ref(br))
+        return br
+
+    def __mirror(self, sg, parent):
+        pc = ParameterCore(self.Nickname, sg, None, self.__prior)
+        pc.__deferred = self.__deferred
+        pc.Locus = self.Locus
+        pc.LogLikelihood = self.LogLikelihood
+        pc.PriorTerms = self.PriorTerms
+        if parent is not None:
+            pc.Parent = parent
+        # pending lazy interventions are replayed in the branch on its own
+        if self.__log:
+            pc.__log = list(self.__log)
+        pc.__base = self.__base
+        pc.__cursor = self.__cursor
+        pc.__synced = -1
+        # the node has been in the branch since it forked, so are its counterparts in later forks
+        pc.__forked = 0
+        pc.__origin = self
+        pc.__shared = self.__shared = True
+        return pc
+
+    def __unfold(self):
+        origin, self.__origin = self.__origin, None
+        sc = self.SG.SC
+        for k, chd in origin.Children.items():
+            self.__children[k] = chd.__mirror(sc[chd.Group], self)
+        for tab in origin.Tables:
+            tab_new = tab.copy(self, keep_pending=True)
+            tab_new.SG = sc[tab.Group]
+            self.Tables.append(tab_new)
+        self._invalidate_deep()
+
+    def __path(self):
+        path, sel = list(), self
+        while sel.Parent is not None:
+            path.append(sel.Nickname)
+            sel = sel.Parent
+        return reversed(path)
+
+    def _touch(self):
+        """
+        Prepare the node for a change: unfold its counterparts in the branches forked from the tree
+        before they diverge, and take its own copy of the loci shared with a branch
+        """
+        if self.__forks and self.__forked < len(self.__forks):
+            self.__forked = len(self.__forks)
+            path = list(self.__path())
+            for br in self.__forks:
+                sel = br()
+                if sel is None:
+                    continue
+                try:
+                    for name in path:
+                        sel = sel.Children[name]
+                except KeyError:
+                    # the node has been removed from the branch
+                    continue
+                if sel.__origin is not None:
+                    sel.__unfold()
+        if self.__shared:
+            self.Locus = dict(self.Locus)
+            self.__shared = False
+
     def __children_copy(self, pc_new):
         for k, chd in self.Children.items():
+            chd.sync()
             gp = chd.Group
             chd_new = pc_new.breed(k, gp, exo=chd.Locus)
             chd_new.LogPrior = chd.LogPrior
             chd_new.LogLikelihood = chd.LogLikelihood
             chd.__children_copy(chd_new)
+        for tab in self.Tables:
+            tab.sync()
+            tab_new = tab.copy(pc_new)
+            tab_new.SG = pc_new.SG.SC[tab.Group]
+            pc_new.Tables.append(tab_new)
 
 
 class PseudoParameterCore(ParameterCore):
@@ -277,7 +906,7 @@ class PseudoParameterCore(ParameterCore):
     def Group(self):
         return self.__group
 
-    def breed(self, nickname, group, exo=None):
+    def breed(self, nickname, group, exo=None, lazy_prior=None):
         """
         Generate an offspring node
         :param nickname: nickname
@@ -286,12 +915,15 @@ class PseudoParameterCore(ParameterCore):
         :type group: str
         :param exo: exogenous variables
         :type exo:
+        :param lazy_prior: unused
         :return: child parameter core
         """
         if nickname in self.Children:
             raise ValueError('{} has already existed'.format(nickname))
         chd = PseudoParameterCore(nickname, group)
+        chd.Parent = self
         self.Children[nickname] = chd
+        self._register_child(chd)
         return chd
 
     def get_sibling(self, nickname, exo=None):
@@ -339,6 +971,7 @@ class PseudoParameterCore(ParameterCore):
         try:
             chd = self.Children[k]
             del self.Children[k]
+            self._unregister_child(chd)
             return chd
         except KeyError:
             pass
@@ -378,19 +1011,8 @@ class PseudoParameterCore(ParameterCore):
             ca = self.SG.set_child_actors(self, group)
         return ca
 
-    def find_descendant(self, address):
-        """
-        Find a descendant node
-        :param address: str, a series of names of nodes linked with '@'
-        :return: a child node in the address
-        """
-        sel = self
-        names = address.split('@')
-        if len(names) < 2:
-            return sel
-        for name in names[1:]:
-            sel = sel.get_child(name)
-        return sel
+    def branch(self, copy_sc=False):
+        raise AttributeError('Pseudo parameters cannot be branched')
 
     def impulse(self, imp, bn=None):
         """
@@ -414,14 +1036,6 @@ class PseudoParameterCore(ParameterCore):
     def reset_sc(self, sc):
         pass
 
-    @property
-    def DeepLogPrior(self):
-        """
-        Log prior with that of offsprings
-        :return: log prior probability
-        """
-        return 0 + sum(v.DeepLogPrior for v in self.Children.values())
-
     def __iter__(self):
         if self.Parent:
             for v in iter(self.Parent):
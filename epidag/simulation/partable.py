@@ -0,0 +1,539 @@
+from collections.abc import MutableMapping
+from weakref import ref
+import numpy as np
+import pandas as pd
+from epidag.simulation.parcore import ParameterCore
+
+__author__ = 'TimeWz667'
+__all__ = ['ParameterCoreTable', 'ParameterCoreView']
+
+
+def _as_scalar(v):
+    return v.item() if isinstance(v, np.generic) else v
+
+
+class ParameterCoreTable:
+    """
+    Children of a ParameterCore in one group, stored as columns of their loci.
+    Members are accessed through ParameterCoreViews, which read and write the columns;
+    a full ParameterCore is only built when a member is materialised.
+    """
+    def __init__(self, sg, parent, prefix, cols, prior):
+        """
+        :param sg: SimulationGroup, group of the members
+        :param parent: ParameterCore, parent of the members
+        :param prefix: prefix of nicknames, followed by the rows of members
+        :param cols: dict(name: np.ndarray), values of loci
+        :param prior: np.ndarray, log prior probabilities
+        """
+        self.SG = sg
+        self.__parent = None
+        self.__weak = False
+        self.Parent = parent
+        self.Prefix = prefix
+        self.Columns = cols
+        self.LogPrior = np.asarray(prior, dtype=np.float64)
+        self.LogLikelihood = np.full(len(self.LogPrior), np.nan)
+        self.Alive = np.ones(len(self.LogPrior), dtype=bool)
+        self.Actors = dict()
+        self.Samplers = dict()
+        self.__deep = None
+        self.Synced = parent._get_clock()[0] if parent is not None else 0
+        self.Cursor = parent._get_log_end() if parent is not None else 0
+
+    @property
+    def Parent(self):
+        """
+        :raise ReferenceError: if the parent, held by a weak reference, has been collected
+        """
+        if self.__weak:
+            pa = self.__parent()
+            if pa is None:
+                raise ReferenceError('The parent of table {} has been collected; '
+                                     'keep a reference to the root while using its offsprings'.format(self.Prefix))
+            return pa
+        return self.__parent
+
+    @Parent.setter
+    def Parent(self, pa):
+        self.__weak = pa is not None and self.SG.SC.WeakParents
+        self.__parent = ref(pa) if self.__weak else pa
+
+    def dispose(self):
+        """
+        Release the actors and samplers of the members and the link to the parent
+        """
+        for cache in self.Samplers.values():
+            for _, samplers in cache.values():
+                for sam in samplers.values():
+                    sam.Chromosome = None
+        self.Actors = dict()
+        self.Samplers = dict()
+        self.Parent = None
+
+    def sync(self):
+        """
+        Catch up with the lazy interventions on ancestors
+        """
+        pa = self.Parent
+        if pa is None:
+            return
+        clock = pa._get_clock()[0]
+        if self.Synced == clock:
+            return
+        self.Synced = clock
+        pa.sync()
+        end = pa._get_log_end()
+        if self.Cursor < end:
+            self.touch()
+        pending, self.Cursor = pa._read_log(self.Cursor), end
+        for imp, shocked in pending:
+            self.set_response(imp, shocked)
+
+    def touch(self):
+        """
+        Prepare the members for a change, see ParameterCore._touch
+        """
+        if self.Parent is not None:
+            self.Parent._touch()
+
+    def _invalidate_deep(self):
+        """
+        Mark the cached DeepLogPrior of the table and the ancestors outdated
+        """
+        self.__deep = None
+        if self.Parent is not None:
+            self.Parent._invalidate_deep()
+
+    @property
+    def Group(self):
+        return self.SG.Name
+
+    @property
+    def Size(self):
+        return int(self.Alive.sum())
+
+    def __len__(self):
+        return self.Size
+
+    @property
+    def Nicknames(self):
+        return [self.get_nickname(i) for i in np.flatnonzero(self.Alive)]
+
+    def get_nickname(self, i):
+        return '{}{}'.format(self.Prefix, i)
+
+    def find_row(self, nickname):
+        """
+        Find the row of a member
+        :param nickname: nickname of the member
+        :return: row of the member; None if not found
+        """
+        if not isinstance(nickname, str) or not nickname.startswith(self.Prefix):
+            return None
+        i = nickname[len(self.Prefix):]
+        if not i.isdigit() or str(int(i)) != i:
+            return None
+        i = int(i)
+        return i if i < len(self.Alive) and self.Alive[i] else None
+
+    def keys(self):
+        return self.Columns.keys()
+
+    def __contains__(self, item):
+        return self.find_row(item) is not None
+
+    def get_locus(self, i):
+        """
+        Values of loci of a member
+        :param i: row of the member
+        :return: dict(name: value)
+        """
+        return {k: _as_scalar(v[i]) for k, v in self.Columns.items()}
+
+    def __row(self, item):
+        if isinstance(item, str):
+            i = self.find_row(item)
+            if i is None:
+                raise KeyError('{} not found'.format(item))
+            return i
+        i = range(len(self.Alive))[item]
+        if not self.Alive[i]:
+            raise KeyError('{} has been removed'.format(self.get_nickname(i)))
+        return i
+
+    def __getitem__(self, item):
+        """
+        :param item: int for a row or str for a nickname
+        :return: ParameterCoreView of the member
+        """
+        self.sync()
+        return ParameterCoreView(self, self.__row(item))
+
+    def __iter__(self):
+        self.sync()
+        for i in np.flatnonzero(self.Alive):
+            yield ParameterCoreView(self, int(i))
+
+    def remove(self, item):
+        """
+        Remove a member
+        :param item: int for a row or str for a nickname
+        :return: ParameterCoreView of the removed member
+        """
+        i = self.__row(item)
+        self.touch()
+        self.Alive[i] = False
+        self._invalidate_deep()
+        self.Actors.pop(i, None)
+        self.Samplers.pop(i, None)
+        return ParameterCoreView(self, i)
+
+    def materialise(self, item):
+        """
+        Move a member out of the table into a full ParameterCore among the children of the parent
+        :param item: int for a row or str for a nickname
+        :return: ParameterCore of the member
+        """
+        self.sync()
+        i = self.__row(item)
+        prior = self.LogPrior[i]
+        li = self.LogLikelihood[i]
+        actors = self.Actors.get(i)
+        self.remove(i)
+
+        pc = self.SG.as_parameter_core(self.get_nickname(i), self.get_locus(i),
+                                       None if np.isnan(prior) else float(prior), self.Parent)
+        pc.LogLikelihood = None if np.isnan(li) else float(li)
+        pc.Actors = actors
+        if self.Parent is not None:
+            self.Parent.Children[pc.Nickname] = pc
+            self.Parent._register_child(pc)
+        return pc
+
+    @property
+    def DeepLogPrior(self):
+        self.sync()
+        if self.__deep is None:
+            self.__deep = float(self.LogPrior[self.Alive].sum())
+        return self.__deep
+
+    def set_response(self, imp, shocked, rows=None):
+        """
+        Respond to interventions in batch; the log priors of the members are scored again
+        :param imp: dict(node: value), intervention
+        :param shocked: nodes to be resampled
+        :param rows: rows of members; None for all
+        """
+        rows = slice(None) if rows is None else np.asarray(rows)
+        n = len(self.LogPrior[rows])
+        bn = self.SG.BN
+
+        cols = {k: v[rows] for k, v in self.Columns.items()}
+        shocked_locus = [d for d in self.SG.Fixed if d in shocked and d in cols]
+
+        prior = np.zeros(n)
+        for d in self.SG.Fixed:
+            loci = bn[d]
+            for pa in loci.Parents:
+                if pa not in cols:
+                    cols[pa] = np.full(n, self.Parent[pa])
+            if d in imp:
+                cols[d] = np.full(n, imp[d])
+            elif d in shocked_locus:
+                cols[d] = loci.render_batch(cols, n)
+            if d in cols:
+                prior += loci.evaluate_batch(cols, n)
+
+        for d in self.SG.Fixed:
+            if d in self.Columns and (d in imp or d in shocked_locus):
+                self.Columns[d][rows] = cols[d]
+            elif d in imp and isinstance(rows, slice):
+                self.Columns[d] = np.full(len(self.Alive), imp[d])
+        self.LogPrior[rows] = prior
+
+        selected = np.zeros(len(self.Alive), dtype=bool)
+        selected[rows] = True
+        for i, actors in self.Actors.items():
+            if selected[i]:
+                for k, act in actors.items():
+                    if k in shocked and hasattr(act, 'update'):
+                        act.update(ParameterCoreView(self, i))
+
+        if shocked_locus:
+            self.LogLikelihood[rows] = np.nan
+        self._invalidate_deep()
+
+    def copy(self, parent, keep_pending=False):
+        """
+        Copy the members to another parent
+        :param parent: ParameterCore, the new parent
+        :param keep_pending: True if the lazy interventions not yet applied are left to the copy,
+        whose parent holds the same log of interventions
+        :return: ParameterCoreTable
+        """
+        if not keep_pending:
+            self.sync()
+        tab = ParameterCoreTable(self.SG, parent, self.Prefix, {k: v.copy() for k, v in self.Columns.items()},
+                                 self.LogPrior.copy())
+        tab.LogLikelihood = self.LogLikelihood.copy()
+        tab.Alive = self.Alive.copy()
+        if keep_pending:
+            tab.Cursor = self.Cursor
+            tab.Synced = -1
+        return tab
+
+    def to_data_frame(self):
+        self.sync()
+        sel = self.Alive
+        df = pd.DataFrame({k: v[sel] for k, v in self.Columns.items()},
+                          index=pd.Index(self.Nicknames, name='Nickname'))
+        df['LogPrior'] = self.LogPrior[sel]
+        return df
+
+    def __repr__(self):
+        return 'ParameterCoreTable(Group: {}, Size: {})'.format(self.Group, self.Size)
+
+
+class ViewLocus(MutableMapping):
+    """
+    Write-through mapping onto the row of a member in the columns of its table; loci can be changed,
+    but neither added nor removed
+    """
+    __slots__ = ('Table', 'Row')
+
+    def __init__(self, table, row):
+        self.Table = table
+        self.Row = row
+
+    def __getitem__(self, item):
+        return _as_scalar(self.Table.Columns[item][self.Row])
+
+    def __setitem__(self, key, value):
+        if key not in self.Table.Columns:
+            raise KeyError('{} is not a column of the table; materialise the member first'.format(key))
+        self.Table.touch()
+        self.Table.Columns[key][self.Row] = value
+
+    def __delitem__(self, key):
+        raise TypeError('Loci of a member of a table cannot be removed')
+
+    def __iter__(self):
+        return iter(self.Table.Columns)
+
+    def __len__(self):
+        return len(self.Table.Columns)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ParameterCoreView(ParameterCore):
+    """
+    A member of a ParameterCoreTable behaving as a ParameterCore without children.
+    The state of a member is kept in the table, so every member of ParameterCore using
+    the state of a node is overridden here
+    """
+    def __init__(self, table, row):
+        self.Table = table
+        self.Row = row
+
+    @property
+    def Nickname(self):
+        return self.Table.get_nickname(self.Row)
+
+    @property
+    def SG(self):
+        return self.Table.SG
+
+    @property
+    def Parent(self):
+        return self.Table.Parent
+
+    @property
+    def Children(self):
+        return dict()
+
+    @property
+    def Tables(self):
+        return list()
+
+    @property
+    def ChildrenActors(self):
+        return None
+
+    @property
+    def Actors(self):
+        return self.Table.Actors.get(self.Row)
+
+    @Actors.setter
+    def Actors(self, actors):
+        self.Table.Actors[self.Row] = actors
+
+    @property
+    def Locus(self):
+        """
+        :return: ViewLocus, writing through to the columns of the table
+        """
+        self.Table.sync()
+        return ViewLocus(self.Table, self.Row)
+
+    @property
+    def LogPrior(self):
+        v = self.Table.LogPrior[self.Row]
+        return None if np.isnan(v) else float(v)
+
+    @LogPrior.setter
+    def LogPrior(self, v):
+        self.Table.LogPrior[self.Row] = np.nan if v is None else v
+        self.Table._invalidate_deep()
+
+    @property
+    def LogLikelihood(self):
+        v = self.Table.LogLikelihood[self.Row]
+        return None if np.isnan(v) else float(v)
+
+    @LogLikelihood.setter
+    def LogLikelihood(self, v):
+        self.Table.LogLikelihood[self.Row] = np.nan if v is None else v
+
+    @property
+    def PriorTerms(self):
+        return None
+
+    def defer_prior(self):
+        """
+        The log priors of members are evaluated with the table in batch
+        """
+        return
+
+    def is_prior_deferred(self):
+        return False
+
+    @property
+    def DeepLogPrior(self):
+        self.Table.sync()
+        return self.LogPrior
+
+    def _invalidate_deep(self):
+        self.Table._invalidate_deep()
+
+    def _get_clock(self):
+        if self.Parent is not None:
+            return self.Parent._get_clock()
+        return [self.Table.Synced]
+
+    def _get_log(self):
+        return list()
+
+    def _touch(self):
+        self.Table.touch()
+
+    def _get_sampler_cache(self):
+        try:
+            return self.Table.Samplers[self.Row]
+        except KeyError:
+            cache = self.Table.Samplers[self.Row] = dict()
+            return cache
+
+    def _get_index(self):
+        index = dict(self.Parent._get_index()) if self.Parent is not None else dict()
+        index.update(dict.fromkeys(self.Table.Columns, self))
+        return index
+
+    def _reset_index(self):
+        return
+
+    def sync(self):
+        self.Table.sync()
+
+    def __getitem__(self, item):
+        self.Table.sync()
+        try:
+            return _as_scalar(self.Table.Columns[item][self.Row])
+        except KeyError:
+            pass
+        if self.Parent is not None:
+            pc = self.Parent._get_index().get(item)
+            if pc is not None:
+                return pc.Locus[item]
+        raise KeyError('{} not found'.format(item))
+
+    def __setitem__(self, key, value):
+        self.Table.touch()
+        try:
+            self.Table.Columns[key][self.Row] = value
+        except KeyError:
+            raise KeyError('{} is not a column of the table; materialise the member first'.format(key))
+        self.LogLikelihood = None
+        self.LogPrior = self.SG.Plan.evaluate(self)
+
+    def __contains__(self, item):
+        return item in self.Table.Columns
+
+    def __len__(self):
+        return len(self.Table.Columns)
+
+    def keys(self):
+        return self.Table.Columns.keys()
+
+    def __eq__(self, other):
+        return isinstance(other, ParameterCoreView) and other.Table is self.Table and other.Row == self.Row
+
+    def __hash__(self):
+        return hash((id(self.Table), self.Row))
+
+    def impulse(self, imp, bn=None, lazy=False):
+        imp, shocked = self._find_shocked(imp, bn)
+        self.Table.sync()
+        self.Table.touch()
+        self.Table.set_response(imp, shocked, [self.Row])
+
+    def materialise(self):
+        """
+        :return: the member as a full ParameterCore, moved out of the table
+        """
+        return self.Table.materialise(self.Row)
+
+    def breed(self, nickname, group, exo=None, lazy_prior=None):
+        return self.materialise().breed(nickname, group, exo, lazy_prior)
+
+    def breed_many(self, prefix, group, n, exo=None):
+        return self.materialise().breed_many(prefix, group, n, exo)
+
+    def detach_from_parent(self, collect_pars=False):
+        self.materialise().detach_from_parent(collect_pars)
+
+    def dispose(self):
+        """
+        Remove the member from the table and release its samplers
+        """
+        tab = self.Table
+        for _, samplers in tab.Samplers.get(self.Row, dict()).values():
+            for sam in samplers.values():
+                sam.Chromosome = None
+        if tab.Alive[self.Row]:
+            tab.remove(self.Row)
+
+    def memory_report(self):
+        """
+        :return: pd.DataFrame, the memory held by the member in its table, see ParameterCore.memory_report
+        """
+        tab = self.Table
+        actors = tab.Actors.get(self.Row)
+        rec = {
+            'Nodes': 0,
+            'Members': 1,
+            'Loci': len(tab.Columns),
+            'Actors': len(actors) if actors else 0,
+            'Samplers': sum(len(samplers) for _, samplers in tab.Samplers.get(self.Row, dict()).values()),
+            'Bytes': sum(col.itemsize for col in tab.Columns.values()) +
+            tab.LogPrior.itemsize + tab.LogLikelihood.itemsize + tab.Alive.itemsize
+        }
+        return pd.DataFrame.from_dict({self.Group: rec}, orient='index').rename_axis('Group')
+
+    def clone(self, copy_sc=False, include_children=False):
+        raise AttributeError('This is not the root. Please clone from the root node')
+
+    def __repr__(self):
+        return ParameterCore.__repr__(self)
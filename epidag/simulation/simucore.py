@@ -21,8 +21,13 @@ def get_simulation_groups(root: NodeSet):
 
 
 class SimulationCore:
-    def __init__(self, bn, root=None):
+    def __init__(self, bn, root=None, lazy_prior=False, weak_parents=False):
         self.Name = bn.Name
+        # True if the log priors of generated parameter cores are evaluated on their first access
+        self.LazyPrior = lazy_prior
+        # True if parameter cores refer to their parents by weak references, so a tree is kept alive by its root;
+        # user code must then hold the root, as offsprings raise ReferenceError once their parents are collected
+        self.WeakParents = weak_parents
         self.BN = bn
         self.RootNode = root
         self.RootSG = root.Name
@@ -39,16 +44,17 @@ class SimulationCore:
         except KeyError:
             raise KeyError('Unknown group')
 
-    def generate(self, nickname=None, exo=None):
+    def generate(self, nickname=None, exo=None, lazy_prior=None):
         """
         Instantiate a simulation model
         :param nickname: nickname of generated parameter
         :param exo: dict, exogenous variables
+        :param lazy_prior: True if the log prior is evaluated on its first access; None to follow LazyPrior
         :return:
         """
         nickname = nickname if nickname else self.Name
         exo = dict(exo) if exo else dict()
-        return self.SGs[self.RootSG].generate(nickname, None, exo)
+        return self.SGs[self.RootSG].generate(nickname, None, exo, lazy_prior)
 
     def to_json(self):
         return {
@@ -60,7 +66,7 @@ class SimulationCore:
         self.RootNode.print()
 
     def clone(self):
-        return SimulationCore(self.BN, self.RootNode)
+        return SimulationCore(self.BN, self.RootNode, self.LazyPrior, self.WeakParents)
 
     def __repr__(self):
         return 'Simulation core: {}'.format(self.Name)
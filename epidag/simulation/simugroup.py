@@ -1,9 +1,140 @@
+import numpy as np
+import pandas as pd
 from epidag.simulation.parcore import ParameterCore
+from epidag.simulation.partable import ParameterCoreTable
 from epidag.simulation.actor import FrozenSingleActor
+from epidag.bayesnet.loci import ValueLoci, ExoValueLoci, DistributionLoci, FunctionLoci
 
 __author__ = 'TimeWz667'
 
 
+class GenerationPlan:
+    """
+    Precompiled steps of generating the members of a simulation group.
+    Exogenous nodes are taken from the inputs, the parent or rendered, in this order;
+    fixed nodes of distributions are sampled and scored with the same distribution.
+    A fixed node is left out if any of its parents is neither given nor generated
+    """
+    def __init__(self, sg):
+        bn = sg.BN
+        self.Exogenous = [(d, bn[d], not isinstance(bn[d], ExoValueLoci)) for d in sg.Exogenous]
+        self.Fixed = list()
+        self.FixedSet = set(sg.Fixed)
+
+        known = set(sg.Exogenous)
+        for d in sg.Fixed:
+            loci = bn[d]
+            if isinstance(loci, DistributionLoci):
+                kind = 'dist'
+            elif isinstance(loci, (ValueLoci, FunctionLoci)):
+                kind = 'func'
+            elif isinstance(loci, ExoValueLoci):
+                kind = 'exo'
+            else:
+                kind = 'other'
+            checks = [pa for pa in loci.Parents if pa not in known]
+            if not checks:
+                known.add(d)
+            self.Fixed.append((d, loci, kind, checks))
+
+    def generate(self, parent, exo, score=True):
+        """
+        Render the loci of a new member
+        :param parent: ParameterCore, parent of the member; None for a root
+        :param exo: dict, input exogenous variables
+        :param score: False if the log prior is left to be evaluated later
+        :return: dict(name: value), LogPrior; None if not scored
+        """
+        vs = dict(exo)
+        if self.Exogenous:
+            if parent is not None:
+                parent.sync()
+                index = parent._get_index()
+            else:
+                index = dict()
+            for d, loci, renderable in self.Exogenous:
+                if d in vs:
+                    continue
+                owner = index.get(d)
+                if owner is not None:
+                    vs[d] = owner[d]
+                elif renderable:
+                    vs[d] = loci.render(vs)
+                    # rendered exogenous values are not kept in the member
+                    score = True
+                else:
+                    raise KeyError('Exogenous variable not found')
+
+        if not score:
+            for d, loci, kind, checks in self.Fixed:
+                if d in vs or kind == 'exo' or (checks and any(pa not in vs for pa in checks)):
+                    continue
+                vs[d] = loci.render(vs)
+            return self.__select(vs, exo), None
+
+        prior = 0
+        for d, loci, kind, checks in self.Fixed:
+            if d in vs:
+                prior += loci.evaluate(vs)
+                continue
+            if checks and any(pa not in vs for pa in checks):
+                continue
+
+            if kind == 'dist':
+                dist = loci.get_distribution(vs)
+                v = vs[d] = dist.sample()
+                prior += dist.logpdf(v)
+            elif kind == 'func':
+                vs[d] = loci.render(vs)
+            elif kind == 'other':
+                vs[d] = loci.render(vs)
+                prior += loci.evaluate(vs)
+
+        return self.__select(vs, exo), prior
+
+    def __select(self, vs, exo):
+        fixed = self.FixedSet
+        vs = {k: v for k, v in vs.items() if k in fixed}
+        vs.update(exo)
+        return vs
+
+    def evaluate(self, pc):
+        """
+        Score the loci of a member
+        :param pc: ParameterCore, the member
+        :return: LogPrior
+        """
+        locus = pc.Locus
+        prior = 0
+        for d, loci, kind, _ in self.Fixed:
+            if d in locus and (kind == 'dist' or kind == 'other'):
+                prior += loci.evaluate(pc)
+        return prior
+
+    def respond(self, imp, shocked, pc):
+        """
+        Re-render the shocked loci of a member and score all its loci
+        :param imp: dict(node: value), intervention
+        :param shocked: shocked nodes in the locus
+        :param pc: ParameterCore, the member
+        :return: LogPrior
+        """
+        prior = 0
+        for d, loci, kind, _ in self.Fixed:
+            if d in imp:
+                pc.Locus[d] = imp[d]
+            elif d in shocked:
+                if kind == 'dist':
+                    dist = loci.get_distribution(pc)
+                    v = pc.Locus[d] = dist.sample()
+                    prior += dist.logpdf(v)
+                    continue
+                pc.Locus[d] = loci.render(pc)
+            if kind == 'dist' or kind == 'other':
+                prior += loci.evaluate(pc)
+        return prior
+
+
 class SimulationGroup:
     def __init__(self, ns):
         self.Name = ns.Name
@@ -16,48 +147,95 @@ class SimulationGroup:
         self.Floating = list(ns.FloatingNodes)
         self.LocalActors = ns.LocalSamplers
         self.SharedActors = ns.SharedSamplers
+        self.Plan = None
+        self.__relevant = None
 
     def set_simulation_core(self, sc):
         self.SC = sc
         self.BN = self.SC.BN
+        self.Plan = GenerationPlan(self)
+        self.__relevant = None
+
+    def get_relevant_nodes(self):
+        """
+        Nodes whose changes reach the members of this group or their offsprings
+        :return: set of nodes
+        """
+        if self.__relevant is None:
+            rel = set(self.Fixed)
+            rel.update(self.LocalActors)
+            rel.update(self.SharedActors)
+            for gp in self.Children:
+                rel.update(self.SC[gp].get_relevant_nodes())
+            self.__relevant = rel
+        return self.__relevant
+
+    def affects_offsprings(self, shocked):
+        """
+        Check if an intervention reaches the offsprings of members of this group
+        :param shocked: shocked nodes
+        :return: True if any offspring group is affected
+        """
+        return any(not self.SC[gp].get_relevant_nodes().isdisjoint(shocked) for gp in self.Children)
 
-    def generate(self, nickname, parent=None, exo=None):
+    def generate(self, nickname, parent=None, exo=None, lazy_prior=None):
         """
         Generate a simulation core with a nickname
         :param nickname: nickname of the generated core
         :param parent: ParameterCore, parent Parameter
         :param exo: dict, input exogenous variables
+        :param lazy_prior: True if the log prior is evaluated on its first access; None to follow the simulation core
         :return:
         """
-        exo = dict(exo) if exo else dict()
-        vs = dict(exo)
+        if lazy_prior is None:
+            lazy_prior = self.SC.LazyPrior
+        vs, prior = self.Plan.generate(parent, dict(exo) if exo else dict(), score=not lazy_prior)
+        pc = self.as_parameter_core(nickname, vs, prior, parent)
+        if prior is None:
+            pc.defer_prior()
+        return pc
+
+    def as_parameter_core(self, nickname, vs, prior, parent=None):
+        pc = ParameterCore(nickname, self, vs, prior)
+        if parent is not None:
+            pc.Parent = parent
+        return pc
+
+    def generate_many(self, prefix, n, parent=None, exo=None):
+        """
+        Generate n simulation cores at once; loci are sampled and evaluated over all the members in batch
+        :param prefix: prefix of nicknames, followed by the indices of members
+        :param n: number of members
+        :param parent: ParameterCore, parent Parameter
+        :param exo: pd.DataFrame or dict of arrays (or scalars), input exogenous variables
+        :return: ParameterCoreTable
+        """
+        if isinstance(exo, pd.DataFrame):
+            exo = {k: exo[k].to_numpy() for k in exo.columns}
+        exo = {k: np.array(np.broadcast_to(v, (n, ))) for k, v in exo.items()} if exo else dict()
+
+        cols = dict(exo)
         for d in self.Exogenous:
-            if d not in vs:
+            if d not in cols:
                 try:
-                    vs[d] = parent[d]
+                    cols[d] = np.full(n, parent[d])
                 except (TypeError, KeyError):
-                    vs[d] = self.BN[d].fill(vs)
+                    cols[d] = self.BN[d].render_batch(cols, n)
 
-        prior = 0
+        prior = np.zeros(n)
         for d in self.Fixed:
             loci = self.BN[d]
-            if d not in vs:
+            if d not in cols:
                 try:
-                    loci.fill(vs)
+                    cols[d] = loci.render_batch(cols, n)
                 except KeyError:
                     pass
 
-            if d in vs:
-                prior += loci.evaluate(vs)
-
-        vs = {k: v for k, v in vs.items() if k in self.Fixed}
-        vs.update(exo)
+            if d in cols:
+                prior += loci.evaluate_batch(cols, n)
 
-        pc = ParameterCore(nickname, self, vs, prior)
-        if parent is not None:
-            pc.Parent = parent
-
-        return pc
+        cols = {k: v for k, v in cols.items() if k in self.Fixed or k in exo}
+        return ParameterCoreTable(self, parent, prefix, cols, prior)
 
     def put_local_actors(self, pc):
         actors = {k: v.compose_actor(self.BN) for k, v in self.LocalActors.items()}
@@ -82,16 +260,7 @@ class SimulationGroup:
         self.put_shared_actors_on_parent(parent)
 
     def set_response(self, imp, shocked, actors, hoist, pc):
-        prior = 0
-        for d in self.Fixed:
-            loci = self.BN[d]
-            if d in imp:
-                pc.Locus[d] = imp[d]
-            elif d in shocked:
-                loci.fill(pc)
-            prior += loci.evaluate(pc)
-
-        pc.LogPrior = prior
+        pc.LogPrior = self.Plan.respond(imp, set(shocked), pc)
 
         for act in actors:
             pc.Actors[act].update(pc)
@@ -100,14 +269,20 @@ class SimulationGroup:
             for act in vs:
                 pc.ChildrenActors[k][act].update(pc)
 
-    def breed(self, nickname, group, pa, exo):
+    def breed(self, nickname, group, pa, exo, lazy_prior=None):
         if group not in self.Children:
             raise KeyError('No matched group')
 
-        chd = self.SC[group].generate(nickname, parent=pa, exo=exo)
+        chd = self.SC[group].generate(nickname, parent=pa, exo=exo, lazy_prior=lazy_prior)
 
         return chd
 
+    def breed_many(self, prefix, group, pa, n, exo):
+        if group not in self.Children:
+            raise KeyError('No matched group')
+
+        return self.SC[group].generate_many(prefix, n, parent=pa, exo=exo)
+
     def __repr__(self):
         return '{}({}|{}|{})->{}'.format(self.Name,
                                          self.Exogenous if self.Exogenous else '.',
@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+from epidag.bayesnet import ChromosomeSchema, CompactChromosome, ChromosomeBatch, as_population
+
+__author__ = 'TimeWz667'
+
+
+class ChromosomeBatchTest(unittest.TestCase):
+    def setUp(self):
+        self.Schema = ChromosomeSchema(['A', 'B'])
+        self.Genes = [CompactChromosome(self.Schema, {'A': i, 'B': 2 * i}, -i) for i in range(4)]
+
+    def test_collect(self):
+        batch = as_population(self.Genes)
+        self.assertIsInstance(batch, ChromosomeBatch)
+        self.assertEqual(len(batch), 4)
+        self.assertSequenceEqual(batch['B'].tolist(), [0, 2, 4, 6])
+        self.assertEqual(batch[2]['A'], 2)
+        self.assertEqual(batch[2].LogPrior, -2)
+        self.assertIsNone(batch[2].LogLikelihood)
+
+    def test_zero_copy(self):
+        batch = ChromosomeBatch.from_chromosomes(self.Genes)
+        df = batch.to_data_frame()
+        self.assertTrue(np.shares_memory(df['A'].values, batch.Data))
+        self.assertTrue(np.shares_memory(batch.to_array(), batch.Data))
+        self.assertListEqual(list(df.columns), ['A', 'B', 'LogPrior', 'LogLikelihood'])
+
+    def test_resample_perturb(self):
+        batch = ChromosomeBatch.from_chromosomes(self.Genes)
+        sub = batch.resample([3, 3, 0])
+        self.assertSequenceEqual(sub['A'].tolist(), [3, 3, 0])
+
+        sub.perturb({'A': 1}, rows=[0])
+        self.assertSequenceEqual(sub['A'].tolist(), [4, 3, 0])
+        self.assertTrue(np.isnan(sub.LogPrior[0]))
+        self.assertEqual(sub.LogPrior[1], -3)
+        self.assertEqual(batch['A'][3], 3)
+
+    def test_summary(self):
+        batch = ChromosomeBatch.from_chromosomes(self.Genes)
+        self.assertDictEqual(batch.mean(), {'A': 1.5, 'B': 3})
+        self.assertDictEqual(batch.mean([0, 0, 0, 1]), {'A': 3, 'B': 6})
+        self.assertAlmostEqual(batch.summarise([1, 1, 1, 1])['A']['mean'], 1.5)
+
+    def test_mixed(self):
+        genes = self.Genes + [CompactChromosome(ChromosomeSchema(['A', 'B']), {'A': 1, 'B': 1})]
+        self.assertIsInstance(as_population(genes), list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,6 +26,22 @@ class BayesNetTest(unittest.TestCase):
         self.assertCountEqual(self.BN1.DAG.ancestors('D'), ['A', 'B', 'B2', 'C'])
         self.assertCountEqual(self.BN2.DAG.ancestors('D'), ['B', 'C'])
         self.assertCountEqual(bn3.DAG.ancestors('D'), ['A', 'B', 'C'])
+        self.assertIs(bn3['A'], self.BN1['A'])
+        self.assertIs(bn3['C'], self.BN2['C'])
+        self.assertCountEqual(bn3.DAG.children('C'), ['D'])
+
+    def test_copy(self):
+        bn3 = self.BN1.copy('B3')
+        self.assertTrue(bn3.is_frozen())
+        self.assertIs(bn3.DAG, self.BN1.DAG)
+        self.assertEqual(bn3.to_json()['Name'], 'B3')
+        self.assertListEqual(bn3.Order, self.BN1.Order)
+
+        bn3.defrost()
+        bn3.append_from_definition('E = D + 1')
+        self.assertIn('E', bn3)
+        self.assertNotIn('E', self.BN1)
+        self.assertIs(bn3['D'], self.BN1['D'])
 
 
 if __name__ == '__main__':
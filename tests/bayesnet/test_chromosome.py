@@ -1,5 +1,5 @@
 import unittest
-from epidag.bayesnet import Chromosome, BayesianNetwork
+from epidag.bayesnet import Chromosome, CompactChromosome, BayesianNetwork, get_schema
 
 __author__ = 'TimeWz667'
 
@@ -48,6 +48,64 @@ class ChromosomeTest(unittest.TestCase):
         self.assertEqual(cms_copy['A'], 1)
         self.assertEqual(cms_copy['B'], 5)
 
+    def test_impulse_plan(self):
+        import epidag as dag
+        bn = dag.bayes_net_from_script('''
+        PCore Test {
+            A = 1
+            B = A + 4
+            C = B * 2
+            D ~ k(A)
+        }
+        ''')
+        self.assertCountEqual(bn.get_propagation_plan(['A']), ['B', 'C', 'D'])
+        self.assertIs(bn.get_propagation_plan(['A']), bn.get_propagation_plan({'A'}))
+        self.assertCountEqual(bn.get_propagation_plan(['B'], ['D']), ['C', 'D'])
+
+        cms = Chromosome({'A': 1, 'B': 5, 'D': 1}, -5)
+        cms.impulse({'A': 3}, bn)
+        self.assertEqual(cms['B'], 7)
+        self.assertEqual(cms['D'], 3)
+        self.assertNotIn('C', cms)
+        self.assertIsNone(cms.LogPrior)
+
+    def test_compact(self):
+        bn = BayesianNetwork('Test')
+        bn.append_from_definition('A=1')
+        bn.append_from_definition('B=A+4')
+
+        schema = get_schema(bn, ['B', 'A'])
+        self.assertIs(schema, get_schema(bn, {'A', 'B'}))
+        self.assertSequenceEqual(schema.Names, ('A', 'B'))
+
+        cms = CompactChromosome(schema, {'A': 1, 'B': 5}, -5)
+        self.assertFalse(hasattr(cms, '__dict__'))
+        self.assertDictEqual(dict(cms), {'A': 1, 'B': 5})
+        self.assertDictEqual(dict(cms.Locus), {'A': 1, 'B': 5})
+
+        cms.Locus['A'] = 2
+        self.assertEqual(cms['A'], 2)
+        cms.Locus.update({'A': 1})
+        self.assertEqual(cms['A'], 1)
+        with self.assertRaises(TypeError):
+            del cms.Locus['A']
+        with self.assertRaises(TypeError):
+            cms['A'] = 'x'
+        with self.assertRaises(TypeError):
+            CompactChromosome(schema, {'A': 'x', 'B': 5})
+
+        cms_copy = cms.clone()
+        self.assertIs(cms_copy.Schema, schema)
+        self.assertEqual(cms_copy.LogPrior, -5)
+
+        cms.impulse({'A': 5}, bn)
+        self.assertEqual(cms['B'], 9)
+        self.assertEqual(cms_copy['B'], 5)
+        self.assertIsNone(cms.LogPrior)
+
+        with self.assertRaises(KeyError):
+            cms['C'] = 1
+
 
 if __name__ == '__main__':
     unittest.main()
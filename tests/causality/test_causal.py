@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+import epidag as dag
+from epidag.causality import CausalModel, mutilate
+
+script_conf = '''
+PCore Confounded {
+    u ~ norm(0, 1)
+    x ~ norm(u, 1)
+    y ~ norm(2 * x + 3 * u, 1)
+}
+'''
+
+
+class CausalModelTest(unittest.TestCase):
+    def setUp(self):
+        self.BN = dag.bayes_net_from_script(script_conf)
+        self.CM = CausalModel(self.BN)
+
+    def test_plan(self):
+        self.assertCountEqual(self.CM.get_plan(['x'], ['y']), ['u', 'y'])
+        self.assertCountEqual(self.CM.get_plan([], ['x']), ['u', 'x'])
+
+    def test_ate(self):
+        ate = self.CM.average_treatment_effect({'x': 1}, {'x': 0}, ['y'], n=500)
+        self.assertAlmostEqual(ate.loc['y', 'ATE'], 2, delta=0.3)
+
+    def test_sweep(self):
+        res = self.CM.sweep('x', np.linspace(0, 1, 11), ['y'], n=2000)
+        self.assertEqual(res.shape, (11, 1))
+        self.assertAlmostEqual(res['y'].iloc[-1] - res['y'].iloc[0], 2, delta=0.3)
+
+    def test_sample(self):
+        sims = self.CM.sample({'obs': {}, 'do': {'x': 1}}, ['x', 'y'], n=100)
+        self.assertEqual(sims.shape, (200, 4))
+        self.assertListEqual(list(sims['Scenario'].unique()), ['obs', 'do'])
+        self.assertTrue(np.all(sims[sims['Scenario'] == 'do']['x'] == 1))
+
+    def test_mutilate(self):
+        bn = mutilate(self.BN, {'x': 1})
+        self.assertCountEqual(bn.DAG.parents('x'), [])
+        self.assertCountEqual(self.BN.DAG.parents('x'), ['u'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 import unittest
 import logging
 import sys
+import numpy as np
 import epidag as dag
+from epidag.fitting.alg.executor import *
 
 scr = '''
 PCore test {
@@ -31,6 +33,18 @@ class BinBeta(dag.fitting.BayesianModel):
             li += self.BN['x'].evaluate(pars)
         return li
 
+class PickleCounted(BinBeta):
+    Pickled = 0
+
+    def __getstate__(self):
+        PickleCounted.Pickled += 1
+        return self.__dict__
+
+
+def noisy(x):
+    return x + np.random.random()
+
+
 data = [
     {'id': 1, 'n': 10, 'x': 4},
     {'id': 2, 'n': 20, 'x': 7}
@@ -72,15 +86,69 @@ class FittingTest(unittest.TestCase):
 
     def test_mcmc(self):
         print()
-        fit = dag.fitting.MCMC(self.DM)
-        fit.fit(1000)
-        print(fit.summarise_posterior())
+        alg = dag.fitting.MCMC()
+        res = alg.fit(self.DM, n_post=1000)
+        self.assertEqual(len(res.Nodes), 1000)
+
+        print(res.summarise())
+        print(res.Benchmarks)
 
     def test_ga(self):
         print()
-        fit = dag.fitting.GA(self.DM)
-        fit.fit(500, target='MAP')
-        print(fit.summarise_fitness())
+        alg = dag.fitting.GA(target='MAP')
+        res = alg.fit(self.DM, n_post=500)
+        self.assertEqual(len(res.Nodes), 500)
+
+        print(res.Benchmarks)
+        alg.summarise_fitness()
+
+
+class ExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.BN = dag.bayes_net_from_script(scr)
+        self.DM = BinBeta(self.BN, data)
+
+    def __map(self, exe):
+        with exe:
+            np.random.seed(1)
+            return exe.map(noisy, range(20)), np.random.random()
+
+    def test_reproducibility(self):
+        res, nxt = self.__map(SerialExecutor(chunk_size=3))
+        self.assertEqual([int(v) for v in res], list(range(20)))
+        self.assertEqual(self.__map(SerialExecutor()), (res, nxt))
+        self.assertEqual(self.__map(ProcessExecutor(2, chunk_size=3)), (res, nxt))
+        self.assertEqual(self.__map(SocketExecutor(2, chunk_size=4)), (res, nxt))
+
+        with ThreadExecutor(2) as exe:
+            self.assertEqual([int(v) for v in exe.map(noisy, range(20))], list(range(20)))
+
+    def test_fitter(self):
+        alg = dag.fitting.SIR()
+        try:
+            alg.set_executor('process', n_workers=2)
+            res = alg.fit(self.DM, n_post=100)
+            self.assertEqual(res.Benchmarks['Niter'], 100)
+
+            with self.assertRaises(KeyError):
+                alg.set_executor('unknown')
+
+            old = alg.Executor
+            alg.set_executor(ThreadExecutor(2))
+            with self.assertRaises(RuntimeError):
+                old.Pool.submit(noisy, 1)
+        finally:
+            alg.Executor.close()
+
+    def test_share(self):
+        dm = PickleCounted(self.BN, data)
+        alg = dag.fitting.SIR()
+        with SocketExecutor(2, chunk_size=5) as exe:
+            alg.set_executor(exe)
+            alg.fit(dm, n_post=100)
+            alg.fit(dm, n_post=100)
+        # once per worker
+        self.assertEqual(PickleCounted.Pickled, 2)
 
 
 #if __name__ == '__main__':
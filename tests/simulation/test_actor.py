@@ -52,6 +52,47 @@ class ActorTest(unittest.TestCase):
         sam1 = Sampler(SingleActor('E', DistributionLoci('E', 'k(e)'), ['e']), {'e': 4})
         self.assertEqual(4, sam1.sample())
 
+    def test_upstream_check(self):
+        f1 = FrozenSingleActor('A', DistributionLoci('A', 'norm(a, 1)'), ['a'])
+        f1.update({'a': 1})
+        dist = f1.Sampler
+        f1.update({'a': 1, 'b': 2})
+        self.assertIs(f1.Sampler, dist)
+        f1.update({'a': 2})
+        self.assertIsNot(f1.Sampler, dist)
+
+        s1 = SingleActor('C', DistributionLoci('C', 'norm(c, 1)'), ['c'])
+        s1.sample({'c': 3})
+        dist = s1.Cache
+        s1.sample({'c': 3})
+        self.assertIs(s1.Cache, dist)
+        s1.sample({'c': 4})
+        self.assertIsNot(s1.Cache, dist)
+
+    def test_sample_batch(self):
+        sam = Sampler(FrozenSingleActor('A', DistributionLoci('A', 'norm(a, 1)'), ['a']), {'a': 10})
+        vs = sam.sample(1000)
+        self.assertEqual(vs.shape, (1000, ))
+        self.assertAlmostEqual(vs.mean(), 10, delta=0.2)
+
+        sam = Sampler(SingleActor('B', FunctionLoci('B', 'b+4'), ['b']), {'b': 1})
+        self.assertListEqual(sam.sample(3).tolist(), [5, 5, 5])
+
+        sam = Sampler(SingleActor('C', DistributionLoci('C', 'binom(10, c)'), ['c']), {'c': 0.5})
+        self.assertTrue(((sam.sample(100) >= 0) & (sam.sample(100) <= 10)).all())
+
+        c1 = CompoundActor('D', DistributionLoci('D', 'norm(d, 0.1)'),
+                           ['b'],
+                           [
+                               DistributionLoci('a', 'unif(0, 1)'),
+                               FunctionLoci('c', 'a+b'),
+                               FunctionLoci('d', 'c+1')
+                           ])
+        vs = Sampler(c1, {'b': 4}).sample(1000)
+        self.assertEqual(vs.shape, (1000, ))
+        self.assertAlmostEqual(vs.mean(), 5.5, delta=0.1)
+        self.assertGreater(vs.std(), 0.2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import tempfile
+import numpy as np
+import epidag as dag
+from epidag.simulation import TreeCheckpoint, save_checkpoint, load_checkpoint
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        script = '''
+        PCore Population {
+            mu ~ norm(0, 1)
+            age ~ unif(0, 100)
+            x ~ norm(mu + age, 1)
+            y = x * 2
+            z ~ norm(y, 1)
+        }
+        '''
+        bn = dag.bayes_net_from_script(script)
+        ns = dag.NodeSet('root', as_fixed=['mu'])
+        ns.new_child('ag', as_fixed=['x', 'y'], as_floating=['z'])
+        self.SC = dag.as_simulation_core(bn, ns)
+        self.Root = self.SC.generate('R')
+        self.Root.breed('A', 'ag', exo={'age': 30})
+        self.Root.breed('B', 'ag')
+        self.Table = self.Root.breed_many('T', 'ag', 50, exo={'age': np.arange(50)})
+        self.Table.remove(3)
+        self.Dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.Dir.cleanup()
+
+    def test_restore(self):
+        save_checkpoint(self.Root, self.Dir.name)
+        root = load_checkpoint(self.Dir.name, self.SC)
+
+        self.assertEqual(root.Nickname, 'R')
+        self.assertEqual(root['mu'], self.Root['mu'])
+        self.assertEqual(dict(iter(root.get_child('A'))), dict(iter(self.Root.get_child('A'))))
+        self.assertEqual(root.get_child('B').LogPrior, self.Root.get_child('B').LogPrior)
+        self.assertAlmostEqual(root.DeepLogPrior, self.Root.DeepLogPrior)
+
+        tab = root.Tables[0]
+        self.assertEqual(len(tab), 49)
+        self.assertNotIn('T3', tab)
+        self.assertEqual(tab['T7']['x'], self.Table['T7']['x'])
+        tab[7]['x'] = 0
+        self.assertNotEqual(self.Table['T7']['x'], 0)
+        self.assertNotEqual(load_checkpoint(self.Dir.name, self.SC).Tables[0]['T7']['x'], 0)
+
+    def test_incremental(self):
+        cp = TreeCheckpoint(self.Dir.name)
+        cp.write(self.Root)
+        self.Root.get_child('A').impulse({'x': 5})
+        cp = TreeCheckpoint(self.Dir.name)
+        cp.write(self.Root.get_child('A'))
+        cp.write(self.Root.breed('C', 'ag'))
+        self.assertEqual(cp.Writes, 3)
+
+        root = cp.restore(self.SC)
+        self.assertEqual(root.get_child('A')['x'], 5)
+        self.assertEqual(root.get_child('A')['y'], 10)
+        self.assertEqual(root.get_child('C')['x'], self.Root.get_child('C')['x'])
+
+        df = cp.read_group('ag')
+        self.assertEqual(len(df), 3 + 49)
+        self.assertEqual(df.set_index('Nickname').loc['A', 'x'], 5)
+        with self.assertRaises(KeyError):
+            cp.read_group('unknown')
+
+        self.Root.remove_children('B')
+        self.Table.remove(5)
+        cp.write(self.Root)
+        root = cp.restore(self.SC)
+        self.assertListEqual(sorted(root.Children), ['A', 'C'])
+        self.assertEqual(len(root.Tables), 1)
+        self.assertNotIn('T5', root.Tables[0])
+        self.assertEqual(len(cp.read_group('ag')), 2 + 48)
+        self.assertEqual(len(cp.read_group('root')), 1)
+
+    def test_mixed_types(self):
+        a, b = self.Root.get_child('A'), self.Root.get_child('B')
+        a.Locus['w'], b.Locus['w'] = 1, 2.5
+        cp = TreeCheckpoint(self.Dir.name)
+        cp.write(self.Root)
+        root = cp.restore(self.SC)
+        self.assertEqual(root.get_child('A')['w'], 1)
+        self.assertEqual(root.get_child('B')['w'], 2.5)
+
+        b.Locus['w'] = 'b'
+        with self.assertRaises(ValueError):
+            cp.write(self.Root)
+        self.assertEqual(cp.Writes, 1)
+        self.assertEqual(TreeCheckpoint(self.Dir.name).restore(self.SC).get_child('B')['w'], 2.5)
+
+    def test_orphan_subtree(self):
+        cp = TreeCheckpoint(self.Dir.name)
+        with self.assertRaises(ValueError):
+            cp.write(self.Root.get_child('A'))
+        self.assertEqual(cp.Writes, 0)
+        self.assertEqual(TreeCheckpoint(self.Dir.name).Writes, 0)
+
+        cp.write(self.Root)
+        cp.write(self.Root.get_child('A'))
+        self.assertEqual(cp.restore(self.SC).get_child('A')['x'], self.Root.get_child('A')['x'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 import epidag as dag
+from epidag.bayesnet.dag import minimal_dag, minimal_requirements
+from epidag.simulation.nodeset import BayesNetAnalysis
 
 script_betabin = '''
 PCore BetaBi {
@@ -58,6 +60,61 @@ class ParameterCoreCloneTest(unittest.TestCase):
         self.assertIn('x1', pc_a.get_samplers())
         self.assertIn('x2', pc_b.get_samplers())
 
+    def test_sampler_cache(self):
+        bn = dag.bayes_net_from_script(script_betabin)
+        ns = dag.NodeSet('root', as_fixed=['p'])
+        ns.new_child('ag', as_floating=['x'])
+
+        sc = dag.as_simulation_core(bn, ns)
+        pc = sc.generate('T5', {'n': 10})
+        ag = pc.breed('A', 'ag')
+        sam = ag.get_sampler('x')
+        self.assertIs(ag.get_sampler('x'), sam)
+        self.assertIs(ag.get_samplers()['x'], sam)
+
+        dist = sam.Actor.Sampler
+        sam.update()
+        self.assertIs(sam.Actor.Sampler, dist)
+
+        pc.impulse({'p': 0.5})
+        self.assertIsNot(sam.Actor.Sampler, dist)
+        self.assertIs(ag.get_sampler('x'), sam)
+
+
+class BayesNetAnalysisTest(unittest.TestCase):
+    def setUp(self):
+        self.BN = dag.bayes_net_from_script('''
+        PCore Chain {
+            a ~ norm(0, 1)
+            b = a + 1
+            c ~ norm(b, 1)
+            d = b * 2
+            e = c + d
+            f ~ norm(e, 1)
+            g = d + 1
+        }
+        ''')
+        self.Ana = BayesNetAnalysis(self.BN)
+
+    def test_queries(self):
+        g = self.BN.DAG
+        self.assertListEqual(self.Ana.minimal_dag(['b', 'e']), g.sort(minimal_dag(g, ['b', 'e']).nodes))
+        for node in self.BN.Order:
+            self.assertSetEqual(self.Ana.ancestors(node), g.ancestors(node))
+            for given in [[], ['b'], ['b', 'c'], ['a', 'd'], ['c', 'd']]:
+                self.assertListEqual(self.Ana.minimal_requirements(node, given), minimal_requirements(g, node, given))
+                self.assertEqual(self.Ana.has_randomness(node, given), self.BN.has_randomness(node, given))
+        self.assertFalse(self.Ana.has_randomness('g', ['b']))
+        self.assertTrue(self.Ana.has_randomness('e', ['b']))
+
+    def test_timings(self):
+        ns = dag.NodeSet('root', as_fixed=['a'])
+        ns.new_child('ag', as_fixed=['c'], as_floating=['f'])
+        dag.as_simulation_core(self.BN, ns)
+        self.assertIn('LocalNodes', ns.Timings)
+        self.assertIn('Samplers', ns.Timings)
+        self.assertTrue(all(v >= 0 for v in ns.Timings.values()))
+
 
 if __name__ == '__main__':
     unittest.main()
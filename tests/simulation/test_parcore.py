@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import epidag as dag
 
 
@@ -39,5 +40,561 @@ class ParameterCoreCloneTest(unittest.TestCase):
         self.assertEqual(pc_cc['z'], 7)
 
 
+class ParameterCoreResolutionTest(unittest.TestCase):
+    def setUp(self):
+        script = '''
+        PCore Hierarchy {
+            a = 1
+            b = a + 1
+            c = b + 1
+            d = c + 1
+        }
+        '''
+        bn = dag.bayes_net_from_script(script)
+        ns = dag.NodeSet('country')
+        ns.new_child('region', as_fixed=['b']).new_child('household', as_fixed=['c']).new_child('person', as_fixed=['d'])
+        self.SC = dag.as_simulation_core(bn, ns)
+
+        self.Country = self.SC.generate('C')
+        self.Region = self.Country.breed('R', 'region')
+        self.Household = self.Region.breed('H', 'household')
+        self.Person = self.Household.breed('P', 'person')
+
+    def test_lookup(self):
+        self.assertEqual(self.Person['a'], 1)
+        self.assertEqual(self.Person['c'], 3)
+        self.assertEqual(dict(iter(self.Person)), {'a': 1, 'b': 2, 'c': 3, 'd': 4})
+        self.assertIs(self.Household._get_index(), self.Household._get_index())
+        with self.assertRaises(KeyError):
+            self.Person['e']
+
+    def test_invalidation(self):
+        self.assertEqual(dict(iter(self.Person))['a'], 1)
+        self.Region['e'] = 10
+        self.assertEqual(self.Person['e'], 10)
+        self.Region['e'] = 20
+        self.assertEqual(self.Person['e'], 20)
+
+        self.Country.impulse({'a': 3})
+        self.assertEqual(self.Person['a'], 3)
+        self.assertEqual(self.Person['d'], 6)
+
+        self.Household.detach_from_parent(collect_pars=False)
+        self.assertNotIn('a', dict(iter(self.Person)))
+        with self.assertRaises(KeyError):
+            self.Person['a']
+
+
+class ParameterCoreRegistryTest(unittest.TestCase):
+    def setUp(self):
+        script = '''
+        PCore Hierarchy {
+            a = 1
+            b = a + 1
+            c = b + 1
+            d = c + 1
+        }
+        '''
+        bn = dag.bayes_net_from_script(script)
+        ns = dag.NodeSet('country')
+        ns.new_child('region', as_fixed=['b']).new_child('household', as_fixed=['c']).new_child('person', as_fixed=['d'])
+        self.SC = dag.as_simulation_core(bn, ns)
+
+        self.Country = self.SC.generate('C')
+        for i in range(2):
+            reg = self.Country.breed('R{}'.format(i), 'region')
+            reg.breed('H0', 'household').breed('P', 'person')
+        self.Country.enable_registry()
+
+    def test_lookup(self):
+        self.assertEqual(self.Country.find_descendant('R1@H0@P')['d'], 4)
+        self.assertIs(self.Country.find_descendant('R1@H0'), self.Country.find_descendant('R1').find_descendant('H0'))
+        with self.assertRaises(AttributeError):
+            self.Country.get_child('R0').enable_registry()
+
+        hh = self.Country.find_descendant('R1@H0').breed('Q', 'person')
+        self.assertIs(self.Country.find_descendant('R1@H0@Q'), hh)
+        self.assertEqual([k for k, _ in self.Country.iter_descendants('R1')], ['R1', 'R1@H0', 'R1@H0@P', 'R1@H0@Q'])
+
+        reg = self.Country.find_descendant('R1')
+        self.assertIs(reg.find_descendant('H0@Q'), hh)
+        self.Country.disable_registry()
+        self.assertIs(reg.find_descendant('H0@Q'), hh)
+        self.Country.enable_registry()
+
+        self.Country.find_descendant('R1@H0').detach_from_parent()
+        with self.assertRaises(KeyError):
+            self.Country.find_descendant('R1@H0@P')
+        with self.assertRaises(KeyError):
+            reg.find_descendant('H0@P')
+        self.Country.remove_children('R0')
+        self.assertEqual([k for k, _ in self.Country.iter_descendants()], ['R1'])
+
+    def test_pseudo(self):
+        from epidag.simulation.parcore import PseudoParameterCore
+        root = PseudoParameterCore('C', 'country')
+        root.breed('R', 'region').breed('H', 'household')
+        self.assertEqual(root.find_descendant('R@H').Nickname, 'H')
+        root.enable_registry()
+        self.assertIs(root.find_descendant('R@H'), root.get_child('R').get_child('H'))
+        root.find_descendant('R@H').detach_from_parent()
+        with self.assertRaises(KeyError):
+            root.find_descendant('R@H')
+
+
+class ParameterCoreDeepLogPriorTest(unittest.TestCase):
+    def setUp(self):
+        script = '''
+        PCore Hierarchy {
+            a ~ norm(0, 1)
+            b ~ norm(a, 1)
+            c ~ norm(b, 1)
+        }
+        '''
+        bn = dag.bayes_net_from_script(script)
+        ns = dag.NodeSet('country', as_fixed=['a'])
+        ns.new_child('region', as_fixed=['b']).new_child('person', as_fixed=['c'])
+        self.SC = dag.as_simulation_core(bn, ns)
+
+        self.Country = self.SC.generate('C')
+        for i in range(3):
+            reg = self.Country.breed('R{}'.format(i), 'region')
+            reg.breed('P', 'person')
+            reg.breed_many('Q', 'person', 5)
+
+    def __sum(self, pc):
+        return pc.LogPrior + sum(self.__sum(chd) for chd in pc.Children.values()) + \
+            sum(float(tab.LogPrior[tab.Alive].sum()) for tab in pc.Tables)
+
+    def test_maintenance(self):
+        self.assertAlmostEqual(self.Country.DeepLogPrior, self.__sum(self.Country))
+
+        self.Country.find_descendant('R1').breed('P1', 'person')
+        self.assertAlmostEqual(self.Country.DeepLogPrior, self.__sum(self.Country))
+        self.Country.find_descendant('R2').remove_children('P')
+        self.assertAlmostEqual(self.Country.DeepLogPrior, self.__sum(self.Country))
+        self.Country.find_descendant('R0@P').impulse({'c': 3})
+        self.assertAlmostEqual(self.Country.DeepLogPrior, self.__sum(self.Country))
+        self.Country.find_descendant('R0').Tables[0][2].impulse({'c': 3})
+        self.assertAlmostEqual(self.Country.DeepLogPrior, self.__sum(self.Country))
+        self.Country.find_descendant('R0').remove_children('Q3')
+        self.assertAlmostEqual(self.Country.DeepLogPrior, self.__sum(self.Country))
+
+        self.Country.find_descendant('R2').impulse({'b': None})
+        self.assertAlmostEqual(self.Country.DeepLogPrior, self.__sum(self.Country))
+
+        pc = self.Country.find_descendant('R1@P')
+        pc['c'] = 0
+        self.assertAlmostEqual(pc.LogPrior, self.SC.BN['c'].evaluate(dict(iter(pc))))
+        self.assertAlmostEqual(self.Country.DeepLogPrior, self.__sum(self.Country))
+        ag = self.Country.find_descendant('R1').Tables[0][4]
+        ag['c'] = 0
+        self.assertAlmostEqual(ag.LogPrior, self.SC.BN['c'].evaluate(dict(iter(ag))))
+        self.assertAlmostEqual(self.Country.DeepLogPrior, self.__sum(self.Country))
+        pc.LogPrior = -1
+        self.assertAlmostEqual(self.Country.DeepLogPrior, self.__sum(self.Country))
+
+        br = self.Country.branch()
+        self.assertAlmostEqual(br.DeepLogPrior, self.Country.DeepLogPrior)
+        br.find_descendant('R1@P').LogPrior = -2
+        self.assertAlmostEqual(br.DeepLogPrior, self.Country.DeepLogPrior - 1)
+
+    def test_traversal(self):
+        pre = [pc.Nickname for pc in self.Country.iter_preorder()]
+        self.assertEqual(pre, ['C', 'R0', 'P', 'R1', 'P', 'R2', 'P'])
+        post = [pc.Nickname for pc in self.Country.iter_postorder()]
+        self.assertEqual(post, ['P', 'R0', 'P', 'R1', 'P', 'R2', 'C'])
+        self.assertEqual(len(list(self.Country.iter_group('person'))), 3)
+
+
+class ParameterCoreLifecycleTest(unittest.TestCase):
+    def setUp(self):
+        script = '''
+        PCore Population {
+            mu ~ norm(0, 1)
+            x ~ norm(mu, 1)
+            z ~ norm(x, 1)
+        }
+        '''
+        bn = dag.bayes_net_from_script(script)
+        ns = dag.NodeSet('root', as_fixed=['mu'])
+        ns.new_child('ag', as_fixed=['x'], as_floating=['z'])
+        self.SC = dag.as_simulation_core(bn, ns, weak_parents=True)
+        self.Root = self.SC.generate('R')
+
+    def test_weak_parents(self):
+        import gc
+        chd = self.Root.breed('A', 'ag')
+        tab = self.Root.breed_many('T', 'ag', 3)
+        self.assertIs(chd.Parent, self.Root)
+        self.assertEqual(chd['mu'], self.Root['mu'])
+        self.Root = None
+        gc.collect()
+        with self.assertRaises(ReferenceError):
+            chd.Parent
+        with self.assertRaises(ReferenceError):
+            chd['mu']
+        with self.assertRaises(ReferenceError):
+            tab.Parent
+
+        chd.dispose()
+        self.assertIsNone(chd.Parent)
+
+    def test_dispose(self):
+        chd = self.Root.breed('A', 'ag')
+        sampler = chd.get_sampler('z')
+        self.assertGreater(self.Root.memory_report().loc['ag', 'Samplers'], 0)
+
+        chd.dispose()
+        self.assertFalse(self.Root.has_child('A'))
+        self.assertIsNone(chd.Parent)
+        self.assertIsNone(sampler.Chromosome)
+        self.assertIsNone(chd.Actors)
+
+        self.Root.breed_many('T', 'ag', 4)
+        report = self.Root.memory_report()
+        self.assertEqual(report.loc['root', 'Nodes'], 1)
+        self.assertEqual(report.loc['ag', 'Nodes'], 0)
+        self.assertEqual(report.loc['ag', 'Members'], 4)
+
+
+class ParameterCoreGenerationTest(unittest.TestCase):
+    def setUp(self):
+        script = '''
+        PCore Population {
+            mu ~ norm(0, 1)
+            age
+            x ~ norm(mu + age, 1)
+            y = x * 2
+            z ~ norm(y, 1)
+        }
+        '''
+        self.BN = dag.bayes_net_from_script(script)
+        ns = dag.NodeSet('root', as_fixed=['mu'])
+        ns.new_child('ag', as_fixed=['age', 'x', 'y', 'z'])
+        self.SC = dag.as_simulation_core(self.BN, ns)
+        self.Root = self.SC.generate('R')
+
+    def __evaluate(self, pc):
+        vs = dict(iter(pc))
+        return sum(self.BN[d].evaluate(vs) for d in pc.SG.Fixed if d in vs)
+
+    def test_generate(self):
+        pc = self.Root.breed('A', 'ag', exo={'age': 30})
+        self.assertEqual(pc['age'], 30)
+        self.assertEqual(pc['y'], pc['x'] * 2)
+        self.assertAlmostEqual(pc.LogPrior, self.__evaluate(pc))
+
+        pc = self.Root.breed('B', 'ag', exo={'age': 30, 'x': 20})
+        self.assertEqual(pc['x'], 20)
+        self.assertAlmostEqual(pc.LogPrior, self.__evaluate(pc))
+
+        with self.assertRaises(KeyError):
+            self.Root.breed('C', 'ag')
+
+    def test_lazy_prior(self):
+        pc = self.Root.breed('A', 'ag', exo={'age': 30}, lazy_prior=True)
+        self.assertTrue(pc.is_prior_deferred())
+        self.assertAlmostEqual(pc.LogPrior, self.__evaluate(pc))
+        self.assertFalse(pc.is_prior_deferred())
+
+        self.SC.LazyPrior = True
+        pc = self.Root.breed('B', 'ag', exo={'age': 30})
+        self.assertTrue(pc.is_prior_deferred())
+        self.assertAlmostEqual(self.Root.DeepLogPrior, self.Root.LogPrior + sum(
+            self.__evaluate(chd) for chd in self.Root.Children.values()))
+
+        pc = self.Root.breed('C', 'ag', exo={'age': 30})
+        pc.impulse({'x': 10})
+        self.assertFalse(pc.is_prior_deferred())
+
+    def test_respond(self):
+        pc = self.Root.breed('A', 'ag', exo={'age': 30})
+        x = pc['x']
+        self.Root.impulse({'mu': 5})
+        self.assertNotEqual(pc['x'], x)
+        self.assertEqual(pc['y'], pc['x'] * 2)
+
+        pc.impulse({'x': 10})
+        self.assertEqual(pc['y'], 20)
+        self.assertEqual(pc['age'], 30)
+
+
+class ParameterCoreBreedManyTest(unittest.TestCase):
+    def setUp(self):
+        script = '''
+        PCore Population {
+            mu ~ norm(0, 1)
+            age ~ unif(0, 100)
+            x ~ norm(mu + age, 1)
+            y = x * 2
+            z ~ norm(y, 1)
+        }
+        '''
+        bn = dag.bayes_net_from_script(script)
+        ns = dag.NodeSet('root', as_fixed=['mu'])
+        ns.new_child('ag', as_fixed=['x', 'y'], as_floating=['z'])
+        self.SC = dag.as_simulation_core(bn, ns)
+        self.Root = self.SC.generate('R')
+
+    def test_breed_many(self):
+        ages = np.linspace(1, 99, 1000)
+        tab = self.Root.breed_many('Ag', 'ag', 1000, exo={'age': ages})
+        self.assertEqual(len(tab), 1000)
+        self.assertTrue(np.allclose(tab.Columns['y'], tab.Columns['x'] * 2))
+        self.assertTrue(np.allclose(tab.Columns['age'], ages))
+
+        ag = tab['Ag10']
+        self.assertEqual(ag, tab[10])
+        self.assertEqual(self.Root.get_child('Ag10'), ag)
+        self.assertEqual(ag['mu'], self.Root['mu'])
+        self.assertAlmostEqual(ag['age'], ages[10])
+
+        pc = self.Root.breed('Single', 'ag', exo={'age': ages[10], 'x': ag['x']})
+        self.assertAlmostEqual(tab.LogPrior[10], pc.LogPrior)
+        self.assertEqual(tab.to_data_frame().shape, (1000, 4))
+
+        with self.assertRaises(ValueError):
+            self.Root.breed_many('Ag', 'ag', 20, exo={'age': 10})
+        with self.assertRaises(KeyError):
+            self.Root.breed_many('Bg', 'unknown', 10)
+
+    def test_table(self):
+        tab = self.Root.breed_many('Ag', 'ag', 100, exo={'age': 20})
+        self.assertAlmostEqual(self.Root.DeepLogPrior, self.Root.LogPrior + tab.LogPrior.sum())
+        ag = tab[5]
+        ag['x'] = 3
+        self.assertEqual(tab.Columns['x'][5], 3)
+        self.assertAlmostEqual(ag.LogPrior, self.__evaluate(ag))
+        self.assertEqual(self.Root.get_child('Ag5')['x'], 3)
+
+        sampler = ag.get_sampler('z')
+        self.assertIs(sampler.Actor, tab[6].get_sampler('z').Actor)
+        self.assertGreater(sampler(), 0)
+
+        self.Root.impulse({'mu': 100})
+        self.assertTrue(np.all(tab.Columns['x'] > 50))
+        self.assertTrue(np.allclose(tab.Columns['y'], tab.Columns['x'] * 2))
+
+        pc = tab.materialise('Ag7')
+        self.assertIs(self.Root.get_child('Ag7'), pc)
+        self.assertNotIn('Ag7', tab)
+        self.assertEqual(len(tab), 99)
+
+        self.Root.remove_children('Ag8')
+        self.assertFalse(self.Root.has_child('Ag8'))
+        self.assertEqual(tab.to_data_frame().shape, (98, 4))
+
+        root = self.Root.clone(include_children=True)
+        self.assertEqual(len(root.Tables[0]), 98)
+        self.assertEqual(root.get_child('Ag5')['x'], tab[5]['x'])
+
+
+    @staticmethod
+    def __evaluate(pc):
+        vs = dict(iter(pc))
+        return sum(pc.SG.BN[d].evaluate(vs) for d in pc.SG.Fixed if d in vs)
+
+    def test_view(self):
+        tab = self.Root.breed_many('Ag', 'ag', 10, exo={'age': 20})
+        ag = tab[3]
+        self.assertFalse(ag.is_prior_deferred())
+        self.assertAlmostEqual(ag.DeepLogPrior, tab.LogPrior[3])
+
+        sampler = ag.get_sampler('z')
+        self.assertIs(sampler, tab[3].get_sampler('z'))
+
+        ag.impulse({'x': 5})
+        self.assertEqual(tab.Columns['x'][3], 5)
+        self.assertEqual(tab.Columns['y'][3], 10)
+        self.assertAlmostEqual(ag.DeepLogPrior, self.__evaluate(ag))
+        ag.LogPrior = -1
+        self.assertEqual(ag.DeepLogPrior, -1)
+        self.assertAlmostEqual(self.Root.DeepLogPrior, self.Root.LogPrior + tab.LogPrior.sum())
+        self.assertEqual(ag.memory_report().loc['ag', 'Samplers'], 1)
+
+        ag.dispose()
+        self.assertIsNone(sampler.Chromosome)
+        self.assertNotIn('Ag3', tab)
+        self.assertAlmostEqual(self.Root.DeepLogPrior, self.Root.LogPrior + tab.LogPrior[tab.Alive].sum())
+
+    def test_view_locus(self):
+        tab = self.Root.breed_many('Ag', 'ag', 10, exo={'age': 20})
+        locus = tab[0].Locus
+        locus['x'] = 99
+        self.assertEqual(tab[0]['x'], 99)
+        self.assertEqual(tab.Columns['x'][0], 99)
+        self.assertEqual(dict(locus), tab.get_locus(0))
+
+        with self.assertRaises(KeyError):
+            locus['z'] = 1
+        with self.assertRaises(TypeError):
+            del locus['x']
+
+        br = self.Root.branch()
+        br.get_child('Ag1').Locus['x'] = 7
+        self.assertNotEqual(tab[1]['x'], 7)
+        self.assertEqual(br.get_child('Ag1')['x'], 7)
+
+    def test_parent_impulse(self):
+        tab = self.Root.breed_many('Ag', 'ag', 10, exo={'age': 20})
+        self.Root.impulse({'mu': 100})
+        self.assertTrue(np.all(np.isfinite(tab.LogPrior)))
+        for ag in tab:
+            self.assertAlmostEqual(ag.LogPrior, self.__evaluate(ag))
+        self.assertAlmostEqual(self.Root.DeepLogPrior, self.Root.LogPrior + tab.LogPrior.sum())
+
+        script = '''
+        PCore Floating {
+            p ~ beta(1, 1)
+            m ~ norm(0, 1)
+            x ~ binom(10, p)
+        }
+        '''
+        ns = dag.NodeSet('root', as_floating=['p'])
+        ns.new_child('ag', as_fixed=['p', 'm', 'x'])
+        root = dag.as_simulation_core(dag.bayes_net_from_script(script), ns).generate('R')
+        tab = root.breed_many('A', 'ag', 5)
+        root.impulse({'p': .3})
+        self.assertTrue(np.all(tab.Columns['p'] == .3))
+        for ag in tab:
+            self.assertAlmostEqual(ag.LogPrior, self.__evaluate(ag))
+        self.assertAlmostEqual(root.DeepLogPrior, root.LogPrior + tab.LogPrior.sum())
+
+
+class ParameterCoreLazyImpulseTest(unittest.TestCase):
+    def setUp(self):
+        script = '''
+        PCore Hierarchy {
+            a = 1
+            b = a + 1
+            c = b + 1
+            d = c + 1
+            e = 5
+        }
+        '''
+        bn = dag.bayes_net_from_script(script)
+        ns = dag.NodeSet('country', as_fixed=['e'])
+        ns.new_child('region', as_fixed=['b']).new_child('household', as_fixed=['c']).new_child('person', as_fixed=['d'])
+        self.SC = dag.as_simulation_core(bn, ns)
+
+        self.Country = self.SC.generate('C')
+        self.Region = self.Country.breed('R', 'region')
+        self.Household = self.Region.breed('H', 'household')
+        self.Person = self.Household.breed('P', 'person')
+        self.Table = self.Household.breed_many('Q', 'person', 10)
+
+    def test_lazy(self):
+        self.Country.impulse({'a': 3}, lazy=True)
+        self.assertEqual(self.Household.Locus['c'], 3)
+        self.assertEqual(self.Person['d'], 6)
+        self.assertEqual(self.Household.Locus['c'], 5)
+        self.assertEqual(self.Region.Locus['b'], 4)
+        self.assertTrue(np.all(self.Table.Columns['d'] == 4))
+        self.assertEqual(self.Table[3]['d'], 6)
+        self.assertTrue(np.all(self.Table.Columns['d'] == 6))
+
+    def test_bounded_log(self):
+        for i in range(1000):
+            self.Country.impulse({'a': i}, lazy=True)
+            self.assertEqual(self.Person['d'], i + 3)
+            self.assertEqual(self.Table[0]['d'], i + 3)
+        for pc in [self.Country, self.Region, self.Household]:
+            self.assertLessEqual(len(pc._get_log()), 16)
+        self.assertEqual(self.Country._get_log_end(), 1000)
+
+        # a consumer lagging behind keeps the interventions it has not caught up with
+        for i in range(40):
+            self.Country.impulse({'a': i}, lazy=True)
+        self.assertGreaterEqual(len(self.Country._get_log()), 40)
+        self.assertEqual(self.Person['d'], 42)
+
+    def test_irrelevant(self):
+        self.Country.impulse({'e': 7}, lazy=True)
+        self.assertEqual(self.Person['e'], 7)
+        self.assertEqual(self.Country._get_log(), [])
+
+    def test_consistency(self):
+        self.Country.impulse({'a': 2}, lazy=True)
+        self.Region.impulse({'a': 4}, lazy=True)
+        self.Country.impulse({'a': 3})
+        self.assertEqual(self.Person['d'], 6)
+        self.Region.impulse({'b': 10}, lazy=True)
+        self.Country.impulse({'e': 1}, lazy=True)
+        self.assertEqual(self.Table[0]['d'], 12)
+        self.assertEqual(self.Person['d'], 12)
+        self.assertEqual(self.Person['e'], 1)
+
+        root = self.Country.clone(include_children=True)
+        self.assertEqual(root.find_descendant('R@H@P')['d'], 12)
+
+
+class ParameterCoreBranchTest(unittest.TestCase):
+    def setUp(self):
+        script = '''
+        PCore Hierarchy {
+            a = 1
+            b = a + 1
+            c = b + 1
+            d = c + 1
+            s ~ norm(d, 1)
+        }
+        '''
+        bn = dag.bayes_net_from_script(script)
+        ns = dag.NodeSet('country')
+        ns.new_child('region', as_fixed=['b']).new_child('household', as_fixed=['c']).new_child(
+            'person', as_fixed=['d'], as_floating=['s'])
+        self.SC = dag.as_simulation_core(bn, ns)
+
+        self.Country = self.SC.generate('C')
+        for i in range(3):
+            region = self.Country.breed('R{}'.format(i), 'region')
+            for j in range(3):
+                household = region.breed('H{}'.format(j), 'household')
+                household.breed('P', 'person')
+                household.breed_many('Q', 'person', 5)
+
+    def test_sharing(self):
+        br = self.Country.branch()
+        self.assertIs(br.Locus, self.Country.Locus)
+        self.assertEqual(br.find_descendant('R1@H2@P')['d'], 4)
+        self.assertIs(br.find_descendant('R1@H2@P').Locus, self.Country.find_descendant('R1@H2@P').Locus)
+        self.assertEqual(br.DeepLogPrior, self.Country.DeepLogPrior)
+        self.assertGreater(br.find_descendant('R1@H2@P').get_sampler('s')(), 0)
+
+    def test_divergence(self):
+        br = self.Country.branch()
+        br.find_descendant('R1@H2')['c'] = 10
+        self.assertEqual(br.find_descendant('R1@H2@P')['c'], 10)
+        self.assertEqual(self.Country.find_descendant('R1@H2@P')['c'], 3)
+
+        self.Country.find_descendant('R2').impulse({'b': 5})
+        self.assertEqual(self.Country.find_descendant('R2@H0@P')['d'], 7)
+        self.assertEqual(self.Country.find_descendant('R2@H0@Q3')['d'], 7)
+        self.assertEqual(br.find_descendant('R2@H0@P')['d'], 4)
+        self.assertEqual(br.find_descendant('R2@H0@Q3')['d'], 4)
+
+        br.find_descendant('R0@H0').remove_children('P')
+        self.assertFalse(br.find_descendant('R0@H0').has_child('P'))
+        self.assertTrue(self.Country.find_descendant('R0@H0').has_child('P'))
+        self.Country.find_descendant('R0@H0@P')['d'] = 0
+        self.assertEqual(self.Country.find_descendant('R0@H0@P')['d'], 0)
+
+    def test_lazy(self):
+        self.Country.impulse({'a': 2}, lazy=True)
+        br = self.Country.branch()
+        self.Country.impulse({'a': 3}, lazy=True)
+        self.assertEqual(br.find_descendant('R0@H0@P')['d'], 5)
+        self.assertEqual(self.Country.find_descendant('R0@H0@P')['d'], 6)
+        self.assertEqual(br.find_descendant('R0@H0@Q0')['d'], 5)
+        self.assertEqual(self.Country.find_descendant('R0@H0@Q0')['d'], 6)
+
+        br2 = br.branch()
+        br.impulse({'a': 0})
+        self.assertEqual(br2.find_descendant('R1@H1@P')['d'], 5)
+        self.assertEqual(br.find_descendant('R1@H1@P')['d'], 3)
+        self.assertEqual(self.Country.find_descendant('R1@H1@P')['d'], 6)
+
+
 if __name__ == '__main__':
     unittest.main()
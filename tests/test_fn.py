@@ -0,0 +1,133 @@
+import unittest
+import numpy as np
+import pandas as pd
+import epidag as dag
+from epidag.bayesnet import Chromosome
+from epidag.factory.arguments import ValidationError
+
+script_hier = '''
+PCore Hier {
+    mu ~ norm(0, 1)
+    tau ~ gamma(1, 1)
+    x1 ~ norm(mu, tau)
+    x2 ~ norm(mu, tau)
+    y ~ norm(x1, 1)
+}
+'''
+
+
+class PriorEvaluatorTest(unittest.TestCase):
+    def setUp(self):
+        self.BN = dag.bayes_net_from_script(script_hier)
+        self.Gene = Chromosome({'mu': 0.5, 'tau': 2, 'x1': 1, 'x2': -1, 'y': 0.3})
+
+    def test_affected(self):
+        pe = dag.PriorEvaluator(self.BN)
+        self.assertSetEqual(pe.affected(['x1']), {'x1', 'y'})
+        self.assertSetEqual(pe.affected(['mu']), {'mu', 'x1', 'x2'})
+
+    def test_update(self):
+        pe = dag.PriorEvaluator(self.BN)
+        lp = pe.evaluate(self.Gene)
+        self.assertAlmostEqual(lp, dag.evaluate_nodes(self.BN, self.Gene))
+
+        gene = self.Gene.clone()
+        gene['mu'] = -0.2
+        self.assertIsNone(gene.LogPrior)
+        lp = pe.update(gene, ['mu'])
+        self.assertAlmostEqual(lp, dag.evaluate_nodes(self.BN, gene))
+        self.assertAlmostEqual(self.Gene.LogPrior, dag.evaluate_nodes(self.BN, self.Gene))
+
+    def test_drift(self):
+        pe = dag.PriorEvaluator(self.BN)
+        gene = self.Gene.clone()
+        pe.evaluate(gene)
+        rng = np.random.RandomState(1)
+        for i in range(400):
+            k = ['mu', 'x1', 'x2', 'y'][i % 4]
+            gene[k] = rng.normal(0, 10) if i % 100 else 1e8
+            pe.update(gene, [k])
+            self.assertEqual(gene.LogPrior, gene.PriorTerms.Total)
+            self.assertAlmostEqual(gene.LogPrior, sum(gene.PriorTerms.Terms.values()), places=6)
+
+        gene['x2'] = 1e300
+        self.assertEqual(pe.update(gene, ['x2']), -np.inf)
+        gene['x2'] = 1
+        self.assertAlmostEqual(pe.update(gene, ['x2']), dag.evaluate_nodes(self.BN, gene))
+
+    def test_impulse(self):
+        pe = dag.PriorEvaluator(self.BN)
+        pe.evaluate(self.Gene)
+
+        gene = self.Gene.clone()
+        gene.impulse({'mu': 2}, self.BN)
+        self.assertNotEqual(gene['y'], 0.3)
+        self.assertIsNone(gene.PriorTerms)
+        lp = pe.update(gene, ['mu'])
+        self.assertAlmostEqual(lp, dag.evaluate_nodes(self.BN, gene))
+
+
+class BatchEvaluationTest(unittest.TestCase):
+    def setUp(self):
+        self.BN = dag.bayes_net_from_script(script_hier)
+        self.Genes = [dag.sample(self.BN) for _ in range(20)]
+
+    def test_batch(self):
+        df = pd.DataFrame(self.Genes)
+        lps, terms = dag.evaluate_nodes_batch(self.BN, df, by_node=True)
+        self.assertEqual(lps.shape, (20, ))
+        self.assertCountEqual(terms.columns, ['mu', 'tau', 'x1', 'x2', 'y'])
+        for lp, gene in zip(lps, self.Genes):
+            self.assertAlmostEqual(lp, dag.evaluate_nodes(self.BN, gene))
+
+    def test_empty(self):
+        df = pd.DataFrame(self.Genes).iloc[:0]
+        lps, terms = dag.evaluate_nodes_batch(self.BN, df, by_node=True)
+        self.assertEqual(lps.shape, (0, ))
+        self.assertEqual(terms.shape, (0, 5))
+        self.assertEqual(self.BN['x1'].render_batch({k: df[k].to_numpy() for k in df}, 0).shape, (0, ))
+
+    def test_fallback(self):
+        bn = dag.bayes_net_from_script('''
+        PCore Tri {
+            a ~ unif(0, 1)
+            x ~ triangle(0, a, 1)
+            n = 5
+            k ~ binom(n, a)
+        }
+        ''')
+        genes = [dag.sample(bn) for _ in range(10)]
+        lps = dag.evaluate_nodes_batch(bn, {k: [g[k] for g in genes] for k in ['a', 'x', 'k', 'n']})
+        for lp, gene in zip(lps, genes):
+            self.assertAlmostEqual(lp, dag.evaluate_nodes(bn, gene))
+
+    def test_exo(self):
+        bn = dag.bayes_net_from_script('''
+        PCore BetaBin {
+            p ~ beta(1, 1)
+            x ~ binom(n, p)
+        }
+        ''')
+        with self.assertRaises(ValueError):
+            dag.evaluate_nodes_batch(bn, {'p': np.array([0.1, 0.2]), 'x': np.array([1, 2])})
+        lps = dag.evaluate_nodes_batch(bn, {'p': [0.1, 0.2], 'x': [1, 2], 'n': [4, 4]})
+        self.assertAlmostEqual(lps[1], dag.evaluate_nodes(bn, {'p': 0.2, 'x': 2, 'n': 4}))
+
+    def test_invalid(self):
+        bn = dag.bayes_net_from_script('''
+        PCore Bin {
+            x ~ binom(z, 0.5)
+        }
+        ''')
+        with self.assertRaises(ValidationError):
+            dag.evaluate_nodes(bn, {'z': -1, 'x': 0})
+        with self.assertRaises(ValidationError):
+            dag.evaluate_nodes_batch(bn, {'z': [-1, 1, 2], 'x': [0, 1, 1]})
+
+        lps = dag.evaluate_nodes_batch(bn, {'z': [0, 1, 2, 2.0], 'x': [0, 0, 1, 1]})
+        for lp, z, x in zip(lps, [0, 1, 2, 2], [0, 0, 1, 1]):
+            self.assertAlmostEqual(lp, dag.evaluate_nodes(bn, {'z': z, 'x': x}))
+
+
+if __name__ == '__main__':
+    unittest.main()
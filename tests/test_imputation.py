@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+import pandas as pd
+import epidag as dag
+
+script_imp = '''
+PCore Imp {
+    p ~ beta(1, 1)
+    n = 10
+    x ~ binom(n, p)
+    sex ~ cat({'M': 0.5, 'F': 0.5})
+    y = x * 2
+}
+'''
+
+
+class ImputationTest(unittest.TestCase):
+    def setUp(self):
+        self.BN = dag.bayes_net_from_script(script_imp)
+        self.Data = pd.DataFrame({
+            'p': [0.1, 0.5, np.nan, 0.9, np.nan],
+            'x': [np.nan, 3, np.nan, np.nan, 4],
+            'y': [np.nan, np.nan, np.nan, np.nan, 8]
+        })
+
+    def test_impute(self):
+        imp = dag.Imputer(self.BN, nodes=['sex'])
+        res = imp.impute(self.Data)
+        self.assertFalse(res.isna().any().any())
+        self.assertTrue(np.all(res['y'] == res['x'] * 2))
+        self.assertEqual(res['p'][0], 0.1)
+        self.assertTrue(set(res['sex']) <= {'M', 'F'})
+        self.assertTrue(self.Data['x'].isna()[0])
+
+        n_plans = len(imp.Plans)
+        imp.impute(self.Data)
+        self.assertEqual(len(imp.Plans), n_plans)
+
+    def test_stream(self):
+        chunks = [self.Data.iloc[:2], self.Data.iloc[2:]]
+        res = list(dag.impute(self.BN, iter(chunks)))
+        self.assertEqual(len(res), 2)
+        self.assertEqual(sum(len(r) for r in res), 5)
+
+    def test_exo(self):
+        bn = dag.bayes_net_from_script('''
+        PCore BetaBin {
+            p ~ beta(1, 1)
+            x ~ binom(n, p)
+        }
+        ''')
+        with self.assertRaises(ValueError):
+            dag.Imputer(bn).impute(pd.DataFrame({'p': [0.1], 'x': [np.nan]}))
+
+
+if __name__ == '__main__':
+    unittest.main()
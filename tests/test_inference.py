@@ -0,0 +1,122 @@
+import unittest
+import numpy as np
+import scipy.stats as sts
+from scipy.special import logsumexp
+import epidag as dag
+from epidag.bayesnet import Chromosome
+from epidag.fitting.databm import DataNodeSet
+
+script_lw = '''
+PCore Conj {
+    p ~ beta(1, 1)
+    n = 10
+    x ~ binom(n, p)
+    mu ~ norm(0, 1)
+    y ~ norm(mu, 1)
+    z = mu * 2
+}
+'''
+
+
+class LikelihoodWeightingTest(unittest.TestCase):
+    def setUp(self):
+        self.BN = dag.bayes_net_from_script(script_lw)
+
+    def test_conjugate(self):
+        res = dag.query_posterior(self.BN, {'x': 3}, ['p'], target_ess=2000, chunk=5000)
+        self.assertGreaterEqual(res.ESS, 2000)
+        self.assertAlmostEqual(res.mean()['p'], 4 / 12, delta=0.02)
+        self.assertAlmostEqual(res.LogEvidence, np.log(1 / 11), delta=0.1)
+
+        res = dag.query_posterior(self.BN, {'y': 1}, ['mu', 'z'], target_ess=2000, keep=True)
+        mu = res.mean()
+        self.assertAlmostEqual(mu['mu'], 0.5, delta=0.05)
+        self.assertAlmostEqual(mu['z'], 1, delta=0.1)
+        self.assertEqual(res.summarise().shape, (8, 2))
+        self.assertEqual(res.resample(100).shape, (100, 2))
+
+    def test_moments(self):
+        lw = dag.LikelihoodWeighting(self.BN)
+        np.random.seed(1)
+        res = lw.query({'y': 1}, ['mu', 'z'], target_ess=1500, chunk=500)
+        self.assertIsInstance(res, dag.WeightedMoments)
+        np.random.seed(1)
+        ws = lw.query({'y': 1}, ['mu', 'z'], target_ess=1500, chunk=500, keep=True)
+        self.assertEqual(len(res), len(ws))
+        self.assertAlmostEqual(res.ESS, ws.ESS)
+        self.assertAlmostEqual(res.LogEvidence, ws.LogEvidence)
+        self.assertAlmostEqual(res.mean()['mu'], ws.mean()['mu'])
+        self.assertAlmostEqual(res.var()['z'], ws.Weights.dot((ws.Samples['z'] - ws.mean()['z']) ** 2))
+
+    def test_plan(self):
+        lw = dag.LikelihoodWeighting(self.BN)
+        plan = lw.get_plan(['x'], ['p'])
+        self.assertNotIn('mu', plan)
+        self.assertEqual(len(lw.Plans), 1)
+
+        with self.assertRaises(ValueError):
+            lw.get_plan(['z'], ['mu'])
+
+    def test_max_draws(self):
+        lw = dag.LikelihoodWeighting(self.BN)
+        res = lw.query({'y': 1}, ['mu'], target_ess=1e6, chunk=300, max_draws=1000)
+        self.assertEqual(len(res), 1000)
+
+
+script_ve = '''
+PCore VE {
+    lam ~ exp(0.5)
+    p ~ beta(1, 1)
+    k ~ pois(lam)
+    j ~ binom(k, p)
+    m = j + 1
+    y ~ pois(m * lam)
+    g ~ cat({'a': 0.3, 'b': 0.7})
+    mu ~ norm(0, 1)
+    z ~ norm(mu, 1)
+}
+'''
+
+
+class VariableEliminationTest(unittest.TestCase):
+    def setUp(self):
+        self.BN = dag.bayes_net_from_script(script_ve)
+        self.Prior = Chromosome({'lam': 2, 'p': 0.4, 'mu': 0.5})
+
+    def test_chain(self):
+        ve = dag.VariableElimination(self.BN)
+        fixed = dict(self.Prior.Locus, y=3)
+        li = ve.marginal_likelihood(['k', 'j', 'y'], fixed)
+
+        ks = np.arange(0, 60)
+        lps = list()
+        for k in ks:
+            js = np.arange(k + 1)
+            lps.append(sts.poisson.logpmf(k, 2) +
+                       logsumexp(sts.binom.logpmf(js, k, 0.4) + sts.poisson.logpmf(3, (js + 1) * 2)))
+        self.assertAlmostEqual(li, logsumexp(lps), places=6)
+
+        n_cache = len(ve.Cache)
+        self.assertAlmostEqual(ve.marginal_likelihood(['k', 'j', 'y'], fixed), li)
+        self.assertEqual(len(ve.Cache), n_cache)
+        self.assertEqual(len(ve.Plans), 1)
+
+    def test_applicability(self):
+        ve = dag.VariableElimination(self.BN)
+        self.assertIsNotNone(ve.get_plan(['g'], ['lam', 'p', 'mu']))
+        self.assertIsNone(ve.get_plan(['z'], ['lam', 'p']))
+        self.assertIsNone(ve.marginal_likelihood(['mu', 'z'], {'z': 1}))
+
+    def test_data_node_set(self):
+        ns = DataNodeSet({'g': 'b'}, ['g'], mc=True)
+        self.assertTrue(ns.is_exact(self.BN, ['lam', 'p', 'mu']))
+        self.assertAlmostEqual(ns.evaluate_likelihood(self.BN, self.Prior), np.log(0.7))
+
+        ns = DataNodeSet({'y': 3}, ['j', 'y'], mc=True)
+        li = ns.evaluate_likelihood(self.BN, Chromosome({'lam': 2, 'p': 0.4, 'k': 5}))
+        js = np.arange(6)
+        self.assertAlmostEqual(li, logsumexp(sts.binom.logpmf(js, 5, 0.4) + sts.poisson.logpmf(3, (js + 1) * 2)))
+
+
+if __name__ == '__main__':
+    unittest.main()